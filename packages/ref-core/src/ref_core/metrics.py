@@ -140,6 +140,27 @@ class DataRequirement:
     This is effectively an AND operation.
     """
 
+    join_on: tuple[str, ...] | None = None
+    """
+    Facets that must have the same value as in the groups of the other data requirements of the metric
+
+    When a metric has multiple data requirements (e.g. a model variable and the cell areas of the model),
+    a group of each requirement is combined into a single execution.
+    The groups of requirements that share join facets are only combined
+    if they have the same value for each of the shared facets, e.g. `join_on=("source_id", "grid_label")`.
+    Groups are only combined if they have a single, non-missing value for each of the shared facets.
+    If `join_on=None`, every group is combined with every group of the other requirements.
+    """
+
+    columns: tuple[str, ...] | None = None
+    """
+    Columns of the data catalog that the metric uses when it is executed
+
+    The facets used by the `filters`, `group_by`, `join_on` and `constraints` are always available,
+    as are the slug and path columns.
+    If `columns=None`, every column of the data catalog is loaded.
+    """
+
     def apply_filters(self, data_catalog: pd.DataFrame) -> pd.DataFrame:
         """
         Apply filters to a DataFrame-based data catalog.
@@ -1,5 +1,8 @@
+import numpy as np
+import pandas as pd
 import pytest
-from ref_core.datasets import DatasetCollection, MetricDataset, SourceDatasetType
+from ref_core.datasets import DatasetCollection, FacetFilter, FacetIndex, MetricDataset, SourceDatasetType
+from ref_core.metrics import DataRequirement
 
 
 @pytest.fixture
@@ -63,3 +66,60 @@ class TestDatasetCollection:
         assert dataset_hash != hash(
             DatasetCollection(cmip6_data_catalog[cmip6_data_catalog.variable_id == "tas"], "instance_id")
         )
+
+
+@pytest.fixture
+def facet_catalog():
+    return pd.DataFrame(
+        {
+            "variable_id": ["tas", "pr", "rsut", "tas", "tas", "pr"],
+            "source_id": ["CESM2", "CESM2", "CESM2", "ACCESS", "CAS", None],
+            "init_year": [None, None, 1850, None, 1850, None],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+
+
+class TestFacetIndex:
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            (),
+            (FacetFilter({"variable_id": "tas"}),),
+            (FacetFilter({"variable_id": ("tas", "pr", "missing")}),),
+            (FacetFilter({"variable_id": "tas", "source_id": ["CESM2", "ACCESS"]}),),
+            (FacetFilter({"variable_id": "tas"}), FacetFilter({"source_id": "ACCESS"}, keep=False)),
+            (FacetFilter({"variable_id": "tas", "source_id": "CESM2"}, keep=False),),
+            # Missing values are never matched
+            (FacetFilter({"source_id": "CESM2"}, keep=False),),
+            (FacetFilter({"variable_id": "missing"}),),
+            (FacetFilter({"init_year": "1850"}),),
+        ],
+    )
+    @pytest.mark.parametrize("categorical", [False, True])
+    def test_apply_filters(self, facet_catalog, filters, categorical):
+        if categorical:
+            facet_catalog = facet_catalog.astype({"variable_id": "category", "source_id": "category"})
+        requirement = DataRequirement(source_type=SourceDatasetType.CMIP6, filters=filters, group_by=None)
+
+        result = FacetIndex(facet_catalog).apply_filters(filters)
+
+        pd.testing.assert_frame_equal(result, requirement.apply_filters(facet_catalog))
+
+    def test_rows(self, facet_catalog):
+        index = FacetIndex(facet_catalog)
+
+        np.testing.assert_array_equal(index.rows("variable_id", ["tas", "pr"]), [0, 1, 3, 4, 5])
+        np.testing.assert_array_equal(index.rows("init_year", [1850]), [2, 4])
+        assert len(index.rows("variable_id", ["missing"])) == 0
+
+    def test_missing_facet(self, facet_catalog):
+        index = FacetIndex(facet_catalog)
+
+        with pytest.raises(KeyError, match="Facet 'missing' not in data catalog columns"):
+            index.apply_filters([FacetFilter({"missing": "tas"})])
+
+    def test_empty(self):
+        index = FacetIndex(pd.DataFrame({"variable_id": []}))
+
+        assert index.apply_filters([FacetFilter({"variable_id": "tas"})]).empty
@@ -93,6 +93,8 @@ class GlobalMeanTimeseries(Metric):
             # constraints=(AddCellAreas(),),
             # Run the metric on each unique combination of model, variable, experiment, and variant
             group_by=("source_id", "variable_id", "experiment_id", "variant_label"),
+            # Only the paths to the files are needed to run the metric
+            columns=("path",),
         ),
     )
 
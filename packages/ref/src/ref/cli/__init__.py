@@ -10,7 +10,7 @@ from attrs import define
 from loguru import logger
 
 from ref import __core_version__, __version__
-from ref.cli import config, datasets, solve
+from ref.cli import cache, config, datasets, solve
 from ref.cli._logging import capture_logging
 from ref.config import Config
 from ref.constants import config_filename
@@ -78,6 +78,7 @@ app = typer.Typer(name="ref", no_args_is_help=True)
 app.command(name="solve")(solve.solve)
 app.add_typer(config.app, name="config")
 app.add_typer(datasets.app, name="datasets")
+app.add_typer(cache.app, name="cache")
 
 
 @app.callback()
@@ -0,0 +1,37 @@
+"""
+Inspect and prune the cache of parsed file metadata
+"""
+
+from typing import Annotated
+
+import typer
+
+from ref.cli.datasets import _pretty_print_df
+from ref.datasets.cache import MetadataCache
+
+app = typer.Typer(help=__doc__)
+
+
+@app.command(name="list")
+def list_(ctx: typer.Context) -> None:
+    """
+    Print a summary of the cached metadata
+    """
+    cache = MetadataCache.from_config(ctx.obj.config)
+
+    print(f"Cache: {cache.filename}")
+    _pretty_print_df(cache.summary())
+
+
+@app.command()
+def prune(
+    ctx: typer.Context,
+    all_: Annotated[bool, typer.Option("--all", help="Remove every entry from the cache")] = False,
+) -> None:
+    """
+    Remove the cached metadata for files that have been modified or deleted
+    """
+    cache = MetadataCache.from_config(ctx.obj.config)
+
+    removed = cache.prune(clear=all_)
+    print(f"Removed {removed} entries from the cache")
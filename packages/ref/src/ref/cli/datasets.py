@@ -3,19 +3,29 @@ View and ingest input datasets
 """
 
 import errno
+import hashlib
 import os
+from collections.abc import Iterable
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any
 
+import click
 import pandas as pd
 import typer
 from loguru import logger
 from ref_core.datasets import SourceDatasetType
+from ref_core.exceptions import RefException
 from rich import box
 from rich.console import Console
 from rich.table import Table
 
+from ref.database import Database
 from ref.datasets import get_dataset_adapter
+from ref.datasets.base import DatasetAdapter
+from ref.datasets.cache import MetadataCache
+from ref.datasets.changelog import latest_change
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.datasets.journal import IngestJournal, Quarantine
 from ref.models import Dataset
 from ref.solver import solve_metrics
 
@@ -103,63 +113,365 @@ def list_columns(
         print(column)
 
 
+def _register_catalog(  # noqa: PLR0913
+    ctx: typer.Context,
+    adapter: DatasetAdapter,
+    data_catalog: pd.DataFrame,
+    dry_run: bool,
+    chunk_size: int,
+    stat_files: bool = True,
+) -> int:
+    """
+    Register the datasets in a data catalog
+
+    Returns the number of datasets that were added or updated
+    """
+    config = ctx.obj.config
+    db = ctx.obj.database
+
+    if dry_run:
+        for instance_id in data_catalog[adapter.slug_column].unique():
+            dataset = db.session.query(Dataset).filter_by(slug=instance_id).first()
+            if not dataset:
+                logger.info(f"Would save dataset {instance_id} to the database")
+        return 0
+
+    return len(
+        adapter.register_datasets(config, db, data_catalog, chunk_size=chunk_size, stat_files=stat_files)
+    )
+
+
+def _check_inputs(roots: list[Path], manifest: Path | None, from_catalog: Path | None) -> None:
+    """
+    Check that the datasets to ingest were specified using one of paths, a manifest or a catalog and exist
+    """
+    sources = {"--manifest": manifest, "--from-catalog": from_catalog}
+    for option, source in sources.items():
+        if source is None:
+            continue
+
+        logger.info(f"ingesting files listed in {source}")
+        if roots or any(other is not None for other in sources.values() if other is not source):
+            logger.error("Only one of files and directories, --manifest or --from-catalog can be used")
+            raise typer.Exit(1)
+        if not source.exists():
+            logger.error(f"File {source} specified by {option} does not exist")
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), source)
+        return
+
+    if not roots:
+        logger.error("A file or directory, --manifest or --from-catalog must be specified")
+        raise typer.Exit(1)
+
+    logger.info(f"ingesting {', '.join(str(root) for root in roots)}")
+    for root in roots:
+        if not root.exists():
+            logger.error(f"File or directory {root} does not exist")
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), root)
+
+
+def _journal_path(ctx: typer.Context, source_type: SourceDatasetType, sources: list[Path]) -> Path:
+    """
+    Get the path of the journal for an ingestion
+
+    The journal is keyed by the source type and the inputs
+    so that a resumed ingestion only picks up the progress of a matching run.
+    """
+    key = "\n".join([source_type.value, *sorted(str(source.resolve()) for source in sources)])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return Path(ctx.obj.config.paths.log) / "ingest" / f"{source_type.value}-{digest}.jsonl"
+
+
+def _register_batch(  # noqa: PLR0913
+    ctx: typer.Context,
+    adapter: DatasetAdapter,
+    data_catalog: pd.DataFrame,
+    quarantine: Quarantine | None,
+    chunk_size: int,
+    stat_files: bool,
+) -> int:
+    """
+    Register a batch of datasets, quarantining the files of any datasets that can't be registered
+
+    If registering the batch fails, the datasets are registered one at a time
+    so that a single bad dataset doesn't abort the ingestion.
+    Without a quarantine, the error of the first dataset that can't be registered is raised.
+    """
+    try:
+        return _register_catalog(ctx, adapter, data_catalog, False, chunk_size, stat_files=stat_files)
+    except (RefException, ValueError, OSError) as exc:
+        logger.warning(f"Failed to register batch ({exc}), registering the datasets individually")
+
+    n_registered = 0
+    for _, dataset in data_catalog.groupby(adapter.slug_column, sort=False):
+        try:
+            n_registered += _register_catalog(ctx, adapter, dataset, False, 1, stat_files=stat_files)
+        except (RefException, ValueError, OSError) as exc:
+            if quarantine is None:
+                raise
+            for path in dataset["path"]:
+                quarantine.add(str(path), "register", str(exc))
+    return n_registered
+
+
+def _ingest_batches(  # noqa: PLR0913
+    ctx: typer.Context,
+    adapter: DatasetAdapter,
+    batches: Iterable[pd.DataFrame],
+    journal: IngestJournal | None,
+    quarantine: Quarantine | None,
+    *,
+    skip_invalid: bool,
+    dry_run: bool,
+    chunk_size: int,
+    stat_files: bool,
+) -> int:
+    """
+    Validate and register batches of datasets
+
+    Once a batch has been registered, its directories and datasets are recorded in the journal.
+
+    Returns the number of datasets that were added or updated
+    """
+    n_files = n_datasets = n_registered = 0
+    for batch in batches:
+        if journal is not None and journal.datasets:
+            batch = batch[~batch[adapter.slug_column].isin(journal.datasets)]  # noqa: PLW2901
+        data_catalog = adapter.validate_data_catalog(batch, skip_invalid=skip_invalid)
+        n_files += len(data_catalog)
+        n_datasets += data_catalog[adapter.slug_column].nunique()
+
+        if dry_run:
+            _register_catalog(ctx, adapter, data_catalog, dry_run, chunk_size)
+        else:
+            n_registered += _register_batch(ctx, adapter, data_catalog, quarantine, chunk_size, stat_files)
+
+        if journal is not None and not dry_run:
+            # The directories are only used to skip crawling, which doesn't apply to a data catalog
+            directories = {os.path.dirname(path) for path in batch["path"]} if stat_files else set()
+            journal.record(directories, batch[adapter.slug_column].unique())
+        logger.info(f"Processed {n_files} files for {n_datasets} datasets")
+
+    if quarantine is not None and quarantine.n_files:
+        logger.warning(f"{quarantine.n_files} files were quarantined, see {quarantine.filename}")
+    return n_registered
+
+
+def _latest_change(db: Database) -> int:
+    with db.session.begin():
+        return latest_change(db)
+
+
 @app.command()
 def ingest(  # noqa: PLR0913
     ctx: typer.Context,
-    file_or_directory: Path,
+    file_or_directory: Annotated[
+        list[Path] | None, typer.Argument(help="Files or directories containing the datasets")
+    ] = None,
+    *,
     source_type: Annotated[SourceDatasetType, typer.Option(help="Type of source dataset")],
     solve: Annotated[bool, typer.Option(help="Solve for new metric executions after ingestion")] = False,
     dry_run: Annotated[bool, typer.Option(help="Do not ingest datasets into the database")] = False,
     n_jobs: Annotated[int | None, typer.Option(help="Number of jobs to run in parallel")] = None,
+    n_threads: Annotated[
+        int | None, typer.Option(help="Number of directories to list concurrently when finding files")
+    ] = None,
+    follow_symlinks: Annotated[
+        bool, typer.Option(help="Follow symbolic links to directories when finding files")
+    ] = False,
+    manifest: Annotated[
+        Path | None,
+        typer.Option(help="File containing a list of the files to ingest, one per line, instead of crawling"),
+    ] = None,
     skip_invalid: Annotated[
         bool, typer.Option(help="Ignore (but log) any datasets that don't pass validation")
     ] = False,
+    incremental: Annotated[
+        bool, typer.Option(help="Only parse files that are new or have changed since the last ingestion")
+    ] = False,
+    chunk_size: Annotated[
+        int, typer.Option(help="Number of datasets to register in each database transaction")
+    ] = 1000,
+    use_cache: Annotated[
+        bool,
+        typer.Option(
+            "--cache/--no-cache", help="Cache the metadata of each file and reuse it in later ingestions"
+        ),
+    ] = False,
+    from_catalog: Annotated[
+        Path | None,
+        typer.Option(
+            help="Existing data catalog (CSV or Parquet) to ingest instead of parsing the files. "
+            "The files in the catalog are not accessed"
+        ),
+    ] = None,
+    stream: Annotated[
+        bool, typer.Option(help="Parse, validate and register the datasets in batches of files")
+    ] = False,
+    batch_size: Annotated[
+        int, typer.Option(help="Approximate number of files in each batch when using --stream")
+    ] = 10_000,
+    parser: Annotated[
+        str | None,
+        typer.Option(
+            help="Parser used to extract the metadata. "
+            "For CMIP6 datasets, 'drs' reads the facets from the path instead of opening every file",
+            click_type=click.Choice(CMIP6DatasetAdapter.parsers),
+        ),
+    ] = None,
+    resume: Annotated[
+        bool,
+        typer.Option(help="Continue an interrupted ingestion of the same inputs. Implies --stream"),
+    ] = False,
 ) -> None:
     """
     Ingest a dataset
 
     This will register a dataset in the database to be used for metrics calculations.
+
+    The files are found by crawling one or more directories concurrently,
+    or are read from a `--manifest` (e.g. the output of `lfs find`).
+
+    When `--incremental` is used, the size, modification time and inode of each file are compared
+    against those recorded during a previous ingestion and unchanged files are skipped.
+
+    When `--parser drs` is used, the metadata for CMIP6 files is extracted from the directory structure
+    and filename and only one file per dataset is opened to read the remaining attributes.
+
+    When `--cache` is used, the metadata parsed from each file is cached in `config.paths.cache`
+    and reused until the file is modified. See `ref cache`.
+
+    When `--stream` is used, the files are discovered, parsed, validated and registered
+    in batches of complete datasets so that memory usage doesn't grow with the size of the archive.
+
+    When `--from-catalog` is used, the metadata is read in batches from an existing data catalog
+    (e.g. an intake-esm catalog) and the files themselves are never accessed.
+
+    While streaming, the directories and datasets in each registered batch are recorded in a journal
+    in `config.paths.log`. If the ingestion is interrupted, `--resume` skips the work that was completed.
+    Files that can't be parsed or registered are written to a quarantine report next to the journal
+    instead of aborting the ingestion.
     """
     config = ctx.obj.config
     db = ctx.obj.database
 
-    file_or_directory = Path(file_or_directory).expanduser()
-    logger.info(f"ingesting {file_or_directory}")
+    roots = [Path(path).expanduser() for path in file_or_directory or []]
+    manifest = manifest.expanduser() if manifest else None
+    from_catalog = from_catalog.expanduser() if from_catalog else None
+    _check_inputs(roots, manifest, from_catalog)
 
-    kwargs = {}
+    # Options that aren't provided use the defaults of the adapter
+    options = {"n_jobs": n_jobs, "n_threads": n_threads, "parser": parser}
+    kwargs: dict[str, Any] = {key: value for key, value in options.items() if value is not None}
 
-    if n_jobs is not None:
-        kwargs["n_jobs"] = n_jobs
+    if follow_symlinks:
+        kwargs["follow_symlinks"] = follow_symlinks
+    if use_cache:
+        kwargs["cache"] = MetadataCache.from_config(config)
+
+    stream = stream or resume or from_catalog is not None
+    journal_path = _journal_path(ctx, source_type, [*roots, *filter(None, [manifest, from_catalog])])
+    # Only a streamed ingestion writes a quarantine report, and a dry run doesn't write anything
+    quarantine = None
+    if stream and not dry_run:
+        quarantine = Quarantine.open(journal_path.with_suffix(".quarantine.csv"), resume=resume)
+        kwargs["quarantine"] = quarantine
 
     adapter = get_dataset_adapter(source_type.value, **kwargs)
 
-    # Create a data catalog from the specified file or directory
-    if not file_or_directory.exists():
-        logger.error(f"File or directory {file_or_directory} does not exist")
-        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_or_directory)
+    # Only solve for the datasets changed by this ingestion.
+    # A resumed ingestion solves for everything as the interrupted run may not have solved for its datasets
+    since = _latest_change(db) if solve and not (dry_run or resume) else None
 
-    data_catalog = adapter.find_local_datasets(file_or_directory)
-    data_catalog = adapter.validate_data_catalog(data_catalog, skip_invalid=skip_invalid)
+    known_files = None
+    if incremental:
+        with db.session.begin():
+            known_files = adapter.load_file_fingerprints(config, db)
 
-    logger.info(
-        f"Found {len(data_catalog)} files for {len(data_catalog[adapter.slug_column].unique())} datasets"
-    )
-    _pretty_print_df(adapter.pretty_subset(data_catalog))
+    if stream:
+        journal = None if dry_run else IngestJournal.open(journal_path, resume=resume)
+        if from_catalog is not None:
+            batches = adapter.iter_catalog_file(from_catalog, batch_size=batch_size)
+        else:
+            batches = adapter.iter_local_datasets(
+                roots,
+                known_files=known_files,
+                batch_size=batch_size,
+                manifest=manifest,
+                skip_directories=journal.directories if journal else None,
+            )
+
+        n_registered = _ingest_batches(
+            ctx,
+            adapter,
+            batches,
+            journal,
+            quarantine,
+            skip_invalid=skip_invalid,
+            dry_run=dry_run,
+            chunk_size=chunk_size,
+            stat_files=from_catalog is None,
+        )
+    else:
+        data_catalog = adapter.find_local_datasets(roots, known_files=known_files, manifest=manifest)
+        data_catalog = adapter.validate_data_catalog(data_catalog, skip_invalid=skip_invalid)
 
-    for instance_id, data_catalog_dataset in data_catalog.groupby(adapter.slug_column):
-        logger.info(f"Processing dataset {instance_id}")
+        n_files = len(data_catalog)
+        n_datasets = data_catalog[adapter.slug_column].nunique()
+        logger.info(f"Found {n_files} files for {n_datasets} datasets")
+        _pretty_print_df(adapter.pretty_subset(data_catalog))
 
-        if dry_run:
-            dataset = db.session.query(Dataset).filter_by(slug=instance_id, dataset_type=source_type).first()
-            if not dataset:
-                logger.info(f"Would save dataset {instance_id} to the database")
-                continue
-        else:
-            with db.session.begin():
-                adapter.register_dataset(config, db, data_catalog_dataset)
+        n_registered = _register_catalog(ctx, adapter, data_catalog, dry_run, chunk_size)
+
+    if not dry_run:
+        logger.info(f"Added or updated {n_registered} datasets")
 
     if solve:
-        solve_metrics(
-            db=db,
-            dry_run=dry_run,
-        )
+        solve_metrics(db=db, dry_run=dry_run, config=config, since=since)
+
+
+@app.command()
+def reconcile(
+    ctx: typer.Context,
+    source_type: Annotated[
+        SourceDatasetType, typer.Option(help="Type of source dataset")
+    ] = SourceDatasetType.CMIP6.value,  # type: ignore
+    n_threads: Annotated[int, typer.Option(help="Number of files to check concurrently")] = 8,
+    dry_run: Annotated[bool, typer.Option(help="Report the changes without updating the database")] = False,
+    solve: Annotated[bool, typer.Option(help="Solve for metric executions after reconciling")] = False,
+) -> None:
+    """
+    Reconcile the ingested datasets with the files in the data directory
+
+    Every tracked file is checked against the size, modification time and inode recorded when it was
+    ingested. Files that have been deleted are removed and datasets without any remaining files are retracted.
+    Files that have been modified are parsed and registered again.
+
+    The metric executions that used an updated or retracted dataset are marked as dirty
+    so that they are rerun by the next `ref solve`.
+    """
+    config = ctx.obj.config
+    db = ctx.obj.database
+
+    adapter = get_dataset_adapter(source_type.value)
+
+    since = _latest_change(db) if solve and not dry_run else None
+
+    result = adapter.reconcile_datasets(config, db, n_threads=n_threads, dry_run=dry_run)
+
+    for path in result.missing_files:
+        logger.info(f"Missing file: {path}")
+    for path in result.modified_files:
+        logger.info(f"Modified file: {path}")
+    for slug in result.retracted_datasets:
+        logger.info(f"{'Would retract' if dry_run else 'Retracted'} dataset {slug}")
+
+    logger.info(
+        f"Found {len(result.missing_files)} missing and {len(result.modified_files)} modified files. "
+        f"{len(result.updated_datasets)} datasets updated and {len(result.retracted_datasets)} retracted"
+    )
+    if not dry_run:
+        logger.info(f"Marked {result.n_dirty_executions} metric executions as dirty")
+
+    if solve:
+        solve_metrics(db=db, dry_run=dry_run, config=config, since=since)
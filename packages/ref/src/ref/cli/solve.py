@@ -9,12 +9,18 @@ app = typer.Typer()
 def solve(
     ctx: typer.Context,
     dry_run: bool = typer.Option(False, help="Do not execute any metrics"),
+    n_jobs: int = typer.Option(1, "--jobs", help="Number of processes used to solve the metrics"),
 ) -> None:
     """
     Solve for metrics that require recalculation
 
     This may trigger a number of additional calculations depending on what data has been ingested
     since the last solve.
+
+    The data catalog is loaded from a snapshot in `config.paths.tmp`
+    unless the datasets have changed since the snapshot was written.
+
+    With `--jobs`, the data catalog is shared with a pool of processes that solve the metrics in parallel.
     """
     with ctx.obj.database.session.begin():
-        solve_metrics(ctx.obj.database, dry_run=dry_run)
+        solve_metrics(ctx.obj.database, dry_run=dry_run, config=ctx.obj.config, n_jobs=n_jobs)
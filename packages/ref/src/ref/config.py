@@ -37,6 +37,7 @@ class Paths:
     data: Path = field(converter=Path)
     log: Path = field(converter=Path)
     tmp: Path = field(converter=Path)
+    cache: Path = field(converter=Path)
 
     # TODO: this should probably default to False,
     # but we don't have an easy way to update cong
@@ -54,6 +55,10 @@ class Paths:
     def _tmp_factory(self) -> Path:
         return env.path("REF_CONFIGURATION") / "tmp"
 
+    @cache.default
+    def _cache_factory(self) -> Path:
+        return env.path("REF_CONFIGURATION") / "cache"
+
 
 @define
 class Db:
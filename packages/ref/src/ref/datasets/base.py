@@ -1,11 +1,17 @@
+from collections.abc import Collection, Container, Iterable, Iterator, Mapping, Sequence
 from pathlib import Path
 from typing import Protocol
 
 import pandas as pd
 from loguru import logger
+from ref_core.datasets import SourceDatasetType
+from ref_core.metrics import DataRequirement
 
 from ref.config import Config
 from ref.database import Database
+from ref.datasets.catalog import CatalogWatermark
+from ref.datasets.reconcile import ReconcileResult
+from ref.datasets.utils import FileFingerprint
 from ref.models.dataset import Dataset
 
 
@@ -40,6 +46,7 @@ class DatasetAdapter(Protocol):
     """
 
     dataset_cls: type[Dataset]
+    source_type: SourceDatasetType
     slug_column: str
     dataset_specific_metadata: tuple[str, ...]
     file_specific_metadata: tuple[str, ...] = ()
@@ -50,12 +57,67 @@ class DatasetAdapter(Protocol):
         """
         ...
 
-    def find_local_datasets(self, file_or_directory: Path) -> pd.DataFrame:
+    def find_local_datasets(
+        self,
+        file_or_directory: Path | Sequence[Path],
+        known_files: Mapping[str, FileFingerprint] | None = None,
+        manifest: Path | None = None,
+    ) -> pd.DataFrame:
         """
-        Generate a data catalog from the specified file or directory
+        Generate a data catalog from the specified files or directories
 
         This data catalog should contain all the metadata needed by the database.
         The index of the data catalog should be the dataset slug.
+
+        Files in `known_files` whose fingerprint is unchanged are not parsed
+        and are excluded from the data catalog.
+        If a `manifest` is provided, the files listed in it are used instead of crawling `file_or_directory`.
+        """
+        ...
+
+    def iter_local_datasets(
+        self,
+        file_or_directory: Path | Sequence[Path],
+        known_files: Mapping[str, FileFingerprint] | None = None,
+        batch_size: int = 10_000,
+        manifest: Path | None = None,
+        skip_directories: Container[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Generate data catalogs from the specified files or directories in batches
+
+        Each batch contains approximately `batch_size` files and only complete datasets,
+        so that a batch can be validated and registered independently of the others.
+        Files in `skip_directories` are ignored.
+        """
+        ...
+
+    def iter_catalog_file(self, filename: Path, batch_size: int = 10_000) -> Iterator[pd.DataFrame]:
+        """
+        Read an existing data catalog file in batches
+
+        Each batch only contains complete datasets.
+        The files in the data catalog are not accessed.
+        """
+        ...
+
+    def load_file_fingerprints(self, config: Config, db: Database) -> dict[str, FileFingerprint]:
+        """
+        Load the fingerprints of the files that have already been ingested
+
+        The keys are the paths to the files.
+        Paths that are relative to the data directory are resolved against `config.paths.data`.
+        """
+        ...
+
+    def reconcile_datasets(
+        self, config: Config, db: Database, n_threads: int = 8, dry_run: bool = False
+    ) -> ReconcileResult:
+        """
+        Reconcile the ingested datasets with the files in the data directory
+
+        Datasets with missing or modified files are updated or retracted
+        and the metric executions that used them are marked as dirty.
         """
         ...
 
@@ -67,6 +129,27 @@ class DatasetAdapter(Protocol):
         """
         ...
 
+    def register_datasets(
+        self,
+        config: Config,
+        db: Database,
+        data_catalog: pd.DataFrame,
+        chunk_size: int = 1000,
+        stat_files: bool = True,
+    ) -> list[str]:
+        """
+        Register all the datasets in a data catalog using bulk operations
+
+        The datasets are committed to the database in chunks of `chunk_size` datasets.
+        If `stat_files` is False, the files are not accessed and their fingerprints aren't recorded.
+
+        Returns
+        -------
+        :
+            Slugs of the datasets that were added or modified
+        """
+        ...
+
     def validate_data_catalog(self, data_catalog: pd.DataFrame, skip_invalid: bool = False) -> pd.DataFrame:
         """
         Validate a data catalog
@@ -114,8 +197,14 @@ class DatasetAdapter(Protocol):
 
         return data_catalog
 
-    def load_catalog(
-        self, db: Database, include_files: bool = True, limit: int | None = None
+    def load_catalog(  # noqa: PLR0913
+        self,
+        db: Database,
+        include_files: bool = True,
+        limit: int | None = None,
+        requirements: Iterable[DataRequirement] | None = None,
+        columns: Collection[str] | None = None,
+        since: CatalogWatermark | None = None,
     ) -> pd.DataFrame:
         """
         Load the data catalog from the database
@@ -123,9 +212,28 @@ class DatasetAdapter(Protocol):
         The index of the data catalog is the primary key of the dataset.
         This should be maintained during any processing.
 
+        If `requirements` are provided, datasets that can't match any of them may be excluded.
+        If `columns` are provided, only those columns and the slug and path columns are loaded.
+        If `since` is provided, only the datasets that have changed since then are loaded.
+
         Returns
         -------
         :
             Data catalog containing the metadata for the currently ingested datasets
         """
         ...
+
+    def iter_catalog(
+        self,
+        db: Database,
+        include_files: bool = True,
+        chunk_size: int = 1000,
+        order_by: str = "id",
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load the data catalog from the database in chunks of at most `chunk_size` datasets
+
+        The datasets are ordered by the non-nullable `order_by` column and then by their primary key.
+        All the files for a dataset are in the same chunk.
+        """
+        ...
@@ -0,0 +1,216 @@
+"""
+Persistent cache of the metadata parsed from dataset files
+
+Opening every file to read its attributes is the most expensive part of
+[find_local_datasets][ref.datasets.base.DatasetAdapter.find_local_datasets].
+The files in an archive rarely change, so the parsed metadata is stored in a SQLite database
+under `config.paths.cache` and reused between ingestions and databases.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+from loguru import logger
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, delete, func, select, tuple_
+
+from ref.config import Config
+from ref.datasets.utils import FileFingerprint, chunked
+
+_metadata = MetaData()
+
+_entries = Table(
+    "file_metadata",
+    _metadata,
+    Column("parser", String, primary_key=True),
+    Column("path", String, primary_key=True),
+    Column("size", Integer, nullable=False),
+    Column("mtime", Float, nullable=False),
+    Column("inode", Integer, nullable=False),
+    Column("metadata", Text, nullable=False),
+)
+
+# Keep the number of bound parameters per query below the SQLite limit
+_QUERY_CHUNK_SIZE = 500
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _is_stale(row: sqlalchemy.Row[Any]) -> bool:
+    """
+    Check if the file for a cache entry has been modified or deleted since it was cached
+    """
+    try:
+        fingerprint = FileFingerprint.from_path(row.path)
+    except FileNotFoundError:
+        return True
+
+    return fingerprint != FileFingerprint(size=row.size, mtime=row.mtime, inode=row.inode)
+
+
+class MetadataCache:
+    """
+    Cache of the metadata extracted from files
+
+    Entries are keyed by the name of the parser and the path of the file.
+    The fingerprint of the file is stored alongside its metadata
+    and an entry is evicted if the file has changed since it was parsed.
+    """
+
+    def __init__(self, filename: Path) -> None:
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        self.filename = filename
+        self._engine = sqlalchemy.create_engine(f"sqlite:///{filename}")
+        _metadata.create_all(self._engine)
+
+    @staticmethod
+    def from_config(config: Config) -> MetadataCache:
+        """
+        Open the cache in the cache directory of a configuration
+
+        Parameters
+        ----------
+        config
+            Configuration object
+
+        Returns
+        -------
+        :
+            The metadata cache
+        """
+        return MetadataCache(config.paths.cache / "metadata.db")
+
+    def get_many(self, parser: str, paths: Sequence[str]) -> dict[str, dict[str, Any]]:
+        """
+        Get the cached metadata for a collection of files
+
+        Entries for files that have been modified since they were cached are removed.
+
+        Parameters
+        ----------
+        parser
+            Name of the parser that produced the metadata
+        paths
+            Paths of the files
+
+        Returns
+        -------
+        :
+            Cached metadata for each file that has a valid entry in the cache
+        """
+        hits: dict[str, dict[str, Any]] = {}
+        stale = []
+        with self._engine.begin() as connection:
+            for chunk in chunked(paths, _QUERY_CHUNK_SIZE):
+                rows = connection.execute(
+                    select(_entries).where(_entries.c.parser == parser, _entries.c.path.in_(chunk))
+                )
+                for row in rows:
+                    if _is_stale(row):
+                        stale.append(row.path)
+                    else:
+                        hits[row.path] = json.loads(row.metadata)
+
+            for chunk in chunked(stale, _QUERY_CHUNK_SIZE):
+                connection.execute(
+                    delete(_entries).where(_entries.c.parser == parser, _entries.c.path.in_(chunk))
+                )
+
+        logger.debug(f"Found cached metadata for {len(hits)}/{len(paths)} files ({len(stale)} stale)")
+        return hits
+
+    def set_many(self, parser: str, entries: Iterable[dict[str, Any]]) -> None:
+        """
+        Store the metadata for a collection of files
+
+        Parameters
+        ----------
+        parser
+            Name of the parser that produced the metadata
+        entries
+            Metadata for each file.
+
+            The path to the file is read from the `path` key.
+        """
+        rows = []
+        for entry in entries:
+            fingerprint = FileFingerprint.from_path(entry["path"])
+            rows.append(
+                {
+                    "parser": parser,
+                    "path": str(entry["path"]),
+                    "size": fingerprint.size,
+                    "mtime": fingerprint.mtime,
+                    "inode": fingerprint.inode,
+                    "metadata": json.dumps(entry, default=_to_json),
+                }
+            )
+
+        if not rows:
+            return
+
+        with self._engine.begin() as connection:
+            connection.execute(_entries.insert().prefix_with("OR REPLACE"), rows)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Summarise the contents of the cache
+
+        Returns
+        -------
+        :
+            Number of entries and the total size of the cached files for each parser
+        """
+        with self._engine.connect() as connection:
+            rows = connection.execute(
+                select(
+                    _entries.c.parser,
+                    func.count().label("files"),
+                    func.sum(_entries.c.size).label("total_size"),
+                ).group_by(_entries.c.parser)
+            ).all()
+
+        return pd.DataFrame(rows, columns=["parser", "files", "total_size"])
+
+    def prune(self, clear: bool = False) -> int:
+        """
+        Remove entries from the cache
+
+        Parameters
+        ----------
+        clear
+            If True, remove every entry.
+
+            Otherwise, only remove the entries for files that have been modified or deleted
+            since they were cached.
+
+        Returns
+        -------
+        :
+            Number of entries that were removed
+        """
+        with self._engine.begin() as connection:
+            if clear:
+                return connection.execute(delete(_entries)).rowcount
+
+            columns = ["parser", "path", "size", "mtime", "inode"]
+            rows = connection.execute(select(*(_entries.c[column] for column in columns)))
+            stale = [(row.parser, row.path) for row in rows if _is_stale(row)]
+
+            for chunk in chunked(stale, _QUERY_CHUNK_SIZE):
+                key = tuple_(_entries.c.parser, _entries.c.path)
+                connection.execute(delete(_entries).where(key.in_(chunk)))
+
+        return len(stale)
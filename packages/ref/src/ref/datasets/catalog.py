@@ -0,0 +1,202 @@
+"""
+In-memory data catalogs that can be refreshed incrementally
+
+Long-running processes (e.g. a notebook or a service) keep a data catalog in memory.
+Rather than reloading the complete catalog to pick up changes,
+only the datasets that have been added, modified or retracted since the catalog was loaded
+are queried and merged into the existing catalog.
+
+The changes are found using the log of dataset changes (see [ref.datasets.changelog][]).
+The sequence number of the most recent change is recorded when the catalog is loaded,
+and the datasets with a later change are reloaded when it is refreshed.
+Unlike timestamps, the sequence numbers never go backwards
+and don't depend on the clock or the precision of the database.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Sequence
+from typing import TYPE_CHECKING
+
+import pandas as pd
+from attrs import define, frozen
+from loguru import logger
+from pandas.api.types import union_categoricals
+from ref_core.metrics import DataRequirement
+from sqlalchemy import ColumnElement, select
+
+from ref.database import Database
+from ref.datasets.changelog import latest_change
+from ref.models.dataset import Dataset, DatasetChange
+
+if TYPE_CHECKING:
+    from ref.datasets.base import DatasetAdapter
+    from ref.datasets.snapshot import CatalogSnapshots
+
+
+@frozen
+class CatalogWatermark:
+    """
+    Position in the log of dataset changes
+    """
+
+    seq: int
+    """
+    Sequence number of the most recent change or 0 if no changes have been recorded
+    """
+
+    @classmethod
+    def from_db(cls, db: Database) -> CatalogWatermark:
+        """
+        Get the current watermark of the datasets
+
+        Parameters
+        ----------
+        db
+            Database instance
+
+        Returns
+        -------
+        :
+            The current watermark
+        """
+        return cls(seq=latest_change(db))
+
+    def changed_clause(self) -> ColumnElement[bool]:
+        """
+        Build a predicate for the datasets that have changed since the watermark
+
+        Returns
+        -------
+        :
+            Predicate on the columns of the `dataset` table
+        """
+        return Dataset.id.in_(select(DatasetChange.dataset_id).where(DatasetChange.seq > self.seq))
+
+
+def _concat_catalogs(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate data catalogs, preserving categorical columns
+
+    Categorical columns are only preserved by `pd.concat` if their categories are identical.
+    The categories are sorted to match those of a freshly loaded data catalog.
+    """
+    frames = [frame.copy() for frame in frames]
+    for column in frames[0].columns:
+        dtypes = [frame[column].dtype for frame in frames]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            categories = union_categoricals(
+                [frame[column] for frame in frames], sort_categories=True
+            ).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+
+    return pd.concat(frames)
+
+
+@define
+class DataCatalog:
+    """
+    Data catalog of a source type that is kept in memory
+
+    See [load_catalog][ref.datasets.base.DatasetAdapter.load_catalog] for the contents of the catalog.
+    """
+
+    adapter: DatasetAdapter
+    data: pd.DataFrame
+    """
+    The data catalog
+    """
+    watermark: CatalogWatermark
+    """
+    Watermark of the datasets when the catalog was last loaded or refreshed
+    """
+    requirements: Sequence[DataRequirement] | None = None
+    """
+    Data requirements used to reduce the datasets that are loaded
+    """
+    columns: Collection[str] | None = None
+    """
+    Columns that are loaded
+    """
+
+    @classmethod
+    def load(
+        cls,
+        db: Database,
+        adapter: DatasetAdapter,
+        requirements: Sequence[DataRequirement] | None = None,
+        columns: Collection[str] | None = None,
+        snapshots: CatalogSnapshots | None = None,
+    ) -> DataCatalog:
+        """
+        Load the data catalog of a source type
+
+        Parameters
+        ----------
+        db
+            Database instance
+        adapter
+            Adapter for the source type
+        requirements
+            Data requirements used to reduce the datasets that are loaded
+        columns
+            Columns to load
+        snapshots
+            If provided, the data catalog is loaded from a snapshot if it is current
+
+        Returns
+        -------
+        :
+            The data catalog
+        """
+        # The watermark is read first so that any changes made while loading are picked up by a refresh
+        watermark = CatalogWatermark.from_db(db)
+        if snapshots is None:
+            data = adapter.load_catalog(db, requirements=requirements, columns=columns)
+        else:
+            data = snapshots.load_catalog(db, adapter, requirements, columns=columns)
+
+        return cls(
+            adapter=adapter, data=data, watermark=watermark, requirements=requirements, columns=columns
+        )
+
+    def refresh(self, db: Database) -> int:
+        """
+        Update the data catalog with the datasets that have changed since it was loaded
+
+        Datasets that have been added or modified are (re)loaded from the database
+        and retracted datasets are removed, without reloading the complete data catalog.
+
+        Parameters
+        ----------
+        db
+            Database instance
+
+        Returns
+        -------
+        :
+            Number of datasets that were reloaded or removed
+        """
+        watermark = CatalogWatermark.from_db(db)
+        changed_ids = set(
+            db.session.execute(
+                select(Dataset.id).where(
+                    Dataset.dataset_type == self.adapter.source_type, self.watermark.changed_clause()
+                )
+            ).scalars()
+        )
+        if changed_ids:
+            changes = self.adapter.load_catalog(
+                db, requirements=self.requirements, columns=self.columns, since=self.watermark
+            )
+            # Datasets that changed between the two queries are in `changes`, but not `changed_ids`
+            changed_ids.update(changes.index)
+            unchanged = self.data[~self.data.index.isin(list(changed_ids))]
+
+            # The most recently updated datasets are at the start of the catalog
+            self.data = _concat_catalogs([changes, unchanged]) if len(changes) else unchanged
+            logger.debug(f"Refreshed the data catalog with {len(changed_ids)} changed datasets")
+
+        self.watermark = watermark
+        return len(changed_ids)
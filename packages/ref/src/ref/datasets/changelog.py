@@ -0,0 +1,118 @@
+"""
+Log of the changes to the datasets
+
+Every dataset that is added, modified or retracted is recorded in the `dataset_change` table
+with an increasing sequence number.
+This allows work, such as solving for metric executions, to be limited to the datasets
+that changed since a given sequence number rather than the whole archive.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Iterable, Sequence
+from typing import Any
+
+import pandas as pd
+from sqlalchemy import func, insert, inspect, select
+
+from ref.database import Database
+from ref.datasets.utils import chunked
+from ref.models.dataset import Dataset, DatasetChange, DatasetChangeType
+
+
+def record_changes(db: Database, dataset_ids: Iterable[int], change: DatasetChangeType) -> None:
+    """
+    Record changes to a collection of datasets
+
+    Parameters
+    ----------
+    db
+        Database instance
+    dataset_ids
+        Ids of the datasets that changed
+    change
+        Type of change
+    """
+    rows = [{"dataset_id": dataset_id, "change": change} for dataset_id in dataset_ids]
+    if rows:
+        db.session.execute(insert(DatasetChange), rows)
+
+
+def latest_change(db: Database) -> int:
+    """
+    Get the sequence number of the most recent change
+
+    Parameters
+    ----------
+    db
+        Database instance
+
+    Returns
+    -------
+    :
+        Sequence number of the most recent change or 0 if no changes have been recorded
+    """
+    return db.session.execute(select(func.max(DatasetChange.seq))).scalar() or 0
+
+
+def changed_datasets(db: Database, since: int) -> set[int]:
+    """
+    Find the datasets that have changed since a sequence number
+
+    Parameters
+    ----------
+    db
+        Database instance
+    since
+        Sequence number of the last change that has already been processed
+
+    Returns
+    -------
+    :
+        Ids of the datasets that were added, modified or retracted after `since`
+    """
+    return set(
+        db.session.execute(
+            select(DatasetChange.dataset_id).where(DatasetChange.seq > since).distinct()
+        ).scalars()
+    )
+
+
+def load_facets(
+    db: Database, dataset_cls: type[Dataset], dataset_ids: Collection[int], facets: Sequence[str]
+) -> pd.DataFrame | None:
+    """
+    Load the values of some facets for a collection of datasets
+
+    Retracted datasets are included.
+
+    Parameters
+    ----------
+    db
+        Database instance
+    dataset_cls
+        Model of the datasets of a source type.
+
+        Ids of datasets of other source types are ignored.
+    dataset_ids
+        Ids of the datasets
+    facets
+        Names of the facets
+
+    Returns
+    -------
+    :
+        Values of the facets for each dataset or None if a facet isn't a column of the table of `dataset_cls`
+    """
+    table = inspect(dataset_cls).local_table
+    if any(facet not in table.c for facet in facets):
+        return None
+
+    rows: list[Any] = []
+    for chunk in chunked(list(dataset_ids), 500):
+        rows.extend(
+            db.session.execute(
+                select(*(table.c[facet] for facet in facets)).where(table.c.id.in_(chunk))
+            ).all()
+        )
+    return pd.DataFrame(rows, columns=list(facets))
@@ -1,64 +1,279 @@
 from __future__ import annotations
 
+import collections
+import itertools
+import os
+import traceback
+from collections.abc import Collection, Container, Iterable, Iterator, Mapping, Sequence
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import ecgtools.parsers
+import numpy as np
 import pandas as pd
+from attrs import evolve
 from ecgtools import Builder
+from ecgtools.builder import INVALID_ASSET, TRACEBACK
 from loguru import logger
+from ref_core.datasets import SourceDatasetType
 from ref_core.exceptions import RefException
-from sqlalchemy.orm import joinedload
+from ref_core.metrics import DataRequirement
+from sqlalchemy import Select, bindparam, delete, func, insert, select, tuple_, update
 
 from ref.config import Config
 from ref.database import Database
 from ref.datasets.base import DatasetAdapter
-from ref.datasets.utils import validate_path
-from ref.models.dataset import CMIP6Dataset, CMIP6File, Dataset
+from ref.datasets.cache import MetadataCache
+from ref.datasets.catalog import CatalogWatermark
+from ref.datasets.changelog import record_changes
+from ref.datasets.crawler import find_files
+from ref.datasets.filters import requirements_clause
+from ref.datasets.journal import Quarantine
+from ref.datasets.reconcile import ReconcileResult, invalidate_executions, stat_files
+from ref.datasets.snapshot import bump_catalog_generation
+from ref.datasets.utils import FileFingerprint, chunked, read_catalog_file, validate_path
+from ref.models.dataset import CMIP6Dataset, CMIP6File, Dataset, DatasetChangeType
+
+DRS_DIRECTORY_ITEMS = (
+    "activity_id",
+    "institution_id",
+    "source_id",
+    "experiment_id",
+    "member_id",
+    "table_id",
+    "variable_id",
+    "grid_label",
+    "version",
+)
+"""
+Facets encoded in the directory structure of the CMIP6 DRS (after the mip_era)
+"""
+
+DRS_FILENAME_ITEMS = ("variable_id", "table_id", "source_id", "experiment_id", "member_id", "grid_label")
+"""
+Facets encoded in the filename of the CMIP6 DRS (before the optional time range)
+"""
+
+
+def _parse_drs_time(value: str) -> str:
+    """
+    Convert a timestamp from a DRS time range into the format used by `parse_cmip6`
+
+    The timestamp may have a precision of between a year (`YYYY`) and a second (`YYYYMMDDhhmmss`).
+    Any missing components are filled with the start of the period.
+    """
+    if not value.isdigit() or len(value) not in (4, 6, 8, 10, 12, 14):
+        raise ValueError(f"Invalid DRS timestamp: {value}")
+
+    padded = value + "00000101000000"[len(value) :]
+    return f"{padded[:4]}-{padded[4:6]}-{padded[6:8]} {padded[8:10]}:{padded[10:12]}:{padded[12:14]}"
+
+
+def parse_cmip6_drs(file: str) -> dict[str, Any]:
+    """
+    Extract the metadata for a CMIP6 file using only its path
+
+    The path is expected to follow the CMIP6 Data Reference Syntax (DRS):
+
+    ```
+    <mip_era>/<activity_id>/<institution_id>/<source_id>/<experiment_id>/<member_id>/
+        <table_id>/<variable_id>/<grid_label>/<version>/
+        <variable_id>_<table_id>_<source_id>_<experiment_id>_<member_id>_<grid_label>[_<time_range>].nc
+    ```
+
+    The file is never opened so the `start_time` and `end_time` are the start of the first and last periods
+    in the time range of the filename rather than the timestamps of the data.
+
+    Parameters
+    ----------
+    file
+        Path to the file
+
+    Returns
+    -------
+    :
+        Metadata for the file.
+
+        If the path doesn't match the DRS the file is marked as invalid
+        using the same convention as the parsers in `ecgtools`.
+    """
+    try:
+        path = Path(file)
+        directory_parts = path.parent.parts[-len(DRS_DIRECTORY_ITEMS) :]
+        filename_parts = path.stem.split("_")
+
+        if len(directory_parts) != len(DRS_DIRECTORY_ITEMS) or len(filename_parts) not in (6, 7):
+            raise ValueError(f"{file} does not follow the CMIP6 DRS")
+
+        info: dict[str, Any] = dict(zip(DRS_DIRECTORY_ITEMS, directory_parts))
+        for key, value in zip(DRS_FILENAME_ITEMS, filename_parts):
+            if info[key] != value:
+                raise ValueError(f"Inconsistent {key} in the directory and filename of {file}")
+
+        # `parse_cmip6` uses the variant_label as the member_id
+        # so any sub-experiment prefix (e.g. s1960-r1i1p1f1) is removed to produce the same instance_id
+        info["member_id"] = info["member_id"].split("-")[-1]
+
+        start_time, end_time = None, None
+        if len(filename_parts) == 7:  # noqa: PLR2004
+            start, _, end = filename_parts[6].removesuffix("-clim").partition("-")
+            start_time, end_time = _parse_drs_time(start), _parse_drs_time(end)
+
+        info["start_time"] = start_time
+        info["end_time"] = end_time
+        info["time_range"] = f"{start_time}-{end_time}" if start_time and end_time else None
+        info["path"] = str(file)
+        return info
+    except Exception:
+        return {INVALID_ASSET: file, TRACEBACK: traceback.format_exc()}
+
+
+_DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f")
 
 
 def _parse_datetime(dt_str: pd.Series[str]) -> pd.Series[datetime | Any]:
     """
     Pandas tries to coerce everything to their own datetime format, which is not what we want here.
+
+    The timestamps in a data catalog are highly repetitive,
+    so only the unique values are parsed and the result is broadcast back to the rows.
+    The unique values are parsed using `pd.to_datetime` for each of the expected formats in turn.
+    Pandas timestamps only cover the years 1677 to 2262,
+    so any remaining values (e.g. the model years of a control run) are parsed one at a time.
     """
 
-    def _inner(date_string: str | None) -> datetime | None:
+    def _inner(date_string: str | datetime | None) -> datetime | None:
         if not date_string:
             return None
 
+        # Catalogs read from Parquet files may already contain timestamps
+        if isinstance(date_string, pd.Timestamp):
+            return date_string.to_pydatetime()
+        if isinstance(date_string, datetime):
+            return date_string
+
         # Try to parse the date string with and without milliseconds
         try:
-            dt = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
+            dt = datetime.strptime(date_string, _DATETIME_FORMATS[0])
         except ValueError:
-            dt = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S.%f")
+            dt = datetime.strptime(date_string, _DATETIME_FORMATS[1])
 
         return dt
 
+    codes, uniques = pd.factorize(dt_str)
+    values = pd.Series(uniques, dtype="object").to_numpy()
+
+    # Missing values have a code of -1 which maps to the trailing None
+    parsed = np.full(len(values) + 1, None, dtype="object")
+    remaining = np.arange(len(values))
+    for date_format in _DATETIME_FORMATS:
+        timestamps = pd.to_datetime(values[remaining], format=date_format, errors="coerce")
+        valid = timestamps.notna()
+        parsed[remaining[valid]] = timestamps[valid].to_pydatetime()
+        remaining = remaining[~valid]
+
+    for i in remaining:
+        parsed[i] = _inner(values[i])
+
     return pd.Series(
-        [_inner(dt) for dt in dt_str],
+        parsed[codes],
         index=dt_str.index,
         dtype="object",
     )
 
 
+def _parse_branch_time(branch_time: pd.Series[Any]) -> pd.Series[float]:
+    """
+    Parse a column of branch times to floats
+
+    EC-Earth3 uses "D" as a suffix for the branch_time_in_child and branch_time_in_parent columns.
+    """
+    codes, uniques = pd.factorize(branch_time, use_na_sentinel=False)
+    parsed = pd.to_numeric(pd.Series(uniques).astype(str).str.replace("D", ""), errors="raise")
+
+    return pd.Series(parsed.to_numpy(dtype=float)[codes], index=branch_time.index, dtype=float)
+
+
 def _apply_fixes(data_catalog: pd.DataFrame) -> pd.DataFrame:
-    def _fix_parent_variant_label(group: pd.DataFrame) -> pd.DataFrame:
-        if group["parent_variant_label"].nunique() == 1:
-            return group
-        group["parent_variant_label"] = group["variant_label"].iloc[0]
+    # Datasets with inconsistent parent variant labels use the variant label of the dataset instead
+    grouped = data_catalog.groupby("instance_id", sort=False)
+    inconsistent = grouped["parent_variant_label"].transform("nunique") != 1
+    data_catalog.loc[inconsistent, "parent_variant_label"] = grouped["variant_label"].transform("first")
 
-        return group
+    data_catalog["branch_time_in_child"] = _parse_branch_time(data_catalog["branch_time_in_child"])
+    data_catalog["branch_time_in_parent"] = _parse_branch_time(data_catalog["branch_time_in_parent"])
 
-    data_catalog = data_catalog.groupby("instance_id").apply(_fix_parent_variant_label).reset_index(drop=True)
+    return data_catalog
+
+
+def _invalid_assets(builder: Builder) -> dict[str, str]:
+    """
+    Get the files that couldn't be parsed by a builder and the reason for each failure
+
+    Only the exception is reported rather than the full traceback.
+    """
+    if builder.invalid_assets.empty:
+        return {}
+    return {
+        str(path): error.strip().splitlines()[-1]
+        for path, error in builder.invalid_assets[[INVALID_ASSET, TRACEBACK]].itertuples(index=False)
+    }
 
-    # EC-Earth3 uses "D" as a suffix for the branch_time_in_child and branch_time_in_parent columns
-    data_catalog["branch_time_in_child"] = pd.to_numeric(
-        data_catalog["branch_time_in_child"].astype(str).str.replace("D", ""), errors="raise"
-    )
-    data_catalog["branch_time_in_parent"] = pd.to_numeric(
-        data_catalog["branch_time_in_parent"].astype(str).str.replace("D", ""), errors="raise"
-    )
+
+def _postprocess_catalog(datasets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Post-process the metadata extracted from each file into a data catalog
+
+    Each step operates on whole columns rather than row by row
+    as a data catalog may contain millions of files.
+    """
+    datasets = datasets.reset_index(drop=True)
+
+    # Convert the start_time and end_time columns to datetime objects
+    # We don't know the calendar used in the dataset (TODO: Check what ecgtools does)
+    datasets["start_time"] = _parse_datetime(datasets["start_time"])
+    datasets["end_time"] = _parse_datetime(datasets["end_time"])
+
+    drs_items = list(DRS_DIRECTORY_ITEMS)
+    # Only build the instance_id once for each unique combination of DRS items
+    dataset_codes = datasets.groupby(drs_items, sort=False, dropna=False).ngroup().to_numpy()
+    _, first_rows = np.unique(dataset_codes, return_index=True)
+    drs = datasets.loc[first_rows, drs_items]
+    instance_ids = "CMIP6." + drs[drs_items[0]].str.cat([drs[item] for item in drs_items[1:]], sep=".")
+    datasets["instance_id"] = instance_ids.to_numpy()[dataset_codes]
+
+    # Temporary fix for some datasets
+    # TODO: Replace with a standalone package that contains metadata fixes for CMIP6 datasets
+    return _apply_fixes(datasets)
+
+
+def _compact_catalog(data_catalog: pd.DataFrame, unique_columns: Container[str]) -> pd.DataFrame:
+    """
+    Convert the columns of a data catalog loaded from the database to compact dtypes
+
+    Most facets only have a handful of unique values, so storing them as categoricals
+    uses a fraction of the memory of Python strings and speeds up filtering and grouping.
+    The time columns are stored using microsecond precision,
+    which covers dates beyond 2262 (the limit for nanosecond precision).
+
+    Parameters
+    ----------
+    data_catalog
+        Data catalog
+    unique_columns
+        String columns that have (almost) unique values (e.g. the path) which are left as strings
+    """
+    for column in data_catalog.columns:
+        if column in ("start_time", "end_time"):
+            data_catalog[column] = data_catalog[column].astype("datetime64[us]")
+        elif (
+            column not in unique_columns
+            and data_catalog[column].dtype == object
+            # Columns without any values (e.g. init_year) are left as is
+            and data_catalog[column].notna().any()
+        ):
+            data_catalog[column] = data_catalog[column].astype("category")
 
     return data_catalog
 
@@ -69,6 +284,7 @@ class CMIP6DatasetAdapter(DatasetAdapter):
     """
 
     dataset_cls = CMIP6Dataset
+    source_type = SourceDatasetType.CMIP6
     slug_column = "instance_id"
 
     dataset_specific_metadata = (
@@ -109,8 +325,26 @@ class CMIP6DatasetAdapter(DatasetAdapter):
 
     file_specific_metadata = ("start_time", "end_time", "path")
 
-    def __init__(self, n_jobs: int = 1):
+    parsers = ("complete", "drs")
+
+    def __init__(  # noqa: PLR0913
+        self,
+        n_jobs: int = 1,
+        parser: str = "complete",
+        cache: MetadataCache | None = None,
+        n_threads: int = 8,
+        quarantine: Quarantine | None = None,
+        follow_symlinks: bool = False,
+    ):
+        if parser not in self.parsers:
+            raise ValueError(f"Unknown CMIP6 parser {parser!r}. Expected one of {self.parsers}")
+
         self.n_jobs = n_jobs
+        self.n_threads = n_threads
+        self.follow_symlinks = follow_symlinks
+        self.parser = parser
+        self.cache = cache
+        self.quarantine = quarantine
 
     def pretty_subset(self, data_catalog: pd.DataFrame) -> pd.DataFrame:
         """
@@ -143,9 +377,14 @@ class CMIP6DatasetAdapter(DatasetAdapter):
             ]
         ]
 
-    def find_local_datasets(self, file_or_directory: Path) -> pd.DataFrame:
+    def find_local_datasets(
+        self,
+        file_or_directory: Path | Sequence[Path],
+        known_files: Mapping[str, FileFingerprint] | None = None,
+        manifest: Path | None = None,
+    ) -> pd.DataFrame:
         """
-        Generate a data catalog from the specified file or directory
+        Generate a data catalog from the specified files or directories
 
         Each dataset may contain multiple files, which are represented as rows in the data catalog.
         Each dataset has a unique identifier, which is in `slug_column`.
@@ -153,47 +392,290 @@ class CMIP6DatasetAdapter(DatasetAdapter):
         Parameters
         ----------
         file_or_directory
-            File or directory containing the datasets
+            One or more files or directories containing the datasets
+        known_files
+            Fingerprints of files that have previously been ingested.
+
+            Files that have not changed since they were ingested are not parsed
+            and are excluded from the data catalog.
+            See [load_file_fingerprints][ref.datasets.cmip6.CMIP6DatasetAdapter.load_file_fingerprints].
+        manifest
+            File containing a list of the files to ingest.
+
+            If provided, the files are read from the manifest instead of crawling `file_or_directory`,
+            which must then be empty.
 
         Returns
         -------
         :
             Data catalog containing the metadata for the dataset
         """
+        assets = sorted(itertools.chain.from_iterable(self._find_files(file_or_directory, manifest)))
+
+        return self._parse_assets(self._builder(assets), known_files)
+
+    def iter_local_datasets(
+        self,
+        file_or_directory: Path | Sequence[Path],
+        known_files: Mapping[str, FileFingerprint] | None = None,
+        batch_size: int = 10_000,
+        manifest: Path | None = None,
+        skip_directories: Container[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Generate data catalogs from the specified files or directories in batches
+
+        The files are discovered lazily and parsed in batches of approximately
+        `batch_size` files so that the memory required doesn't depend on the size of the archive.
+        A directory is never split across batches.
+        In the CMIP6 DRS all the files in a dataset are in the same directory,
+        so each batch contains complete datasets.
+
+        Parameters
+        ----------
+        file_or_directory
+            One or more files or directories containing the datasets
+        known_files
+            Fingerprints of files that have previously been ingested.
+
+            See [find_local_datasets][ref.datasets.cmip6.CMIP6DatasetAdapter.find_local_datasets].
+        batch_size
+            Minimum number of files to discover before parsing a batch
+        manifest
+            File containing a list of the files to ingest.
+
+            See [find_local_datasets][ref.datasets.cmip6.CMIP6DatasetAdapter.find_local_datasets].
+        skip_directories
+            Directories whose files are ignored,
+            for example because they were ingested by a previous run that was interrupted.
+
+        Yields
+        ------
+        :
+            Data catalog containing the metadata for a batch of datasets
+        """
+        assets: list[str] = []
+        for directory_assets in self._find_files(file_or_directory, manifest):
+            if skip_directories and os.path.dirname(directory_assets[0]) in skip_directories:
+                continue
+
+            assets.extend(directory_assets)
+            if len(assets) < batch_size:
+                continue
+
+            data_catalog = self._parse_assets(self._builder(assets), known_files)
+            assets = []
+            if not data_catalog.empty:
+                yield data_catalog
+
+        if assets:
+            data_catalog = self._parse_assets(self._builder(assets), known_files)
+            if not data_catalog.empty:
+                yield data_catalog
+
+    def iter_catalog_file(self, filename: Path, batch_size: int = 10_000) -> Iterator[pd.DataFrame]:
+        """
+        Read an existing data catalog, such as an intake-esm catalog, in batches
+
+        The catalog must contain the columns in `dataset_specific_metadata` and `file_specific_metadata`,
+        except for the `instance_id` which is recalculated from the DRS facets.
+        The files in the catalog are never opened.
+
+        The catalog must be grouped by dataset, i.e. the rows for a dataset must be contiguous
+        (such as a catalog sorted by path).
+        A dataset at the end of a batch is carried over to the next batch so that each batch only contains
+        complete datasets.
+
+        Parameters
+        ----------
+        filename
+            Path to a CSV (optionally compressed) or Parquet file
+        batch_size
+            Number of rows to read at a time
+
+        Raises
+        ------
+        ValueError
+            If the catalog is missing any of the required columns
+            or a dataset reappears after it has been yielded in an earlier batch
+
+        Yields
+        ------
+        :
+            Data catalog containing the metadata for a batch of datasets
+        """
+        drs_items = list(DRS_DIRECTORY_ITEMS)
+        required_columns = set(self.dataset_specific_metadata + self.file_specific_metadata) - {
+            self.slug_column
+        }
+
+        # DRS items of the datasets that have already been yielded
+        seen: set[tuple[Any, ...]] = set()
+
+        def _complete(batch: pd.DataFrame) -> pd.DataFrame:
+            datasets = set(batch[drs_items].drop_duplicates().itertuples(index=False, name=None))
+            repeated = datasets & seen
+            if repeated:
+                raise ValueError(
+                    f"Found {len(repeated)} datasets in non-contiguous rows of the data catalog, "
+                    f"e.g. {'.'.join(map(str, next(iter(repeated))))}. "
+                    "The rows for each dataset must be contiguous, e.g. sort the catalog by path"
+                )
+            seen.update(datasets)
+            return _postprocess_catalog(batch)
+
+        remainder: pd.DataFrame | None = None
+        for chunk in read_catalog_file(filename, batch_size=batch_size):
+            missing_columns = required_columns - set(chunk.columns)
+            if missing_columns:
+                raise ValueError(f"Data catalog is missing required columns: {missing_columns}")
+
+            if remainder is not None:
+                chunk = pd.concat([remainder, chunk], ignore_index=True)  # noqa: PLW2901
+
+            # The last dataset in the chunk may continue in the next chunk
+            is_last = chunk[drs_items].eq(chunk[drs_items].iloc[-1]).all(axis=1)
+            remainder = chunk[is_last]
+            if not is_last.all():
+                yield _complete(chunk[~is_last])
+
+        if remainder is not None:
+            yield _complete(remainder)
+
+    def _find_files(
+        self, file_or_directory: Path | Sequence[Path], manifest: Path | None
+    ) -> Iterator[list[str]]:
+        roots = [file_or_directory] if isinstance(file_or_directory, Path) else file_or_directory
+        return find_files(
+            roots,
+            manifest=manifest,
+            pattern="*.nc",
+            n_threads=self.n_threads,
+            follow_symlinks=self.follow_symlinks,
+        )
+
+    def _builder(self, assets: list[str]) -> Builder:
         builder = Builder(
-            paths=[str(file_or_directory)],
-            depth=10,
+            paths=[],
+            depth=0,
             include_patterns=["*.nc"],
             joblib_parallel_kwargs={"n_jobs": self.n_jobs},
-        ).build(parsing_func=ecgtools.parsers.parse_cmip6)
-
-        datasets = builder.df
-
-        # Convert the start_time and end_time columns to datetime objects
-        # We don't know the calendar used in the dataset (TODO: Check what ecgtools does)
-        datasets["start_time"] = _parse_datetime(datasets["start_time"])
-        datasets["end_time"] = _parse_datetime(datasets["end_time"])
-
-        drs_items = [
-            "activity_id",
-            "institution_id",
-            "source_id",
-            "experiment_id",
-            "member_id",
-            "table_id",
-            "variable_id",
-            "grid_label",
-            "version",
-        ]
-        datasets["instance_id"] = datasets.apply(
-            lambda row: "CMIP6." + ".".join([row[item] for item in drs_items]), axis=1
         )
+        builder.assets = assets
+        return builder
+
+    def _parse_assets(
+        self, builder: Builder, known_files: Mapping[str, FileFingerprint] | None
+    ) -> pd.DataFrame:
+        if known_files and builder.assets:
+            n_assets = len(builder.assets)
+            builder.assets = [
+                asset
+                for asset in builder.assets
+                if known_files.get(asset) != FileFingerprint.from_path(asset)
+            ]
+            logger.info(f"Skipping {n_assets - len(builder.assets)} unchanged files")
 
-        # Temporary fix for some datasets
-        # TODO: Replace with a standalone package that contains metadata fixes for CMIP6 datasets
-        datasets = _apply_fixes(datasets)
+        if not builder.assets:
+            return self._empty_catalog()
+
+        if self.parser == "drs":
+            datasets = self._clean_dataframe(builder.parse(parsing_func=parse_cmip6_drs))
+            if datasets.empty:
+                return self._empty_catalog()
+            datasets = self._read_dataset_attributes(builder, datasets)
+            if datasets.empty:
+                return self._empty_catalog()
+        else:
+            datasets = self._parse_headers(builder)
 
-        return datasets
+        return _postprocess_catalog(datasets)
+
+    def _empty_catalog(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            columns=[*self.dataset_specific_metadata, *self.file_specific_metadata, "time_range"]
+        )
+
+    def _parse_headers(self, builder: Builder) -> pd.DataFrame:
+        """
+        Parse the headers of the assets in a builder
+
+        If a cache is available, only the files without a valid cache entry are opened.
+        """
+        if self.cache is None:
+            return self._clean_dataframe(builder.parse(parsing_func=ecgtools.parsers.parse_cmip6))
+
+        assets = builder.assets or []
+        entries: dict[str, dict[str, Any]] = self.cache.get_many("parse_cmip6", assets)
+        logger.info(f"Using cached metadata for {len(entries)}/{len(assets)} files")
+
+        builder.assets = [asset for asset in assets if asset not in entries]
+        if builder.assets:
+            parsed = builder.parse(parsing_func=ecgtools.parsers.parse_cmip6).entries
+            # Files that fail to parse aren't cached so they are retried next time
+            self.cache.set_many("parse_cmip6", [entry for entry in parsed if INVALID_ASSET not in entry])
+            entries.update({entry.get("path", entry.get(INVALID_ASSET)): entry for entry in parsed})
+
+        builder.assets = assets
+        builder.df = pd.DataFrame([entries[asset] for asset in assets])
+        return self._clean_dataframe(builder)
+
+    def _clean_dataframe(self, builder: Builder) -> pd.DataFrame:
+        """
+        Remove the files that couldn't be parsed and add them to the quarantine report
+        """
+        # The invalid assets aren't reset by `clean_dataframe` if every file was parsed
+        builder.invalid_assets = pd.DataFrame()
+        builder.clean_dataframe()
+        if self.quarantine is not None:
+            for path, reason in _invalid_assets(builder).items():
+                self.quarantine.add(path, "parse", reason)
+        return builder.df
+
+    def _read_dataset_attributes(self, builder: Builder, datasets: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the metadata that isn't part of the DRS to a data catalog
+
+        Only the first file of each dataset is opened
+        and its attributes are used for all the files in the dataset.
+        Files are dropped if the representative file for their dataset can't be parsed
+        and are quarantined for the same reason.
+        """
+        # All the files in a dataset share a directory in the CMIP6 DRS
+        directories: pd.Series[str] = datasets["path"].map(os.path.dirname)
+        representatives = datasets.groupby(directories, sort=False)["path"].first()
+        builder.assets = representatives.tolist()
+        logger.info(f"Reading attributes for {len(builder.assets)} datasets")
+
+        attributes = self._parse_headers(builder)
+
+        failed = representatives[~representatives.isin(attributes.get("path", []))]
+        if not failed.empty:
+            errors = _invalid_assets(builder)
+            dropped = directories.isin(failed.index) & ~datasets["path"].isin(failed)
+            for directory, siblings in datasets["path"][dropped].groupby(directories[dropped], sort=False):
+                representative = failed[directory]
+                logger.warning(
+                    f"Dropping {len(siblings)} other files in {directory} "
+                    f"as {representative} couldn't be parsed"
+                )
+                if self.quarantine is not None:
+                    reason = errors.get(representative, f"Unable to parse {representative}")
+                    for path in siblings:
+                        self.quarantine.add(path, "parse", reason)
+
+        if attributes.empty:
+            return attributes
+
+        attributes = attributes.drop(
+            columns=[column for column in datasets.columns if column in attributes.columns]
+        ).assign(_directory=attributes["path"].map(os.path.dirname))
+
+        return (
+            datasets.assign(_directory=directories)
+            .merge(attributes, on="_directory", how="inner")
+            .drop(columns="_directory")
+        )
 
     def register_dataset(
         self, config: Config, db: Database, data_catalog_dataset: pd.DataFrame
@@ -225,28 +707,376 @@ class CMIP6DatasetAdapter(DatasetAdapter):
         dataset_metadata = data_catalog_dataset[list(self.dataset_specific_metadata)].iloc[0].to_dict()
         dataset, created = db.get_or_create(self.dataset_cls, slug=slug, **dataset_metadata)
 
-        if not created:
-            logger.warning(f"{dataset} already exists in the database. Skipping")
-            return None
-
-        db.session.flush()
+        if created:
+            db.session.flush()
+            existing_files = {}
+        else:
+            existing_files = {
+                file.path: file for file in db.session.query(CMIP6File).filter_by(dataset_id=dataset.id)
+            }
 
+        modified = False
         for dataset_file in data_catalog_dataset.to_dict(orient="records"):
-            path = validate_path(config, dataset_file.pop("path"))
-
-            db.session.add(
-                CMIP6File(
-                    path=str(path),
-                    dataset_id=dataset.id,
-                    start_time=dataset_file.pop("start_time"),
-                    end_time=dataset_file.pop("end_time"),
+            raw_path = dataset_file.pop("path")
+            path = str(validate_path(config, raw_path))
+            fingerprint = FileFingerprint.from_path(raw_path)
+
+            file = existing_files.get(path)
+            if file is None:
+                db.session.add(
+                    CMIP6File(
+                        path=path,
+                        dataset_id=dataset.id,
+                        start_time=dataset_file.pop("start_time"),
+                        end_time=dataset_file.pop("end_time"),
+                        size=fingerprint.size,
+                        mtime=fingerprint.mtime,
+                        inode=fingerprint.inode,
+                    )
                 )
-            )
+                modified = True
+            elif FileFingerprint(size=file.size, mtime=file.mtime, inode=file.inode) != fingerprint:
+                # Files ingested before fingerprints were tracked are backfilled
+                # without flagging the dataset as modified
+                if file.size is not None:
+                    modified = True
+
+                file.start_time = dataset_file.pop("start_time")
+                file.end_time = dataset_file.pop("end_time")
+                file.size = fingerprint.size
+                file.mtime = fingerprint.mtime
+                file.inode = fingerprint.inode
 
+        if not created:
+            if not (modified or dataset.retracted):
+                logger.warning(f"{dataset} already exists in the database. Skipping")
+                return None
+
+            logger.info(f"{dataset} has new or modified files")
+            dataset.updated_at = func.now()
+            # Registering a retracted dataset again restores it
+            dataset.retracted = False
+
+        record_changes(db, [dataset.id], DatasetChangeType.INSERTED if created else DatasetChangeType.UPDATED)
+        bump_catalog_generation(db, self.source_type)
         return dataset
 
-    def load_catalog(
-        self, db: Database, include_files: bool = True, limit: int | None = None
+    def register_datasets(
+        self,
+        config: Config,
+        db: Database,
+        data_catalog: pd.DataFrame,
+        chunk_size: int = 1000,
+        stat_files: bool = True,
+    ) -> list[str]:
+        """
+        Register all the datasets in a data catalog using bulk operations
+
+        The datasets are registered in chunks of `chunk_size` datasets
+        and each chunk is committed in a separate transaction.
+        Within a chunk, the existing datasets are identified using a single query
+        and the new rows are inserted using `executemany`.
+
+        As with [register_dataset][ref.datasets.cmip6.CMIP6DatasetAdapter.register_dataset],
+        any new or modified files for existing datasets are updated.
+
+        Parameters
+        ----------
+        config
+            Configuration object
+        db
+            Database instance
+        data_catalog
+            Data catalog containing the metadata for one or more datasets
+        chunk_size
+            Number of datasets to register in each transaction
+        stat_files
+            If True, record the fingerprint of each file.
+
+            If False, the files aren't accessed and their fingerprints are left empty.
+            Existing files are then never considered to be modified.
+
+        Returns
+        -------
+        :
+            Slugs of the datasets that were added or modified
+        """
+        slug_indices = data_catalog.groupby(self.slug_column, sort=False).indices
+        slugs = list(slug_indices)
+
+        registered = []
+        for start in range(0, len(slugs), chunk_size):
+            chunk_slugs = slugs[start : start + chunk_size]
+            chunk = data_catalog.iloc[np.concatenate([slug_indices[slug] for slug in chunk_slugs])]
+
+            with db.session.begin():
+                registered.extend(self._register_chunk(config, db, chunk, stat_files))
+            logger.info(f"Registered {start + len(chunk_slugs)}/{len(slugs)} datasets")
+
+        return registered
+
+    def _insert_datasets(
+        self, db: Database, data_catalog: pd.DataFrame, new_slugs: list[str]
+    ) -> dict[str, int]:
+        """
+        Insert the dataset-level rows for new datasets
+
+        Returns the ids of the new datasets
+        """
+        dataset_table = Dataset.metadata.tables[Dataset.__tablename__]
+        cmip6_dataset_table = Dataset.metadata.tables[CMIP6Dataset.__tablename__]
+
+        db.session.execute(
+            insert(dataset_table),
+            [
+                {"slug": slug, "dataset_type": self.dataset_cls.__mapper__.polymorphic_identity}
+                for slug in new_slugs
+            ],
+        )
+        new_ids = dict(
+            db.session.execute(select(Dataset.slug, Dataset.id).where(Dataset.slug.in_(new_slugs)))
+            .tuples()
+            .all()
+        )
+
+        dataset_metadata = data_catalog.drop_duplicates(self.slug_column)
+        db.session.execute(
+            insert(cmip6_dataset_table),
+            [
+                {
+                    "id": new_ids[row[self.slug_column]],
+                    **{key: row[key] for key in self.dataset_specific_metadata},
+                }
+                for row in dataset_metadata.to_dict(orient="records")
+                if row[self.slug_column] in new_ids
+            ],
+        )
+        return new_ids
+
+    def _register_chunk(
+        self, config: Config, db: Database, data_catalog: pd.DataFrame, stat_files: bool
+    ) -> list[str]:
+        self.validate_data_catalog(data_catalog)
+
+        dataset_table = Dataset.metadata.tables[Dataset.__tablename__]
+        file_table = Dataset.metadata.tables[CMIP6File.__tablename__]
+
+        # Replace any missing values (NaN/NaT) with None so they are stored as NULL
+        data_catalog = data_catalog.astype(object).where(data_catalog.notna(), None)
+        slugs = data_catalog[self.slug_column].unique().tolist()
+
+        existing_ids = dict(
+            db.session.execute(select(Dataset.slug, Dataset.id).where(Dataset.slug.in_(slugs))).tuples().all()
+        )
+        new_slugs = [slug for slug in slugs if slug not in existing_ids]
+
+        new_ids = self._insert_datasets(db, data_catalog, new_slugs) if new_slugs else {}
+
+        # Files that have already been ingested for the existing datasets
+        existing_files = {
+            (dataset_id, path): (file_id, FileFingerprint(size=size, mtime=mtime, inode=inode))
+            for file_id, dataset_id, path, size, mtime, inode in db.session.execute(
+                select(
+                    CMIP6File.id,
+                    CMIP6File.dataset_id,
+                    CMIP6File.path,
+                    CMIP6File.size,
+                    CMIP6File.mtime,
+                    CMIP6File.inode,
+                ).where(CMIP6File.dataset_id.in_(existing_ids.values()))
+            )
+        }
+
+        dataset_ids = {**existing_ids, **new_ids}
+        new_files = []
+        updated_files = []
+        modified_datasets = set()
+        for dataset_file in data_catalog[[self.slug_column, *self.file_specific_metadata]].to_dict(
+            orient="records"
+        ):
+            slug = dataset_file[self.slug_column]
+            dataset_id = dataset_ids[slug]
+            path = str(validate_path(config, dataset_file["path"]))
+            file_row = {"start_time": dataset_file["start_time"], "end_time": dataset_file["end_time"]}
+            fingerprint = None
+            if stat_files:
+                fingerprint = FileFingerprint.from_path(dataset_file["path"])
+                file_row.update(size=fingerprint.size, mtime=fingerprint.mtime, inode=fingerprint.inode)
+
+            existing_file = existing_files.get((dataset_id, path))
+            if existing_file is None:
+                new_files.append({"dataset_id": dataset_id, "path": path, **file_row})
+                if slug in existing_ids:
+                    modified_datasets.add(slug)
+            elif fingerprint is not None and existing_file[1] != fingerprint:
+                updated_files.append({"file_id": existing_file[0], **file_row})
+                # Files ingested before fingerprints were tracked are backfilled
+                # without flagging the dataset as modified
+                if existing_file[1].size is not None:
+                    modified_datasets.add(slug)
+
+        if new_files:
+            db.session.execute(insert(file_table), new_files)
+        if updated_files:
+            db.session.execute(
+                update(file_table).where(file_table.c.id == bindparam("file_id")),
+                updated_files,
+            )
+        if modified_datasets:
+            db.session.execute(
+                update(dataset_table)
+                .where(dataset_table.c.id.in_([existing_ids[slug] for slug in modified_datasets]))
+                # Adding files to a retracted dataset restores it
+                .values(updated_at=func.now(), retracted=False)
+            )
+
+        for slug in existing_ids:
+            if slug not in modified_datasets:
+                logger.debug(f"Dataset {slug} already exists in the database. Skipping")
+
+        registered = [slug for slug in slugs if slug in new_ids or slug in modified_datasets]
+        if registered:
+            record_changes(db, new_ids.values(), DatasetChangeType.INSERTED)
+            record_changes(db, [existing_ids[slug] for slug in modified_datasets], DatasetChangeType.UPDATED)
+            bump_catalog_generation(db, self.source_type)
+        return registered
+
+    def load_file_fingerprints(self, config: Config, db: Database) -> dict[str, FileFingerprint]:
+        """
+        Load the fingerprints of the CMIP6 files that have already been ingested
+
+        Files that were ingested before fingerprints were tracked are not included.
+
+        Parameters
+        ----------
+        config
+            Configuration object
+        db
+            Database instance
+
+        Returns
+        -------
+        :
+            Fingerprints of the ingested files keyed by the path to the file
+        """
+        result = db.session.query(CMIP6File.path, CMIP6File.size, CMIP6File.mtime, CMIP6File.inode).filter(
+            CMIP6File.size.isnot(None)
+        )
+
+        return {
+            str(config.paths.data / path): FileFingerprint(size=size, mtime=mtime, inode=inode)
+            for path, size, mtime, inode in result
+        }
+
+    def reconcile_datasets(
+        self, config: Config, db: Database, n_threads: int = 8, dry_run: bool = False
+    ) -> ReconcileResult:
+        """
+        Reconcile the ingested CMIP6 datasets with the files in the data directory
+
+        The tracked files are checked concurrently and compared against their recorded fingerprints.
+
+        * Files that no longer exist are removed.
+          Datasets without any remaining files are retracted.
+        * Files that have been modified are parsed and registered again.
+          Files ingested before fingerprints were tracked can't be checked for modifications.
+
+        The metric executions that used any of the affected datasets are marked as dirty
+        so that they are rerun when solving, without having to re-solve the whole catalog.
+
+        Parameters
+        ----------
+        config
+            Configuration object
+        db
+            Database instance
+        n_threads
+            Maximum number of files to check concurrently
+        dry_run
+            If True, identify the changes without modifying the database
+
+        Returns
+        -------
+        :
+            The changes that were identified
+        """
+        with db.session.begin():
+            tracked = db.session.execute(
+                select(
+                    CMIP6File.id,
+                    CMIP6File.dataset_id,
+                    CMIP6File.path,
+                    CMIP6File.size,
+                    CMIP6File.mtime,
+                    CMIP6File.inode,
+                    Dataset.slug,
+                )
+                .join(Dataset, Dataset.id == CMIP6File.dataset_id)
+                .where(Dataset.retracted.is_(False))
+            ).all()
+
+        paths = [str(config.paths.data / row.path) for row in tracked]
+        logger.info(f"Checking {len(paths)} files")
+        fingerprints = stat_files(paths, n_threads=n_threads)
+
+        slugs = {row.dataset_id: row.slug for row in tracked}
+        n_files = collections.Counter(row.dataset_id for row in tracked)
+        missing_files: dict[int, str] = {}
+        modified_files: dict[int, str] = {}
+        for row, path, fingerprint in zip(tracked, paths, fingerprints):
+            if fingerprint is None:
+                missing_files[row.id] = path
+            elif row.size is not None and fingerprint != FileFingerprint(
+                size=row.size, mtime=row.mtime, inode=row.inode
+            ):
+                modified_files[row.id] = path
+
+        n_missing = collections.Counter(row.dataset_id for row in tracked if row.id in missing_files)
+        retracted_ids = [
+            dataset_id for dataset_id, count in n_missing.items() if count == n_files[dataset_id]
+        ]
+        updated_ids = sorted(
+            {row.dataset_id for row in tracked if row.id in missing_files or row.id in modified_files}
+            - set(retracted_ids)
+        )
+        result = ReconcileResult(
+            missing_files=sorted(missing_files.values()),
+            modified_files=sorted(modified_files.values()),
+            updated_datasets=sorted(slugs[dataset_id] for dataset_id in updated_ids),
+            retracted_datasets=sorted(slugs[dataset_id] for dataset_id in retracted_ids),
+        )
+        if dry_run or not (retracted_ids or updated_ids):
+            return result
+
+        with db.session.begin():
+            for chunk in chunked(list(missing_files), 500):
+                db.session.execute(delete(CMIP6File).where(CMIP6File.id.in_(chunk)))
+            for dataset_ids, values in ((retracted_ids, {"retracted": True}), (updated_ids, {})):
+                for chunk in chunked(dataset_ids, 500):
+                    db.session.execute(
+                        update(Dataset).where(Dataset.id.in_(chunk)).values(updated_at=func.now(), **values)
+                    )
+            record_changes(db, retracted_ids, DatasetChangeType.RETRACTED)
+            record_changes(db, updated_ids, DatasetChangeType.UPDATED)
+            bump_catalog_generation(db, self.source_type)
+
+        if modified_files:
+            data_catalog = self.find_local_datasets([Path(path) for path in modified_files.values()])
+            self.register_datasets(config, db, data_catalog)
+
+        with db.session.begin():
+            n_dirty = invalidate_executions(db, [*retracted_ids, *updated_ids])
+
+        return evolve(result, n_dirty_executions=n_dirty)
+
+    def load_catalog(  # noqa: PLR0913
+        self,
+        db: Database,
+        include_files: bool = True,
+        limit: int | None = None,
+        requirements: Iterable[DataRequirement] | None = None,
+        columns: Collection[str] | None = None,
+        since: CatalogWatermark | None = None,
     ) -> pd.DataFrame:
         """
         Load the data catalog containing the currently tracked datasets/files from the database
@@ -257,44 +1087,180 @@ class CMIP6DatasetAdapter(DatasetAdapter):
         The index of the data catalog is the primary key of the dataset.
         This should be maintained during any processing.
 
+        Retracted datasets are not included.
+        Facet columns are categoricals and the time columns are `datetime64[us]`,
+        except for the `instance_id` and `path` columns which are strings.
+
+        Parameters
+        ----------
+        db
+            Database instance
+        include_files
+            If True, include a row for each file.
+
+            Otherwise, include a row for each dataset.
+        limit
+            Maximum number of rows to load
+        requirements
+            If provided, only load the datasets that match the filters of at least one of the requirements.
+
+            Filtering the result using any of the requirements gives the same result
+            as filtering the complete data catalog.
+            If the requirements can't be translated into SQL, all the datasets are loaded.
+        columns
+            If provided, only load these columns.
+
+            The `instance_id` column and, if `include_files` is True, the `path` column are always loaded.
+            Names that aren't columns of the data catalog are ignored.
+        since
+            If provided, only load the datasets that have changed since this watermark.
+
+            See [DataCatalog.refresh][ref.datasets.catalog.DataCatalog.refresh].
+
         Returns
         -------
         :
             Data catalog containing the metadata for the currently ingested datasets
         """
-        # TODO: Paginate this query to avoid loading all the data at once
+        dataset_table = Dataset.metadata.tables[Dataset.__tablename__]
+        file_table = Dataset.metadata.tables[CMIP6File.__tablename__]
+
+        order_by = [dataset_table.c.updated_at.desc(), dataset_table.c.id]
         if include_files:
-            result = (
-                db.session.query(CMIP6File)
-                # The join is necessary to be able to order by the dataset columns
-                .join(CMIP6File.dataset)
-                # The joinedload is necessary to avoid N+1 queries (one for each dataset)
-                # https://docs.sqlalchemy.org/en/14/orm/loading_relationships.html#the-zen-of-joined-eager-loading
-                .options(joinedload(CMIP6File.dataset))
-                .order_by(Dataset.updated_at.desc())
-                .limit(limit)
-                .all()
-            )
+            order_by.append(file_table.c.id)
 
-            return pd.DataFrame(
-                [
-                    {
-                        **{k: getattr(file, k) for k in self.file_specific_metadata},
-                        **{k: getattr(file.dataset, k) for k in self.dataset_specific_metadata},
-                    }
-                    for file in result
-                ],
-                index=[file.dataset.id for file in result],
-            )
+        stmt = self._catalog_select(include_files, columns).order_by(*order_by).limit(limit)
+        if requirements is not None:
+            cmip6_dataset_table = Dataset.metadata.tables[CMIP6Dataset.__tablename__]
+            facet_columns = {k: cmip6_dataset_table.c[k] for k in self.dataset_specific_metadata}
+            clause = requirements_clause(facet_columns, requirements)
+            if clause is None:
+                logger.debug("Unable to apply the data requirements in the database, loading all datasets")
+            else:
+                stmt = stmt.where(clause)
+        if since is not None:
+            stmt = stmt.where(since.changed_clause())
+
+        return self._read_catalog(db, stmt)
+
+    def iter_catalog(
+        self,
+        db: Database,
+        include_files: bool = True,
+        chunk_size: int = 1000,
+        order_by: str = "id",
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load the data catalog from the database in chunks
+
+        The chunks are paginated using the `order_by` column and the id of the dataset as the key
+        so that each chunk is a single indexed query, regardless of how many chunks precede it.
+        All the files for a dataset are in the same chunk.
+
+        Retracted datasets are not included.
+
+        Parameters
+        ----------
+        db
+            Database instance
+        include_files
+            If True, include a row for each file.
+
+            Otherwise, include a row for each dataset.
+        chunk_size
+            Maximum number of datasets in each chunk
+        order_by
+            Column of the dataset used to order the datasets,
+            e.g. `id` (default), `instance_id` or `updated_at`.
+
+            The column must not be nullable.
+
+        Raises
+        ------
+        ValueError
+            If `order_by` isn't a column of the dataset or is nullable
+
+        Yields
+        ------
+        :
+            Data catalog containing the metadata for a chunk of the currently ingested datasets.
+
+            The index of the data catalog is the primary key of the dataset.
+        """
+        dataset_table = Dataset.metadata.tables[Dataset.__tablename__]
+        cmip6_dataset_table = Dataset.metadata.tables[CMIP6Dataset.__tablename__]
+        file_table = Dataset.metadata.tables[CMIP6File.__tablename__]
+
+        if order_by in cmip6_dataset_table.c:
+            key_column = cmip6_dataset_table.c[order_by]
+        elif order_by in dataset_table.c:
+            key_column = dataset_table.c[order_by]
         else:
-            result_datasets = (
-                db.session.query(CMIP6Dataset).order_by(Dataset.updated_at.desc()).limit(limit).all()
+            raise ValueError(f"Unable to order the data catalog by unknown column {order_by!r}")
+        # NULL keys never compare greater than the previous key, so the datasets after them would be skipped
+        if key_column.nullable:
+            raise ValueError(f"Unable to order the data catalog by nullable column {order_by!r}")
+        key = tuple_(key_column, cmip6_dataset_table.c.id)
+
+        keys_select = (
+            select(key_column, cmip6_dataset_table.c.id)
+            .select_from(
+                cmip6_dataset_table.join(dataset_table, dataset_table.c.id == cmip6_dataset_table.c.id)
             )
+            .where(dataset_table.c.retracted.is_(False))
+            .order_by(key_column, cmip6_dataset_table.c.id)
+            .limit(chunk_size)
+        )
+        row_order = [key_column, cmip6_dataset_table.c.id]
+        if include_files:
+            row_order.append(file_table.c.id)
+
+        last_key: tuple[Any, ...] | None = None
+        while True:
+            # Find the datasets in the next chunk, then load their rows
+            stmt = keys_select if last_key is None else keys_select.where(key > tuple_(*last_key))
+            keys = db.session.execute(stmt).all()
+            if not keys:
+                return
 
-            return pd.DataFrame(
-                [
-                    {k: getattr(dataset, k) for k in self.dataset_specific_metadata}
-                    for dataset in result_datasets
-                ],
-                index=[file.id for file in result_datasets],
+            yield self._read_catalog(
+                db,
+                self._catalog_select(include_files)
+                .where(cmip6_dataset_table.c.id.in_([dataset_id for _, dataset_id in keys]))
+                .order_by(*row_order),
             )
+            last_key = tuple(keys[-1])
+
+    def _catalog_select(self, include_files: bool, columns: Collection[str] | None = None) -> Select[Any]:
+        """
+        Build the query for the data catalog of the datasets that haven't been retracted
+
+        If `columns` is provided, only those columns are selected in addition to the primary key,
+        slug and path columns.
+        """
+        dataset_table = Dataset.metadata.tables[Dataset.__tablename__]
+        cmip6_dataset_table = Dataset.metadata.tables[CMIP6Dataset.__tablename__]
+        file_table = Dataset.metadata.tables[CMIP6File.__tablename__]
+
+        names = None if columns is None else {*columns, self.slug_column, "path"}
+        dataset_columns = [
+            cmip6_dataset_table.c[k] for k in self.dataset_specific_metadata if names is None or k in names
+        ]
+        from_clause = cmip6_dataset_table.join(dataset_table, dataset_table.c.id == cmip6_dataset_table.c.id)
+        if include_files:
+            file_columns = [
+                file_table.c[k] for k in self.file_specific_metadata if names is None or k in names
+            ]
+            selected = [cmip6_dataset_table.c.id, *file_columns, *dataset_columns]
+            from_clause = from_clause.join(file_table, file_table.c.dataset_id == cmip6_dataset_table.c.id)
+        else:
+            selected = [cmip6_dataset_table.c.id, *dataset_columns]
+
+        return select(*selected).select_from(from_clause).where(dataset_table.c.retracted.is_(False))
+
+    def _read_catalog(self, db: Database, stmt: Select[Any]) -> pd.DataFrame:
+        # The rows are read directly into columns without creating any ORM objects
+        data_catalog = pd.read_sql(stmt, db.session.connection(), index_col="id")
+        data_catalog.index.name = None
+
+        return _compact_catalog(data_catalog, unique_columns=(self.slug_column, "path"))
@@ -0,0 +1,200 @@
+"""
+Discover the files to ingest
+
+Walking a large archive on a parallel filesystem (e.g. Lustre or GPFS) is dominated by the latency of
+each metadata request rather than by bandwidth.
+The crawler lists many directories concurrently using `os.scandir`,
+which doesn't require a `stat` call per entry to distinguish files from directories.
+
+Alternatively, a precomputed list of files (e.g. the output of `lfs find` or a nightly manifest)
+can be used to skip the crawl entirely.
+
+Files are grouped by the directory that contains them.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import itertools
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from loguru import logger
+
+
+def _scan_directory(directory: str, pattern: str) -> tuple[list[str], list[str], list[str]]:
+    files = []
+    subdirectories = []
+    links = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # Symbolic links to directories are returned separately as they may form cycles
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_symlink() and entry.is_dir():
+                    links.append(entry.path)
+                elif fnmatch.fnmatch(entry.name, pattern) and entry.is_file():
+                    files.append(entry.path)
+    except OSError as exc:
+        logger.warning(f"Unable to list {directory}: {exc}")
+
+    return sorted(files), subdirectories, links
+
+
+def _overlaps(path: str, trees: Iterable[str]) -> bool:
+    # Check if a directory is inside, or contains, any of the directory trees
+    return any(os.path.commonpath([path, tree]) in (path, tree) for tree in trees)
+
+
+def crawl_directories(
+    roots: Iterable[Path], pattern: str = "*", n_threads: int = 8, follow_symlinks: bool = False
+) -> Iterator[list[str]]:
+    """
+    Find the files that match a pattern in one or more directory trees
+
+    The directories are listed concurrently using a pool of threads.
+    The order in which directories are yielded depends on how quickly they are listed.
+
+    Symbolic links to files are always included.
+    Symbolic links to directories are skipped unless `follow_symlinks` is True.
+    When following them, a link is still skipped if its target overlaps with one of the roots
+    or with the target of a link that has already been followed,
+    as the same files would be found again or the crawl would never finish.
+
+    Parameters
+    ----------
+    roots
+        Files or the roots of the directory trees to search
+    pattern
+        Glob pattern that the filenames must match
+    n_threads
+        Maximum number of directories to list concurrently
+    follow_symlinks
+        If True, crawl the directories that symbolic links point to
+
+    Yields
+    ------
+    :
+        Sorted paths of the matching files in each directory.
+
+        Directories without any matching files are skipped.
+    """
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        pending: set[Future[tuple[list[str], list[str], list[str]]]] = set()
+        # Resolved paths of the directory trees that are crawled
+        trees = []
+        n_skipped = 0
+
+        for root in roots:
+            if root.is_file():
+                if fnmatch.fnmatch(root.name, pattern):
+                    yield [str(root)]
+            else:
+                trees.append(os.path.realpath(root))
+                pending.add(executor.submit(_scan_directory, str(root), pattern))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories, links = future.result()
+                for link in links:
+                    target = os.path.realpath(link)
+                    if not follow_symlinks or _overlaps(target, trees):
+                        logger.debug(f"Skipping the symbolic link {link} to {target}")
+                        n_skipped += 1
+                        continue
+                    trees.append(target)
+                    subdirectories.append(link)
+
+                pending.update(
+                    executor.submit(_scan_directory, subdirectory, pattern) for subdirectory in subdirectories
+                )
+                if files:
+                    yield files
+
+        if n_skipped:
+            logger.info(f"Skipped {n_skipped} symbolic links to directories")
+
+
+def read_manifest(manifest: Path, pattern: str = "*") -> Iterator[list[str]]:
+    """
+    Read a list of files from a manifest
+
+    The manifest is a text file containing a path per line.
+    Blank lines and lines starting with `#` are ignored.
+    Relative paths are relative to the directory containing the manifest.
+    The files are not checked for existence.
+
+    Parameters
+    ----------
+    manifest
+        Path to the manifest
+    pattern
+        Glob pattern that the filenames must match
+
+    Yields
+    ------
+    :
+        Sorted paths of the matching files in each directory
+    """
+    with open(manifest) as fh:
+        lines = (line.strip() for line in fh)
+        paths = [
+            os.path.join(manifest.parent, line)
+            for line in lines
+            if line and not line.startswith("#") and fnmatch.fnmatch(os.path.basename(line), pattern)
+        ]
+
+    paths.sort(key=lambda path: (os.path.dirname(path), os.path.basename(path)))
+    for _, files in itertools.groupby(paths, key=os.path.dirname):
+        yield list(files)
+
+
+def find_files(
+    roots: Iterable[Path] = (),
+    manifest: Path | None = None,
+    pattern: str = "*",
+    n_threads: int = 8,
+    follow_symlinks: bool = False,
+) -> Iterator[list[str]]:
+    """
+    Find the files to ingest by crawling directories or from a manifest
+
+    Parameters
+    ----------
+    roots
+        Files or directories to crawl
+    manifest
+        Manifest containing the list of files.
+
+        If provided, no directories are crawled.
+    pattern
+        Glob pattern that the filenames must match
+    n_threads
+        Maximum number of directories to list concurrently
+    follow_symlinks
+        If True, crawl the directories that symbolic links point to
+        (see [crawl_directories][ref.datasets.crawler.crawl_directories])
+
+    Raises
+    ------
+    ValueError
+        If both `roots` and `manifest` are provided
+
+    Yields
+    ------
+    :
+        Sorted paths of the matching files in each directory
+    """
+    roots = list(roots)
+    if manifest is not None:
+        if roots:
+            raise ValueError("Files can be found by crawling directories or from a manifest, but not both")
+        yield from read_manifest(manifest, pattern=pattern)
+    else:
+        yield from crawl_directories(
+            roots, pattern=pattern, n_threads=n_threads, follow_symlinks=follow_symlinks
+        )
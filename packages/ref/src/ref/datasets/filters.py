@@ -0,0 +1,170 @@
+"""
+Apply the filters of data requirements in the database
+
+Metrics typically only use a small fraction of the datasets that have been ingested.
+Translating the [FacetFilter][ref_core.datasets.FacetFilter]s of each
+[DataRequirement][ref_core.metrics.DataRequirement] into SQL predicates
+means that only the datasets that could be used by a metric are loaded into the data catalog.
+
+The predicates match the behaviour of
+[DataRequirement.apply_filters][ref_core.metrics.DataRequirement.apply_filters],
+so filtering the reduced data catalog gives the same result as filtering the complete data catalog.
+
+Similarly, only the columns that the metrics use need to be loaded.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from ref_core.constraints import GroupOperation, RequireFacets
+from ref_core.datasets import FacetFilter
+from ref_core.metrics import DataRequirement
+from sqlalchemy import ColumnElement, String, and_, false, or_, true
+
+
+def facet_filter_clause(
+    columns: Mapping[str, ColumnElement[Any]], facet_filter: FacetFilter
+) -> ColumnElement[bool] | None:
+    """
+    Translate a facet filter into a SQL predicate
+
+    Each facet is applied independently.
+    If `keep` is False, rows that match any of the facets are excluded
+    and rows without a value for a facet are kept.
+
+    The values of a facet are strings, which pandas never matches against numeric columns,
+    whereas the database may convert them to the type of the column.
+    Filters on columns that don't contain strings are therefore not translated.
+
+    Parameters
+    ----------
+    columns
+        Columns that can be filtered on, keyed by the name of the facet
+    facet_filter
+        Filter to translate
+
+    Returns
+    -------
+    :
+        The predicate or None if a facet isn't one of `columns` or isn't a string column
+    """
+    clauses: list[ColumnElement[bool]] = []
+    for facet, values in facet_filter.facets.items():
+        if facet not in columns or not isinstance(columns[facet].type, String):
+            return None
+
+        column = columns[facet]
+        if facet_filter.keep:
+            clauses.append(column.in_(values))
+        else:
+            # NOT IN is never true for NULL values, whereas they are kept when filtering a DataFrame
+            clauses.append(or_(column.not_in(values), column.is_(None)))
+
+    return and_(true(), *clauses)
+
+
+def requirement_clause(
+    columns: Mapping[str, ColumnElement[Any]], requirement: DataRequirement
+) -> ColumnElement[bool] | None:
+    """
+    Translate the filters of a data requirement into a SQL predicate
+
+    Parameters
+    ----------
+    columns
+        Columns that can be filtered on, keyed by the name of the facet
+    requirement
+        Data requirement to translate
+
+    Returns
+    -------
+    :
+        The predicate or None if the requirement can't be applied in the database.
+
+        This is the case if a filter uses a facet that isn't one of `columns`
+        or if a constraint needs the complete data catalog.
+    """
+    if any(isinstance(constraint, GroupOperation) for constraint in requirement.constraints):
+        return None
+
+    clauses = []
+    for facet_filter in requirement.filters:
+        clause = facet_filter_clause(columns, facet_filter)
+        if clause is None:
+            return None
+        clauses.append(clause)
+
+    return and_(true(), *clauses)
+
+
+def requirements_clause(
+    columns: Mapping[str, ColumnElement[Any]], requirements: Iterable[DataRequirement]
+) -> ColumnElement[bool] | None:
+    """
+    Translate the filters of a collection of data requirements into a SQL predicate
+
+    A row matches the predicate if it could be used by any of the requirements.
+    If there are no requirements, no rows match.
+
+    Parameters
+    ----------
+    columns
+        Columns that can be filtered on, keyed by the name of the facet
+    requirements
+        Data requirements to translate
+
+    Returns
+    -------
+    :
+        The predicate or None if any of the requirements can't be applied in the database
+    """
+    clauses = []
+    for requirement in requirements:
+        clause = requirement_clause(columns, requirement)
+        if clause is None:
+            return None
+        clauses.append(clause)
+
+    return or_(false(), *clauses)
+
+
+def required_columns(requirements: Iterable[DataRequirement]) -> set[str] | None:
+    """
+    Find the columns of the data catalog that are used by a collection of data requirements
+
+    This includes the facets used by the filters, group_by, join_on and constraints of each requirement
+    and the columns that are used when the metric is executed.
+
+    Parameters
+    ----------
+    requirements
+        Data requirements
+
+    Returns
+    -------
+    :
+        Names of the columns or None if every column may be used.
+
+        This is the case if a requirement doesn't declare the columns used by its metric
+        or if it has a constraint that may use any column.
+    """
+    columns: set[str] = set()
+    for requirement in requirements:
+        if requirement.columns is None:
+            return None
+        columns.update(requirement.columns)
+
+        for facet_filter in requirement.filters:
+            columns.update(facet_filter.facets)
+        columns.update(requirement.group_by or ())
+        columns.update(requirement.join_on or ())
+
+        for constraint in requirement.constraints:
+            if isinstance(constraint, RequireFacets):
+                columns.add(constraint.dimension)
+            else:
+                return None
+
+    return columns
@@ -0,0 +1,162 @@
+"""
+Checkpointing for long-running ingestions
+
+Ingesting a large archive can take many hours.
+The journal records the directories and datasets that have been committed to the database
+so that an interrupted ingestion can be resumed,
+and the quarantine report records the files that couldn't be ingested without aborting the ingestion.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from collections.abc import Iterable
+from pathlib import Path
+
+from attrs import define, field
+from loguru import logger
+
+
+@define
+class IngestJournal:
+    """
+    Append-only journal of the directories and datasets that have been ingested
+
+    Each batch is written as a line of JSON and flushed to disk
+    once it has been committed to the database.
+    """
+
+    filename: Path
+    directories: set[str] = field(factory=set)
+    """
+    Directories whose files have been ingested
+    """
+    datasets: set[str] = field(factory=set)
+    """
+    Slugs of the datasets that have been ingested
+    """
+
+    @classmethod
+    def open(cls, filename: Path, resume: bool = False) -> IngestJournal:
+        """
+        Open a journal
+
+        Parameters
+        ----------
+        filename
+            Path to the journal
+        resume
+            If True, load the entries from an existing journal.
+
+            Otherwise, any existing journal is truncated.
+
+        Returns
+        -------
+        :
+            The journal
+        """
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        journal = cls(filename)
+
+        if resume and filename.exists():
+            with open(filename) as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be incomplete if the previous run was killed while writing it
+                        logger.warning(f"Ignoring a corrupt entry in {filename}")
+                        continue
+                    journal.directories.update(entry["directories"])
+                    journal.datasets.update(entry["datasets"])
+            logger.info(
+                f"Resuming from {filename}: {len(journal.directories)} directories "
+                f"and {len(journal.datasets)} datasets have already been ingested"
+            )
+        else:
+            filename.write_text("")
+
+        return journal
+
+    def record(self, directories: Iterable[str], datasets: Iterable[str]) -> None:
+        """
+        Record that a batch of directories and datasets has been ingested
+
+        Parameters
+        ----------
+        directories
+            Directories whose files have been ingested
+        datasets
+            Slugs of the datasets that have been ingested
+        """
+        entry = {"directories": sorted(set(directories)), "datasets": sorted(set(datasets))}
+
+        with open(self.filename, "a") as fh:
+            fh.write(json.dumps(entry) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        self.directories.update(entry["directories"])
+        self.datasets.update(entry["datasets"])
+
+
+@define
+class Quarantine:
+    """
+    Report of the files that couldn't be ingested
+
+    The report is a CSV file with the path of each file,
+    the stage of the ingestion that failed (e.g. `parse` or `register`) and the reason.
+    """
+
+    filename: Path
+    n_files: int = 0
+    """
+    Number of files that have been quarantined by this instance
+    """
+
+    @classmethod
+    def open(cls, filename: Path, resume: bool = False) -> Quarantine:
+        """
+        Open a quarantine report
+
+        Parameters
+        ----------
+        filename
+            Path to the report
+        resume
+            If True, append to an existing report.
+
+            Otherwise, any existing report is replaced.
+
+        Returns
+        -------
+        :
+            The quarantine report
+        """
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        if not (resume and filename.exists()):
+            with open(filename, "w", newline="") as fh:
+                csv.writer(fh).writerow(["path", "stage", "reason"])
+
+        return cls(filename)
+
+    def add(self, path: str, stage: str, reason: str) -> None:
+        """
+        Quarantine a file
+
+        Parameters
+        ----------
+        path
+            Path to the file
+        stage
+            Stage of the ingestion that failed
+        reason
+            Description of the failure
+        """
+        logger.warning(f"Quarantined {path} ({stage}): {reason}")
+        with open(self.filename, "a", newline="") as fh:
+            csv.writer(fh).writerow([path, stage, reason])
+        self.n_files += 1
@@ -0,0 +1,124 @@
+"""
+Reconcile the tracked datasets with the files in the data directory
+
+Files may be removed from or replaced in the data directory after they have been ingested.
+Reconciling compares the fingerprint of each tracked file against the file on disk,
+updates or retracts the affected datasets
+and marks the metric executions that used those datasets as dirty so that they are rerun.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from attrs import field, frozen
+from loguru import logger
+from sqlalchemy import select, update
+
+from ref.database import Database
+from ref.datasets.utils import FileFingerprint, chunked
+from ref.models.metric_execution import MetricExecution, MetricExecutionResult, metric_datasets
+
+
+@frozen
+class ReconcileResult:
+    """
+    Changes identified when reconciling the tracked datasets with the data directory
+    """
+
+    missing_files: list[str] = field(factory=list)
+    """
+    Paths of the tracked files that no longer exist
+    """
+    modified_files: list[str] = field(factory=list)
+    """
+    Paths of the tracked files that have been modified or replaced since they were ingested
+    """
+    updated_datasets: list[str] = field(factory=list)
+    """
+    Slugs of the datasets that still have files, but were modified
+    """
+    retracted_datasets: list[str] = field(factory=list)
+    """
+    Slugs of the datasets that no longer have any files
+    """
+    n_dirty_executions: int = 0
+    """
+    Number of metric executions that were marked as dirty
+    """
+
+
+def _fingerprint(path: str) -> FileFingerprint | None:
+    try:
+        return FileFingerprint.from_path(path)
+    except FileNotFoundError:
+        return None
+    except OSError as exc:
+        # A single inaccessible file (e.g. a permission error or a stale NFS handle) shouldn't abort the check
+        logger.warning(f"Unable to check {path}, treating it as missing: {exc}")
+        return None
+
+
+def stat_files(paths: Iterable[str], n_threads: int = 8) -> list[FileFingerprint | None]:
+    """
+    Calculate the fingerprints of a collection of files concurrently
+
+    On parallel filesystems, the time taken to stat a file is dominated by latency
+    so many files are checked at once using a pool of threads.
+
+    Parameters
+    ----------
+    paths
+        Paths of the files
+    n_threads
+        Maximum number of files to stat concurrently
+
+    Returns
+    -------
+    :
+        Fingerprint of each file, in the same order as `paths`.
+
+        The fingerprint is None if the file doesn't exist or can't be accessed.
+    """
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        return list(executor.map(_fingerprint, paths, chunksize=64))
+
+
+def invalidate_executions(db: Database, dataset_ids: Collection[int]) -> int:
+    """
+    Mark the metric executions that used any of a collection of datasets as dirty
+
+    The datasets used by each execution are found using the datasets linked to its results.
+
+    Parameters
+    ----------
+    db
+        Database instance
+    dataset_ids
+        Ids of the datasets that have been modified or retracted
+
+    Returns
+    -------
+    :
+        Number of metric executions that were marked as dirty
+    """
+    if not dataset_ids:
+        return 0
+
+    n_dirty = 0
+    for chunk in chunked(list(dataset_ids), 500):
+        execution_ids = (
+            select(MetricExecutionResult.metric_execution_id)
+            .join(
+                metric_datasets,
+                metric_datasets.c.metric_execution_result_id == MetricExecutionResult.id,
+            )
+            .where(metric_datasets.c.dataset_id.in_(chunk))
+        )
+        n_dirty += db.session.execute(
+            update(MetricExecution)
+            .where(MetricExecution.id.in_(execution_ids), MetricExecution.dirty.is_(False))
+            .values(dirty=True)
+        ).rowcount
+    return n_dirty
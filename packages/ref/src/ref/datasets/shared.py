@@ -0,0 +1,120 @@
+"""
+Share a data catalog with worker processes
+
+Sending a data catalog, or the groups of datasets selected from it, to worker processes
+requires pickling a copy of the data for each worker.
+Instead, the catalog is published once as an uncompressed Arrow IPC file,
+preferably in `/dev/shm` so that it is held in memory.
+Workers memory-map the file, without copying it,
+and only receive the positions of the rows that they need.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow
+import pyarrow.feather
+from attrs import frozen
+from loguru import logger
+from numpy.typing import NDArray
+
+from ref.config import Config
+
+_SHARED_MEMORY = Path("/dev/shm")  # noqa: S108
+
+
+def shared_directory(config: Config) -> Path:
+    """
+    Get the directory used to share data catalogs with worker processes
+
+    Parameters
+    ----------
+    config
+        Configuration object
+
+    Returns
+    -------
+    :
+        `/dev/shm` if it is available and writable, otherwise a directory in `config.paths.tmp`
+    """
+    if _SHARED_MEMORY.is_dir() and os.access(_SHARED_MEMORY, os.W_OK):
+        return _SHARED_MEMORY
+    return config.paths.tmp / "shared"
+
+
+@functools.lru_cache(maxsize=8)
+def _open_table(path: Path) -> pyarrow.Table:
+    # The memory map stays valid after the file is removed, so it is reused for each task in a worker
+    return pyarrow.feather.read_table(path, memory_map=True)
+
+
+@frozen
+class SharedCatalog:
+    """
+    Data catalog published as a memory-mapped Arrow IPC file
+
+    Instances only contain the path to the file, so they are cheap to pickle.
+    """
+
+    path: Path
+
+    @classmethod
+    def publish(cls, data_catalog: pd.DataFrame, directory: Path) -> SharedCatalog:
+        """
+        Write a data catalog so that it can be shared with other processes
+
+        The file should be removed using [unlink][ref.datasets.shared.SharedCatalog.unlink]
+        once the workers have finished.
+
+        Parameters
+        ----------
+        data_catalog
+            Data catalog to publish
+        directory
+            Directory to write the file to (see [shared_directory][ref.datasets.shared.shared_directory])
+
+        Returns
+        -------
+        :
+            The published catalog
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, filename = tempfile.mkstemp(prefix="ref-catalog-", suffix=".arrow", dir=directory)
+        os.close(fd)
+
+        pyarrow.feather.write_feather(data_catalog, filename, compression="uncompressed")
+        logger.debug(f"Published a data catalog of {len(data_catalog)} rows to {filename}")
+        return cls(Path(filename))
+
+    def take(self, rows: Sequence[int] | NDArray[np.intp]) -> pd.DataFrame:
+        """
+        Read a selection of rows of the data catalog
+
+        Only the selected rows are converted to a DataFrame.
+
+        Parameters
+        ----------
+        rows
+            Positions of the rows in the data catalog
+
+        Returns
+        -------
+        :
+            The selected rows, including the index of the data catalog
+        """
+        # An empty list of rows would otherwise be converted to an array of nulls
+        indices = np.asarray(rows, dtype=np.int64)
+        return _open_table(self.path).take(indices).to_pandas()
+
+    def unlink(self) -> None:
+        """
+        Remove the published file
+        """
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,180 @@
+"""
+On-disk snapshots of the data catalog
+
+Loading the full data catalog from the database is the slowest part of starting to solve.
+The catalog rarely changes between solves, so a copy is stored as an uncompressed Arrow IPC file
+under `config.paths.tmp` which is read instead of querying the database.
+The snapshot is still converted to a DataFrame,
+so the whole catalog is copied into memory as it would be when loaded from the database.
+
+Each snapshot is keyed by the catalog generation of its source type,
+a counter in the database that is incremented whenever datasets are added, modified or retracted.
+A snapshot is therefore never used once the datasets in the database have changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections.abc import Collection, Sequence
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather
+from attrs import define
+from loguru import logger
+from ref_core.datasets import SourceDatasetType
+from ref_core.metrics import DataRequirement
+from sqlalchemy import insert, select, update
+
+from ref.config import Config
+from ref.database import Database
+from ref.datasets.base import DatasetAdapter
+from ref.models.dataset import CatalogGeneration
+
+
+def get_catalog_generation(db: Database, source_type: SourceDatasetType) -> int:
+    """
+    Get the current generation of the data catalog for a source type
+
+    Parameters
+    ----------
+    db
+        Database instance
+    source_type
+        Type of source dataset
+
+    Returns
+    -------
+    :
+        Generation of the data catalog.
+
+        This is 0 if the datasets have never been modified.
+    """
+    generation = db.session.execute(
+        select(CatalogGeneration.generation).where(CatalogGeneration.source_type == source_type)
+    ).scalar_one_or_none()
+    return generation or 0
+
+
+def bump_catalog_generation(db: Database, source_type: SourceDatasetType) -> None:
+    """
+    Increment the generation of the data catalog for a source type
+
+    This should be called in the same transaction that modifies the datasets.
+
+    Parameters
+    ----------
+    db
+        Database instance
+    source_type
+        Type of source dataset
+    """
+    result = db.session.execute(
+        update(CatalogGeneration)
+        .where(CatalogGeneration.source_type == source_type)
+        .values(generation=CatalogGeneration.generation + 1)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(CatalogGeneration).values(source_type=source_type, generation=1))
+
+
+@define
+class CatalogSnapshots:
+    """
+    Snapshots of the data catalogs loaded from a database
+    """
+
+    directory: Path
+    """
+    Directory containing the snapshots
+    """
+
+    @staticmethod
+    def from_config(config: Config) -> CatalogSnapshots:
+        """
+        Use the snapshots in the temporary directory of a configuration
+
+        Parameters
+        ----------
+        config
+            Configuration object
+
+        Returns
+        -------
+        :
+            The catalog snapshots
+        """
+        return CatalogSnapshots(config.paths.tmp / "catalog")
+
+    def load_catalog(
+        self,
+        db: Database,
+        adapter: DatasetAdapter,
+        requirements: Sequence[DataRequirement] | None = None,
+        columns: Collection[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Load the data catalog of a source type, reusing the snapshot if it is current
+
+        If the snapshot is out of date, the data catalog is loaded from the database
+        and a new snapshot is written.
+
+        Parameters
+        ----------
+        db
+            Database instance
+        adapter
+            Adapter for the source type
+        requirements
+            Data requirements used to reduce the datasets that are loaded.
+
+            Separate snapshots are kept for different requirements.
+        columns
+            Columns to load.
+
+            Separate snapshots are kept for different columns.
+
+        Returns
+        -------
+        :
+            Data catalog containing the metadata for the currently ingested datasets.
+
+            See [load_catalog][ref.datasets.base.DatasetAdapter.load_catalog].
+        """
+        generation = get_catalog_generation(db, adapter.source_type)
+
+        # Snapshots of different databases may share a directory
+        key = db.url
+        if requirements is not None:
+            # Only the filters and the types of constraints affect which datasets are loaded
+            key += repr([(r.filters, [type(c).__name__ for c in r.constraints]) for r in requirements])
+        if columns is not None:
+            key += repr(sorted(columns))
+        digest = hashlib.sha256(key.encode()).hexdigest()[:12]
+        prefix = f"{adapter.source_type.value}-{digest}-"
+        filename = self.directory / f"{prefix}{generation}.arrow"
+
+        if filename.exists():
+            logger.debug(f"Loading the data catalog from {filename}")
+            try:
+                # Memory-mapping avoids reading the file into a buffer,
+                # but the conversion to pandas copies the data
+                return pyarrow.feather.read_table(filename, memory_map=True).to_pandas()
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Ignoring an invalid snapshot {filename}: {exc}")
+
+        data_catalog = adapter.load_catalog(db, requirements=requirements, columns=columns)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file so that a partially written snapshot is never read
+        tmp_filename = filename.with_suffix(f".{os.getpid()}.tmp")
+        pyarrow.feather.write_feather(data_catalog, tmp_filename, compression="uncompressed")
+        os.replace(tmp_filename, filename)
+        logger.debug(f"Wrote a snapshot of the data catalog to {filename}")
+
+        for previous in self.directory.glob(f"{prefix}*.arrow"):
+            if previous != filename:
+                previous.unlink(missing_ok=True)
+
+        return data_catalog
@@ -1,5 +1,11 @@
+import os
+from collections.abc import Iterable, Iterator, Sequence
 from pathlib import Path
+from typing import TypeVar
 
+import pandas as pd
+import pyarrow.parquet
+from attrs import frozen
 from loguru import logger
 from ref_core.exceptions import OutOfTreeDatasetException
 
@@ -21,3 +27,88 @@ def validate_path(config: Config, raw_path: str) -> Path:
         raise OutOfTreeDatasetException(prefix, config.paths.data)
 
     return prefix
+
+
+T = TypeVar("T")
+
+
+def chunked(values: Sequence[T], size: int) -> Iterable[Sequence[T]]:
+    """
+    Split a sequence into chunks of at most `size` items
+
+    This is used to keep the number of bound parameters in a query below the database limit.
+    """
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def read_catalog_file(filename: Path, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a data catalog stored in a CSV or Parquet file in batches
+
+    Parameters
+    ----------
+    filename
+        Path to the data catalog.
+
+        Files with a `.parquet` or `.pq` extension are read as Parquet files.
+        Any other file is read as a CSV file, which may be compressed (e.g. `catalog.csv.gz`).
+    batch_size
+        Maximum number of rows in each batch
+
+    Yields
+    ------
+    :
+        The rows of the data catalog
+    """
+    if filename.suffix in (".parquet", ".pq"):
+        for batch in pyarrow.parquet.ParquetFile(filename).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(filename, chunksize=batch_size) as reader:
+            yield from reader
+
+
+@frozen
+class FileFingerprint:
+    """
+    Cheap-to-compute identity of a file on disk
+
+    The fingerprint is used to detect if a file has been added or modified since it was last ingested,
+    without having to open the file.
+    """
+
+    size: int
+    """
+    Size of the file in bytes
+    """
+
+    mtime: float
+    """
+    Last modification time of the file (seconds since the epoch)
+    """
+
+    inode: int
+    """
+    Inode number of the file
+
+    This changes if a file is replaced, even if the size and modification time are preserved.
+    """
+
+    @classmethod
+    def from_path(cls, path: str | os.PathLike[str]) -> "FileFingerprint":
+        """
+        Calculate the fingerprint of a file
+
+        Parameters
+        ----------
+        path
+            Path to the file
+
+        Returns
+        -------
+        :
+            Fingerprint of the file
+        """
+        stat = os.stat(path)
+        return cls(size=stat.st_size, mtime=stat.st_mtime, inode=stat.st_ino)
@@ -1,8 +1,9 @@
 import datetime
+import enum
 from typing import Any, ClassVar
 
 from ref_core.datasets import SourceDatasetType
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import BigInteger, ForeignKey, Index, false, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ref.models.base import Base
@@ -38,12 +39,22 @@ class Dataset(Base):
     """
     When the dataset was added to the database
     """
-    updated_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.now(), onupdate=func.now(), index=True
+    )
     """
     When the dataset was updated.
 
     Updating a dataset will trigger a new metrics calculation.
     """
+    retracted: Mapped[bool] = mapped_column(default=False, server_default=false())
+    """
+    Whether the dataset has been retracted
+
+    A dataset is retracted if all of its files have been removed from the data directory.
+    Retracted datasets are not used for new metric executions,
+    but are kept so that the executions that used them can still be traced.
+    """
 
     def __repr__(self) -> str:
         return f"<Dataset slug={self.slug} dataset_type={self.dataset_type} >"
@@ -59,6 +70,11 @@ class CMIP6Dataset(Dataset):
     """
 
     __tablename__ = "cmip6_dataset"
+    __table_args__ = (
+        # The DRS facets that are most commonly used to filter the data catalog
+        Index("ix_cmip6_dataset_facets", "source_id", "experiment_id", "variable_id", "table_id"),
+    )
+
     id: Mapped[int] = mapped_column(ForeignKey("dataset.id"), primary_key=True)
 
     activity_id: Mapped[str] = mapped_column()
@@ -94,7 +110,7 @@ class CMIP6Dataset(Dataset):
     vertical_levels: Mapped[int] = mapped_column()
     version: Mapped[str] = mapped_column()
 
-    instance_id: Mapped[str] = mapped_column()
+    instance_id: Mapped[str] = mapped_column(index=True)
     """
     Unique identifier for the dataset.
     """
@@ -115,7 +131,7 @@ class CMIP6File(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     dataset_id: Mapped[int] = mapped_column(
-        ForeignKey("cmip6_dataset.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("cmip6_dataset.id", ondelete="CASCADE"), nullable=False, index=True
     )
     """
     Foreign key to the dataset table
@@ -130,4 +146,63 @@ class CMIP6File(Base):
     Prefix that describes where the dataset is stored relative to the data directory
     """
 
+    # Fingerprint of the file when it was last ingested
+    # These are used to skip unchanged files when re-ingesting a directory
+    size: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    """
+    Size of the file in bytes
+    """
+    mtime: Mapped[float] = mapped_column(nullable=True)
+    """
+    Modification time of the file (seconds since the epoch)
+    """
+    inode: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    """
+    Inode number of the file
+    """
+
     dataset = relationship("CMIP6Dataset", backref="files")
+
+
+class CatalogGeneration(Base):
+    """
+    Counter of the changes to the datasets of a source type
+
+    The generation is incremented whenever datasets are added, modified or retracted.
+    Copies of the data catalog, such as the snapshots loaded by the solver,
+    are only valid while the generation is unchanged.
+    """
+
+    __tablename__ = "catalog_generation"
+
+    source_type: Mapped[SourceDatasetType] = mapped_column(primary_key=True)
+    generation: Mapped[int] = mapped_column(default=0)
+
+
+class DatasetChangeType(enum.Enum):
+    """
+    Types of changes to a dataset
+    """
+
+    INSERTED = "inserted"
+    UPDATED = "updated"
+    RETRACTED = "retracted"
+
+
+class DatasetChange(Base):
+    """
+    Log of the changes to the datasets
+
+    Each time a dataset is added, modified or retracted a row is appended with an increasing sequence number.
+    Consumers, such as the incremental solver, record the last sequence number that they processed
+    to find the datasets that have changed since.
+    """
+
+    __tablename__ = "dataset_change"
+    # Sequence numbers are never reused, even if the latest changes are deleted
+    __table_args__ = {"sqlite_autoincrement": True}  # noqa: RUF012
+
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    dataset_id: Mapped[int] = mapped_column(ForeignKey("dataset.id", ondelete="CASCADE"), index=True)
+    change: Mapped[DatasetChangeType] = mapped_column()
+    created_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now())
@@ -0,0 +1,223 @@
+"""
+Plan the filtering and grouping of a data catalog for the data requirements of many metrics
+
+The metrics of different providers often share the same filters,
+or start with the same filters (e.g. selecting a variable and excluding the same experiments),
+and group the datasets by the same facets.
+Before solving, the data requirements of all the metrics are fingerprinted
+so that the filters and groups that are shared by several requirements are only computed once per solve.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+from attrs import define, field
+from loguru import logger
+from numpy.typing import NDArray
+from ref_core.datasets import FacetFilter, FacetIndex
+from ref_core.metrics import DataRequirement
+
+FilterKey = tuple[bool, tuple[tuple[str, tuple[str, ...]], ...]]
+"""
+Fingerprint of a facet filter
+"""
+
+PartitionKey = tuple[tuple[FilterKey, ...], tuple[str, ...] | None]
+"""
+Fingerprint of the filters and `group_by` of a data requirement
+"""
+
+
+def filter_fingerprint(facet_filter: FacetFilter) -> FilterKey:
+    """
+    Build a hashable fingerprint of a facet filter
+
+    Filters that select the same datasets have the same fingerprint,
+    regardless of the order of their facets.
+
+    Parameters
+    ----------
+    facet_filter
+        Filter to fingerprint
+
+    Returns
+    -------
+    :
+        Fingerprint of the filter
+    """
+    return facet_filter.keep, tuple(sorted(facet_filter.facets.items()))
+
+
+def partition_fingerprint(requirement: DataRequirement) -> PartitionKey:
+    """
+    Build a hashable fingerprint of the filters and `group_by` of a data requirement
+
+    Parameters
+    ----------
+    requirement
+        Data requirement to fingerprint
+
+    Returns
+    -------
+    :
+        Fingerprint of the partition of the data catalog used by the requirement
+    """
+    filters = tuple(filter_fingerprint(facet_filter) for facet_filter in requirement.filters)
+    return filters, requirement.group_by
+
+
+def group_datasets(subset: pd.DataFrame, group_by: Sequence[str] | None) -> list[pd.DataFrame]:
+    """
+    Split a filtered data catalog into groups
+
+    Parameters
+    ----------
+    subset
+        Filtered data catalog
+    group_by
+        Facets to group by or None to use a single group
+
+    Returns
+    -------
+    :
+        Groups of datasets
+    """
+    if group_by is None:
+        return [subset]
+    # Only the combinations of facets that are present are used when grouping categorical columns
+    return [group for _, group in subset.groupby(list(group_by), observed=True)]
+
+
+@define
+class RequirementPlanner:
+    """
+    Filters and groups a data catalog for a set of data requirements, reusing shared work
+
+    The masks of filter prefixes and the groups of partitions that are used by more than one requirement
+    are kept for the lifetime of the planner.
+    The results are shared between requirements, so they must not be modified.
+    """
+
+    facet_index: FacetIndex
+    """
+    Index of the data catalog
+    """
+    shared_prefixes: frozenset[tuple[FilterKey, ...]] = frozenset()
+    """
+    Fingerprints of the filter prefixes used by more than one requirement
+    """
+    shared_partitions: frozenset[PartitionKey] = frozenset()
+    """
+    Fingerprints of the partitions used by more than one requirement
+    """
+    _masks: dict[tuple[FilterKey, ...], NDArray[np.bool_]] = field(factory=dict, init=False)
+    _groups: dict[PartitionKey, list[pd.DataFrame]] = field(factory=dict, init=False)
+
+    @classmethod
+    def plan(cls, facet_index: FacetIndex, requirements: Iterable[DataRequirement]) -> RequirementPlanner:
+        """
+        Find the filters and partitions that are shared by a collection of data requirements
+
+        Parameters
+        ----------
+        facet_index
+            Index of the data catalog that the requirements are solved against
+        requirements
+            Data requirements of all the metrics for the source type of the data catalog
+
+        Returns
+        -------
+        :
+            A planner for the requirements
+        """
+        prefixes: Counter[tuple[FilterKey, ...]] = Counter()
+        partitions: Counter[PartitionKey] = Counter()
+        for requirement in requirements:
+            partition = partition_fingerprint(requirement)
+            partitions[partition] += 1
+            filters = partition[0]
+            prefixes.update(filters[:i] for i in range(1, len(filters) + 1))
+
+        shared_prefixes = frozenset(prefix for prefix, count in prefixes.items() if count > 1)
+        shared_partitions = frozenset(partition for partition, count in partitions.items() if count > 1)
+        logger.debug(
+            f"Planned {sum(partitions.values())} data requirements "
+            f"with {len(partitions)} distinct partitions. "
+            f"{len(shared_prefixes)} filter prefixes and {len(shared_partitions)} partitions are shared"
+        )
+        return cls(facet_index, shared_prefixes=shared_prefixes, shared_partitions=shared_partitions)
+
+    @property
+    def data_catalog(self) -> pd.DataFrame:
+        """
+        The data catalog that is planned against
+        """
+        return self.facet_index.data_catalog
+
+    def mask(self, filters: Sequence[FacetFilter]) -> NDArray[np.bool_]:
+        """
+        Find the rows of the data catalog that pass a chain of filters
+
+        The mask of the longest shared prefix of the chain is reused if it has already been computed.
+
+        Parameters
+        ----------
+        filters
+            Filters to apply in order
+
+        Raises
+        ------
+        KeyError
+            If a facet is not a column of the data catalog
+
+        Returns
+        -------
+        :
+            Boolean mask of the rows that pass all the filters
+        """
+        return self._prefix_mask(filters, tuple(filter_fingerprint(facet_filter) for facet_filter in filters))
+
+    def _prefix_mask(self, filters: Sequence[FacetFilter], key: tuple[FilterKey, ...]) -> NDArray[np.bool_]:
+        if not key:
+            return np.ones(len(self.data_catalog), dtype=bool)
+
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._prefix_mask(filters[:-1], key[:-1]) & self.facet_index.mask(filters[-1:])
+            if key in self.shared_prefixes:
+                self._masks[key] = mask
+        return mask
+
+    def groups(self, requirement: DataRequirement) -> list[pd.DataFrame]:
+        """
+        Filter and group the data catalog for a data requirement
+
+        The constraints of the requirement are not applied.
+
+        Parameters
+        ----------
+        requirement
+            Data requirement
+
+        Raises
+        ------
+        KeyError
+            If a facet is not a column of the data catalog
+
+        Returns
+        -------
+        :
+            Groups of datasets that pass the filters of the requirement
+        """
+        key = partition_fingerprint(requirement)
+        groups = self._groups.get(key)
+        if groups is None:
+            subset = self.data_catalog[self.mask(requirement.filters)]
+            groups = group_datasets(subset, requirement.group_by) if len(subset) else []
+            if key in self.shared_partitions:
+                self._groups[key] = groups
+        return list(groups)
@@ -6,28 +6,41 @@ This module provides a solver to determine which metrics need to be calculated.
 This module is still a work in progress and is not yet fully implemented.
 """
 
-import itertools
 import pathlib
+import tempfile
 import typing
+from collections import Counter
+from collections.abc import Collection, Sequence
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
-from attrs import define, frozen
+from attrs import define, field, frozen
 from loguru import logger
-from ref_core.constraints import apply_constraint
-from ref_core.datasets import DatasetCollection, MetricDataset, SourceDatasetType
+from numpy.typing import NDArray
+from ref_core.constraints import GroupOperation, apply_constraint
+from ref_core.datasets import DatasetCollection, FacetFilter, FacetIndex, MetricDataset, SourceDatasetType
 from ref_core.exceptions import InvalidMetricException
 from ref_core.executor import get_executor
 from ref_core.metrics import DataRequirement, Metric, MetricExecutionDefinition
 from ref_core.providers import MetricsProvider
+from sqlalchemy import and_, delete, func, select, update
 
+from ref.config import Config
 from ref.database import Database
 from ref.datasets import get_dataset_adapter
+from ref.datasets.catalog import DataCatalog
+from ref.datasets.changelog import changed_datasets, load_facets
 from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.datasets.filters import required_columns
+from ref.datasets.shared import SharedCatalog, shared_directory
+from ref.datasets.snapshot import CatalogSnapshots
 from ref.env import env
 from ref.models import Metric as MetricModel
 from ref.models import MetricExecution as MetricExecutionModel
 from ref.models import Provider as ProviderModel
-from ref.models.metric_execution import MetricExecutionResult
+from ref.models.metric_execution import MetricExecutionResult, metric_datasets
+from ref.planner import RequirementPlanner, group_datasets
 from ref.provider_registry import ProviderRegistry
 
 
@@ -40,6 +53,13 @@ class MetricExecution:
     provider: MetricsProvider
     metric: Metric
     metric_dataset: MetricDataset
+    dataset_groups: tuple[pd.DataFrame, ...] = field(default=(), eq=False)
+    """
+    Group of datasets selected for each of the data requirements of the metric
+
+    The groups of requirements with the same source type are combined in `metric_dataset`.
+    If empty, the datasets of each requirement are taken from `metric_dataset`.
+    """
 
     def build_metric_execution_info(self) -> MetricExecutionDefinition:
         """
@@ -47,8 +67,11 @@ class MetricExecution:
         """
         # TODO: We might want to pretty print the dataset slug
         key_values = []
-        for requirement in self.metric.data_requirements:
-            source_datasets = self.metric_dataset[requirement.source_type]
+        for i, requirement in enumerate(self.metric.data_requirements):
+            if self.dataset_groups:
+                source_datasets = self.dataset_groups[i]
+            else:
+                source_datasets = self.metric_dataset[requirement.source_type].datasets
 
             _subset = source_datasets[list(requirement.group_by)] if requirement.group_by else source_datasets
             unique_values = _subset.drop_duplicates()
@@ -69,29 +92,39 @@ class MetricExecution:
         )
 
 
-def extract_covered_datasets(data_catalog: pd.DataFrame, requirement: DataRequirement) -> list[pd.DataFrame]:
+def extract_covered_datasets(
+    data_catalog: pd.DataFrame,
+    requirement: DataRequirement,
+    facet_index: FacetIndex | None = None,
+    planner: RequirementPlanner | None = None,
+) -> list[pd.DataFrame]:
     """
     Determine the different metric executions that should be performed with the current data catalog
+
+    If a `facet_index` of the data catalog is provided, it is used to apply the filters of the requirement.
+    If a `planner` for the data catalog is provided, the filters and groups that it shares
+    with other requirements are reused.
     """
     if len(data_catalog) == 0:
         logger.error(f"No datasets found in the data catalog: {requirement.source_type.value}")
         return []
 
-    subset = requirement.apply_filters(data_catalog)
+    if planner is not None:
+        groups = planner.groups(requirement)
+    else:
+        if facet_index is None:
+            subset = requirement.apply_filters(data_catalog)
+        else:
+            subset = facet_index.apply_filters(requirement.filters)
+        groups = group_datasets(subset, requirement.group_by) if len(subset) else []
 
-    if len(subset) == 0:
+    if not groups:
         logger.debug(f"No datasets found for requirement {requirement}")
         return []
 
-    if requirement.group_by is None:
-        # Use a single group
-        groups = [(None, subset)]
-    else:
-        groups = subset.groupby(list(requirement.group_by))  # type: ignore
-
     results = []
 
-    for name, group in groups:
+    for group in groups:
         constrained_group = _process_group_constraints(data_catalog, group, requirement)
 
         if constrained_group is not None:
@@ -112,6 +145,140 @@ def _process_group_constraints(
     return group
 
 
+def _join_values(group: pd.DataFrame, facets: Sequence[str]) -> dict[str, typing.Any] | None:
+    values = {}
+    for facet in facets:
+        unique_values = group[facet].drop_duplicates()
+        if len(unique_values) != 1:
+            logger.debug(f"Expected a single value of the join facet {facet!r} but got {len(unique_values)}")
+            return None
+        value = unique_values.iloc[0]
+        # Missing values never match, as NaN isn't equal to itself
+        if pd.isna(value):
+            logger.debug(f"Missing value of the join facet {facet!r}")
+            return None
+        values[facet] = value
+    return values
+
+
+def join_groups(
+    requirements: Sequence[DataRequirement], dataset_groups: Sequence[Sequence[pd.DataFrame]]
+) -> typing.Iterator[tuple[pd.DataFrame, ...]]:
+    """
+    Combine the groups of the data requirements of a metric
+
+    A group of each requirement is selected for each combination.
+    Groups are only combined if they have the same values for the `join_on` facets
+    that their requirements have in common.
+    Groups without a single, non-missing value for each of these facets are never combined,
+    while join facets that aren't shared with another requirement are ignored.
+    Requirements without any join facets in common are combined with every group of each other,
+    as a Cartesian product.
+
+    The groups of each requirement are indexed by the values of their join facets (a hash join),
+    so only the matching combinations are generated.
+
+    Parameters
+    ----------
+    requirements
+        Data requirements of the metric
+    dataset_groups
+        Groups of datasets for each of the data requirements
+
+    Yields
+    ------
+    :
+        A group of datasets for each requirement.
+
+        The combinations are generated in the same order as `itertools.product` of the groups.
+    """
+    # Only the join facets that are shared by more than one requirement are used to combine the groups
+    n_requirements = Counter(
+        facet for requirement in requirements for facet in set(requirement.join_on or ())
+    )
+    bound: set[str] = set()
+    lookups = []
+    for requirement, groups in zip(requirements, dataset_groups):
+        join_on = tuple(facet for facet in requirement.join_on or () if n_requirements[facet] > 1)
+        # Facets that have been bound by one of the previous requirements are used to look up the groups
+        lookup_facets = tuple(facet for facet in join_on if facet in bound)
+        bound.update(join_on)
+
+        table: dict[tuple[typing.Any, ...], list[tuple[pd.DataFrame, dict[str, typing.Any]]]] = {}
+        for group in groups:
+            values = _join_values(group, join_on)
+            if values is not None:
+                key = tuple(values[facet] for facet in lookup_facets)
+                table.setdefault(key, []).append((group, values))
+        lookups.append((lookup_facets, table))
+
+    def combine(
+        i: int, values: dict[str, typing.Any], combination: tuple[pd.DataFrame, ...]
+    ) -> typing.Iterator[tuple[pd.DataFrame, ...]]:
+        if i == len(lookups):
+            yield combination
+            return
+
+        lookup_facets, table = lookups[i]
+        for group, group_values in table.get(tuple(values[facet] for facet in lookup_facets), []):
+            yield from combine(i + 1, {**values, **group_values}, (*combination, group))
+
+    yield from combine(0, {}, ())
+
+
+def _can_solve_remotely(metric: Metric, data_catalog: dict[SourceDatasetType, pd.DataFrame]) -> bool:
+    """
+    Check if the groups of a metric can be solved by a worker process
+
+    Workers return the positions of the rows in each group,
+    so constraints that may modify a group or add other datasets are solved in the main process.
+    """
+    return all(
+        requirement.source_type in data_catalog
+        and not any(isinstance(constraint, GroupOperation) for constraint in requirement.constraints)
+        for requirement in metric.data_requirements
+    )
+
+
+def _solve_requirements(
+    tasks: Sequence[tuple[DataRequirement, SharedCatalog, NDArray[np.intp]]],
+) -> list[tuple[NDArray[np.intp], NDArray[np.intp]]]:
+    """
+    Solve the groups of the data requirements of a metric in a worker process
+
+    Each requirement is accompanied by the shared data catalog of its source type
+    and the positions of the rows that pass its filters,
+    so only those rows are read from the shared data catalog.
+
+    The groups of each requirement are returned as the concatenated positions of their rows
+    in the data catalog and the offsets of each group into those positions.
+    """
+    results = []
+    for requirement, shared_catalog, rows in tasks:
+        # The rows are indexed by their position so that the groups can be sent back as positions
+        subset = shared_catalog.take(rows)
+        subset.index = pd.Index(rows)
+        groups = group_datasets(subset, requirement.group_by) if len(subset) else []
+        # Constraints that use datasets from outside of the group aren't solved remotely,
+        # so the filtered rows can stand in for the data catalog
+        constrained_groups = [_process_group_constraints(subset, group, requirement) for group in groups]
+        positions = [group.index.to_numpy(dtype=np.intp) for group in constrained_groups if group is not None]
+        concatenated = np.concatenate(positions) if positions else np.array([], dtype=np.intp)
+        offsets = np.cumsum([0, *(len(group) for group in positions)], dtype=np.intp)
+        results.append((concatenated, offsets))
+    return results
+
+
+def _take_groups(
+    data_catalog: pd.DataFrame, rows: NDArray[np.intp], offsets: NDArray[np.intp]
+) -> list[pd.DataFrame]:
+    # Select the rows of all the groups at once and then split them into groups.
+    # Splitting using `groupby` is much faster than slicing each group from a DataFrame of categoricals
+    selected = data_catalog.iloc[rows]
+    labels = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return [group for _, group in selected.groupby(labels, sort=False)]
+
+
 @define
 class MetricSolver:
     """
@@ -120,9 +287,14 @@ class MetricSolver:
 
     provider_registry: ProviderRegistry
     data_catalog: dict[SourceDatasetType, pd.DataFrame]
+    catalogs: dict[SourceDatasetType, DataCatalog] = field(factory=dict)
+    """
+    Data catalogs that can be refreshed from the database
+    """
+    _facet_indexes: dict[SourceDatasetType, FacetIndex] = field(factory=dict, init=False)
 
     @staticmethod
-    def build_from_db(db: Database) -> "MetricSolver":
+    def build_from_db(db: Database, config: Config | None = None) -> "MetricSolver":
         """
         Initialise the solver using information from the database
 
@@ -130,20 +302,90 @@ class MetricSolver:
         ----------
         db
             Database instance
+        config
+            Configuration object.
+
+            If provided, the data catalogs are loaded from the snapshots in `config.paths.tmp`
+            if the datasets haven't changed since the snapshots were written.
 
         Returns
         -------
         :
             A new MetricSolver instance
         """
+        provider_registry = ProviderRegistry.build_from_db(db)
+
+        # Only load the datasets that could be used by one of the metrics
+        requirements = [
+            requirement
+            for provider in provider_registry.providers
+            for metric in provider.metrics()
+            for requirement in metric.data_requirements
+            if requirement.source_type == SourceDatasetType.CMIP6
+        ]
+        # Only load the columns that are used by the metrics
+        columns = required_columns(requirements)
+        snapshots = None if config is None else CatalogSnapshots.from_config(config)
+        catalog = DataCatalog.load(db, CMIP6DatasetAdapter(), requirements, columns, snapshots)
+
         return MetricSolver(
-            provider_registry=ProviderRegistry.build_from_db(db),
+            provider_registry=provider_registry,
             data_catalog={
-                SourceDatasetType.CMIP6: CMIP6DatasetAdapter().load_catalog(db),
+                SourceDatasetType.CMIP6: catalog.data,
+            },
+            catalogs={
+                SourceDatasetType.CMIP6: catalog,
             },
         )
 
-    def solve(self) -> typing.Generator[MetricExecution, None, None]:
+    def refresh(self, db: Database) -> int:
+        """
+        Update the data catalogs with the datasets that have changed since they were loaded
+
+        Only the data catalogs in `catalogs` are refreshed.
+
+        Parameters
+        ----------
+        db
+            Database instance
+
+        Returns
+        -------
+        :
+            Number of datasets that were reloaded or removed
+        """
+        n_changed = 0
+        for source_type, catalog in self.catalogs.items():
+            n_changed += catalog.refresh(db)
+            self.data_catalog[source_type] = catalog.data
+        return n_changed
+
+    def facet_index(self, source_type: SourceDatasetType) -> FacetIndex:
+        """
+        Get the facet index of the data catalog of a source type
+
+        The index is shared by all the metrics and rebuilt if the data catalog is replaced.
+
+        Parameters
+        ----------
+        source_type
+            Source type of the data catalog
+
+        Returns
+        -------
+        :
+            Index of the facets in the data catalog
+        """
+        data_catalog = self.data_catalog[source_type]
+        index = self._facet_indexes.get(source_type)
+        if index is None or index.data_catalog is not data_catalog:
+            index = FacetIndex(data_catalog)
+            self._facet_indexes[source_type] = index
+        return index
+
+    def solve(
+        self, n_jobs: int = 1, directory: pathlib.Path | None = None
+    ) -> typing.Generator[MetricExecution, None, None]:
         """
         Solve which metrics need to be calculated for a dataset
 
@@ -152,17 +394,200 @@ class MetricSolver:
         After each iteration we check if there are any more metrics to solve.
         This may not be the most efficient way to solve the metrics, but it's a start.
 
+        Parameters
+        ----------
+        n_jobs
+            Number of processes used to solve the data requirements of the metrics.
+
+            If greater than 1, the data catalogs are shared with a pool of worker processes
+            and the metrics are solved in parallel.
+            The metric executions are yielded in the same order regardless of the number of processes.
+        directory
+            Directory used to share the data catalogs with the worker processes
+            (see [shared_directory][ref.datasets.shared.shared_directory]).
+
+            Defaults to the system's temporary directory.
+
+        Yields
+        ------
+        MetricExecution
+            A class containing the information related to the execution of a metric
+        """
+        if n_jobs > 1:
+            yield from self._solve_parallel(n_jobs, directory or pathlib.Path(tempfile.gettempdir()))
+            return
+
+        planners = self.plan()
+        for provider in self.provider_registry.providers:
+            for metric in provider.metrics():
+                yield from self.solve_metric_executions(metric, provider, planners)
+
+    def _requirements(self) -> dict[SourceDatasetType, list[DataRequirement]]:
+        requirements: dict[SourceDatasetType, list[DataRequirement]] = {}
+        for provider in self.provider_registry.providers:
+            for metric in provider.metrics():
+                for requirement in metric.data_requirements:
+                    requirements.setdefault(requirement.source_type, []).append(requirement)
+        return requirements
+
+    def plan(self) -> dict[SourceDatasetType, RequirementPlanner]:
+        """
+        Plan the filtering and grouping of the data catalogs for the requirements of all the metrics
+
+        Returns
+        -------
+        :
+            Planner for the data catalog of each source type
+        """
+        return {
+            source_type: RequirementPlanner.plan(self.facet_index(source_type), source_requirements)
+            for source_type, source_requirements in self._requirements().items()
+            if source_type in self.data_catalog
+        }
+
+    def _solve_parallel(
+        self, n_jobs: int, directory: pathlib.Path
+    ) -> typing.Generator[MetricExecution, None, None]:
+        metrics = [
+            (provider, metric)
+            for provider in self.provider_registry.providers
+            for metric in provider.metrics()
+        ]
+        # Metrics that may use datasets from outside of their groups, or that are missing a data catalog,
+        # are solved in this process
+        remote = [_can_solve_remotely(metric, self.data_catalog) for _, metric in metrics]
+        planners = self.plan()
+        logger.info(f"Solving {sum(remote)} of {len(metrics)} metrics using {n_jobs} processes")
+
+        if not any(remote):
+            for provider, metric in metrics:
+                yield from self.solve_metric_executions(metric, provider, planners)
+            return
+
+        shared = {
+            source_type: SharedCatalog.publish(self.data_catalog[source_type], directory)
+            for source_type in {
+                requirement.source_type
+                for (_, metric), is_remote in zip(metrics, remote)
+                if is_remote
+                for requirement in metric.data_requirements
+            }
+        }
+        try:
+            # The catalogs are filtered in this process using the facet indexes,
+            # so each worker only reads the rows that pass the filters of a requirement
+            tasks = [
+                [
+                    (
+                        requirement,
+                        shared[requirement.source_type],
+                        np.flatnonzero(planners[requirement.source_type].mask(requirement.filters)),
+                    )
+                    for requirement in metric.data_requirements
+                ]
+                for (_, metric), is_remote in zip(metrics, remote)
+                if is_remote
+            ]
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                # The results are returned in the order that the metrics were submitted
+                results = pool.map(_solve_requirements, tasks)
+                for (provider, metric), is_remote in zip(metrics, remote):
+                    if not is_remote:
+                        yield from self.solve_metric_executions(metric, provider, planners)
+                        continue
+
+                    dataset_groups = [
+                        _take_groups(self.data_catalog[requirement.source_type], rows, offsets)
+                        for requirement, (rows, offsets) in zip(metric.data_requirements, next(results))
+                    ]
+                    yield from self._build_metric_executions(metric, provider, dataset_groups)
+        finally:
+            for shared_catalog in shared.values():
+                shared_catalog.unlink()
+
+    def solve_since(self, db: Database, seq: int) -> typing.Generator[MetricExecution, None, None]:
+        """
+        Solve which metric executions are affected by the datasets that changed since a given change
+
+        Only the groups whose `group_by` values match those of a dataset that was added, modified or
+        retracted since `seq` are recomputed, so the work scales with the number of changes
+        rather than the size of the data catalog.
+
+        All the groups of a metric are recomputed if it has multiple data requirements,
+        if a requirement doesn't group the datasets
+        or if a constraint may use datasets from outside of the group.
+
+        Parameters
+        ----------
+        db
+            Database instance
+        seq
+            Sequence number of the last change that has already been solved for.
+
+            See [latest_change][ref.datasets.changelog.latest_change].
+
         Yields
         ------
         MetricExecution
             A class containing the information related to the execution of a metric
         """
+        changed_ids = changed_datasets(db, since=seq)
+        if not changed_ids:
+            logger.info(f"No datasets have changed since {seq}")
+            return
+        logger.info(f"Solving for the {len(changed_ids)} datasets that changed since {seq}")
+
         for provider in self.provider_registry.providers:
             for metric in provider.metrics():
+                dataset_groups = []
+                for requirement in metric.data_requirements:
+                    groups = self._changed_groups(db, requirement, changed_ids)
+                    if groups is None or len(metric.data_requirements) > 1:
+                        break
+                    dataset_groups.append(groups)
+                else:
+                    yield from self._build_metric_executions(metric, provider, dataset_groups)
+                    continue
+
                 yield from self.solve_metric_executions(metric, provider)
 
+    def _changed_groups(
+        self, db: Database, requirement: DataRequirement, changed_ids: Collection[int]
+    ) -> list[pd.DataFrame] | None:
+        """
+        Find the groups of a data requirement that contain the key values of any of the changed datasets
+
+        Returns None if the affected groups can't be determined.
+        """
+        if requirement.group_by is None or requirement.source_type not in self.data_catalog:
+            return None
+        if any(isinstance(constraint, GroupOperation) for constraint in requirement.constraints):
+            return None
+
+        group_by = list(requirement.group_by)
+        adapter = get_dataset_adapter(requirement.source_type.value)
+        keys = load_facets(db, adapter.dataset_cls, changed_ids, group_by)
+        if keys is None:
+            return None
+        keys = keys.dropna()
+        if keys.empty:
+            return []
+
+        # Use the facet index to find the candidate rows before matching the combinations of key values
+        facet_filter = FacetFilter({facet: tuple(keys[facet].unique()) for facet in group_by})
+        candidates = self.facet_index(requirement.source_type).apply_filters([facet_filter])
+        is_changed = pd.MultiIndex.from_frame(candidates[group_by].astype(object)).isin(
+            list(keys.itertuples(index=False, name=None))
+        )
+
+        # The remaining constraints only use the datasets within a group
+        return extract_covered_datasets(candidates[is_changed], requirement)
+
     def solve_metric_executions(
-        self, metric: Metric, provider: MetricsProvider
+        self,
+        metric: Metric,
+        provider: MetricsProvider,
+        planners: dict[SourceDatasetType, RequirementPlanner] | None = None,
     ) -> typing.Generator[MetricExecution, None, None]:
         """
         Calculate the metric executions that need to be performed for a given metric
@@ -173,6 +598,10 @@ class MetricSolver:
             Metric of interest
         provider
             Provider of the metric
+        planners
+            Planners used to share the filters and groups with other metrics
+
+            See [plan][ref.solver.MetricSolver.plan].
 
         Returns
         -------
@@ -181,7 +610,7 @@ class MetricSolver:
 
         """
         # Collect up the different data groups that can be used to calculate the metric
-        dataset_groups = {}
+        dataset_groups = []
 
         for requirement in metric.data_requirements:
             if requirement.source_type not in self.data_catalog:
@@ -189,79 +618,264 @@ class MetricSolver:
                     metric, f"No data catalog for source type {requirement.source_type}"
                 )
 
-            dataset_groups[requirement.source_type] = extract_covered_datasets(
-                self.data_catalog[requirement.source_type], requirement
+            dataset_groups.append(
+                extract_covered_datasets(
+                    self.data_catalog[requirement.source_type],
+                    requirement,
+                    self.facet_index(requirement.source_type),
+                    planners.get(requirement.source_type) if planners else None,
+                )
             )
 
-        # I'm not sure if the right approach here is a product of the groups
-        for items in itertools.product(*dataset_groups.values()):
+        yield from self._build_metric_executions(metric, provider, dataset_groups)
+
+    def _build_metric_executions(
+        self,
+        metric: Metric,
+        provider: MetricsProvider,
+        dataset_groups: list[list[pd.DataFrame]],
+    ) -> typing.Generator[MetricExecution, None, None]:
+        for items in join_groups(metric.data_requirements, dataset_groups):
+            # Requirements for the same source type share a collection of datasets
+            collections: dict[SourceDatasetType, list[pd.DataFrame]] = {}
+            for requirement, group in zip(metric.data_requirements, items):
+                collections.setdefault(requirement.source_type, []).append(group)
+
             yield MetricExecution(
                 provider=provider,
                 metric=metric,
                 metric_dataset=MetricDataset(
                     {
                         key: DatasetCollection(
-                            datasets=value, slug_column=get_dataset_adapter(key.value).slug_column
+                            datasets=groups[0] if len(groups) == 1 else pd.concat(groups),
+                            slug_column=get_dataset_adapter(key.value).slug_column,
                         )
-                        for key, value in zip(dataset_groups.keys(), items)
+                        for key, groups in collections.items()
                     }
                 ),
+                dataset_groups=items,
+            )
+
+
+@frozen
+class ExecutionState:
+    """
+    State of an existing metric execution
+    """
+
+    execution_id: int
+    dirty: bool
+    dataset_hash: str | None
+    """
+    Hash of the datasets used by the most recent result or None if the execution has never been run
+    """
+
+    def should_run(self, key: str, dataset_hash: str) -> bool:
+        """
+        Check if a new run of the metric execution should be performed
+
+        See [should_run][ref.models.metric_execution.MetricExecution.should_run].
+        """
+        if self.dataset_hash is None:
+            logger.debug(f"Execution {key} no previous results")
+            return True
+
+        if self.dataset_hash != dataset_hash:
+            logger.debug(f"Execution {key} hash mismatch: {self.dataset_hash} != {dataset_hash}")
+            return True
+
+        if self.dirty:
+            logger.debug(f"Execution {key} is dirty")
+            return True
+
+        return False
+
+
+@define
+class ExecutionStates:
+    """
+    Metrics and the state of their executions, preloaded from the database for a solve
+    """
+
+    metric_ids: dict[tuple[str, str, str], int]
+    """
+    Id of each metric keyed by the slug and version of the provider and the slug of the metric
+    """
+    executions: dict[tuple[int, str], ExecutionState]
+    """
+    State of each execution keyed by the metric id and the key of the execution
+    """
+
+    @classmethod
+    def from_db(cls, db: Database) -> "ExecutionStates":
+        """
+        Load the metrics and executions using a query for each
+
+        Parameters
+        ----------
+        db
+            Database instance
+
+        Returns
+        -------
+        :
+            The current state of the metric executions
+        """
+        metric_ids = {
+            (provider_slug, version, metric_slug): metric_id
+            for provider_slug, version, metric_slug, metric_id in db.session.execute(
+                select(ProviderModel.slug, ProviderModel.version, MetricModel.slug, MetricModel.id).join(
+                    MetricModel.provider
+                )
+            )
+        }
+
+        # Rank the results of each execution to find the most recent
+        results = select(
+            MetricExecutionResult.metric_execution_id,
+            MetricExecutionResult.dataset_hash,
+            func.row_number()
+            .over(
+                partition_by=MetricExecutionResult.metric_execution_id,
+                order_by=(MetricExecutionResult.created_at.desc(), MetricExecutionResult.id.desc()),
             )
+            .label("rank"),
+        ).subquery()
+        query = select(
+            MetricExecutionModel.metric_id,
+            MetricExecutionModel.key,
+            MetricExecutionModel.id,
+            MetricExecutionModel.dirty,
+            results.c.dataset_hash,
+        ).outerjoin(
+            results,
+            and_(results.c.metric_execution_id == MetricExecutionModel.id, results.c.rank == 1),
+        )
+        executions = {
+            (metric_id, key): ExecutionState(
+                execution_id=execution_id, dirty=dirty, dataset_hash=dataset_hash
+            )
+            for metric_id, key, execution_id, dirty, dataset_hash in db.session.execute(query)
+        }
+        logger.debug(f"Loaded the state of {len(executions)} metric executions")
+
+        return cls(metric_ids=metric_ids, executions=executions)
+
+    def metric_id(self, provider: MetricsProvider, metric: Metric) -> int:
+        """
+        Get the id of a metric
+
+        Raises
+        ------
+        InvalidMetricException
+            If the metric hasn't been registered in the database
+
+        Returns
+        -------
+        :
+            Id of the metric
+        """
+        try:
+            return self.metric_ids[(provider.slug, provider.version, metric.slug)]
+        except KeyError:
+            raise InvalidMetricException(
+                metric, f"Metric {metric.slug} of {provider.slug} {provider.version} is not registered"
+            ) from None
 
 
-def solve_metrics(db: Database, dry_run: bool = False, solver: MetricSolver | None = None) -> None:
+def _delete_result(db: Database, execution_id: int, dataset_hash: str) -> None:
+    """
+    Delete the result of a previous run of an execution with the same datasets
+
+    The hash of the datasets doesn't change when their files are modified in place,
+    so rerunning a dirty execution would otherwise duplicate an existing result.
+    The previous result is replaced by the new run.
+    """
+    result_ids = select(MetricExecutionResult.id).where(
+        MetricExecutionResult.metric_execution_id == execution_id,
+        MetricExecutionResult.dataset_hash == dataset_hash,
+    )
+    db.session.execute(
+        delete(metric_datasets).where(metric_datasets.c.metric_execution_result_id.in_(result_ids))
+    )
+    db.session.execute(delete(MetricExecutionResult).where(MetricExecutionResult.id.in_(result_ids)))
+
+
+def solve_metrics(  # noqa: PLR0913
+    db: Database,
+    dry_run: bool = False,
+    solver: MetricSolver | None = None,
+    config: Config | None = None,
+    since: int | None = None,
+    n_jobs: int = 1,
+) -> None:
     """
     Solve for metrics that require recalculation
 
     This may trigger a number of additional calculations depending on what data has been ingested
     since the last solve.
+
+    If `config` is provided, the data catalogs are loaded from snapshots where possible.
+    If `since` is provided, only the metric executions affected by the datasets
+    that changed after that point in the change log are considered
+    (see [solve_since][ref.solver.MetricSolver.solve_since]).
+    Otherwise, the metrics are solved using `n_jobs` processes.
     """
     if solver is None:
-        solver = MetricSolver.build_from_db(db)
+        solver = MetricSolver.build_from_db(db, config=config)
 
     logger.info("Solving for metrics that require recalculation...")
 
     executor = get_executor(env.str("REF_EXECUTOR", "local"))
 
-    for metric_execution in solver.solve():
+    if since is not None:
+        metric_executions = solver.solve_since(db, since)
+    else:
+        directory = None if config is None else shared_directory(config)
+        metric_executions = solver.solve(n_jobs=n_jobs, directory=directory)
+    # The state of the existing executions is loaded up front rather than queried for each candidate
+    states = None if dry_run else ExecutionStates.from_db(db)
+
+    for metric_execution in metric_executions:
         info = metric_execution.build_metric_execution_info()
 
         logger.debug(f"Identified candidate metric execution {info.key}")
 
-        if not dry_run:
-            metric_execution_model, created = db.get_or_create(
-                MetricExecutionModel,
-                key=info.key,
-                metric_id=db.session.query(MetricModel)
-                .join(MetricModel.provider)
-                .filter(
-                    ProviderModel.slug == metric_execution.provider.slug,
-                    ProviderModel.version == metric_execution.provider.version,
-                    MetricModel.slug == metric_execution.metric.slug,
-                )
-                .one()
-                .id,
-                defaults={
-                    "dirty": True,
-                    "retracted": False,
-                },
-            )
-
-            if created:
-                logger.info(f"Created metric execution {info.key}")
-                db.session.flush()
-
-            if metric_execution_model.should_run(info.metric_dataset.hash):
-                logger.info(f"Running metric {metric_execution_model.key}")
-                metric_execution_result = MetricExecutionResult(
-                    metric_execution=metric_execution_model, dataset_hash=info.metric_dataset.hash
-                )
-                db.session.add(metric_execution_result)
-                db.session.flush()
+        if states is None:
+            continue
 
-                # Add links to the datasets used in the execution
-                metric_execution_result.register_datasets(db, info.metric_dataset)
-
-                executor.run_metric(metric=metric_execution.metric, definition=info)
-                metric_execution_result.successful = True
-                metric_execution_model.dirty = False
+        metric_id = states.metric_id(metric_execution.provider, metric_execution.metric)
+        state = states.executions.get((metric_id, info.key))
+        if state is None:
+            metric_execution_model = MetricExecutionModel(
+                key=info.key, metric_id=metric_id, dirty=True, retracted=False
+            )
+            db.session.add(metric_execution_model)
+            db.session.flush()
+            logger.info(f"Created metric execution {info.key}")
+            state = ExecutionState(execution_id=metric_execution_model.id, dirty=True, dataset_hash=None)
+            states.executions[(metric_id, info.key)] = state
+
+        if state.should_run(info.key, info.metric_dataset.hash):
+            logger.info(f"Running metric {info.key}")
+            if state.dataset_hash is not None:
+                _delete_result(db, state.execution_id, info.metric_dataset.hash)
+            metric_execution_result = MetricExecutionResult(
+                metric_execution_id=state.execution_id, dataset_hash=info.metric_dataset.hash
+            )
+            db.session.add(metric_execution_result)
+            db.session.flush()
+
+            # Add links to the datasets used in the execution
+            metric_execution_result.register_datasets(db, info.metric_dataset)
+
+            executor.run_metric(metric=metric_execution.metric, definition=info)
+            metric_execution_result.successful = True
+            db.session.execute(
+                update(MetricExecutionModel)
+                .where(MetricExecutionModel.id == state.execution_id)
+                .values(dirty=False)
+            )
+            states.executions[(metric_id, info.key)] = ExecutionState(
+                execution_id=state.execution_id, dirty=False, dataset_hash=info.metric_dataset.hash
+            )
@@ -0,0 +1,38 @@
+from typer.testing import CliRunner
+
+from ref.cli import app
+from ref.datasets.cache import MetadataCache
+
+runner = CliRunner()
+
+
+def test_cache_help():
+    result = runner.invoke(app, ["cache", "--help"])
+    assert result.exit_code == 0
+
+    assert "Inspect and prune the cache of parsed file metadata" in result.output
+
+
+def test_list(config, tmp_path):
+    path = tmp_path / "file.nc"
+    path.write_text("data")
+    MetadataCache.from_config(config).set_many("parse_cmip6", [{"path": str(path)}])
+
+    result = runner.invoke(app, ["cache", "list"])
+    assert result.exit_code == 0, result.output
+    assert "parse_cmip6" in result.output
+
+
+def test_prune(config, tmp_path):
+    path = tmp_path / "file.nc"
+    path.write_text("data")
+    cache = MetadataCache.from_config(config)
+    cache.set_many("parse_cmip6", [{"path": str(path)}])
+
+    result = runner.invoke(app, ["cache", "prune"])
+    assert result.exit_code == 0, result.output
+    assert "Removed 0 entries from the cache" in result.output
+
+    result = runner.invoke(app, ["cache", "prune", "--all"])
+    assert result.exit_code == 0, result.output
+    assert "Removed 1 entries from the cache" in result.output
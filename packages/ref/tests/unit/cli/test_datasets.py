@@ -1,8 +1,13 @@
+import json
+import shutil
 from pathlib import Path
 
+import pandas as pd
+import pytest
 from typer.testing import CliRunner
 
 from ref.cli import app
+from ref.datasets.cache import MetadataCache
 from ref.datasets.cmip6 import CMIP6DatasetAdapter
 from ref.models import Dataset
 from ref.models.dataset import CMIP6Dataset, CMIP6File
@@ -130,6 +135,157 @@ class TestIngest:
 
         assert db.session.query(Dataset).count() == 2
 
+    def test_ingest_drs_parser(self, esgf_data_dir, db):
+        result = runner.invoke(
+            app,
+            [
+                "datasets",
+                "ingest",
+                str(esgf_data_dir / self.data_dir),
+                "--source-type",
+                "cmip6",
+                "--parser",
+                "drs",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert db.session.query(CMIP6Dataset).count() == 5
+        assert db.session.query(CMIP6File).count() == 9
+
+    def test_ingest_invalid_parser(self, esgf_data_dir, db):
+        result = runner.invoke(
+            app,
+            [
+                "datasets",
+                "ingest",
+                str(esgf_data_dir / self.data_dir),
+                "--source-type",
+                "cmip6",
+                "--parser",
+                "unknown",
+            ],
+        )
+        assert result.exit_code == 2
+        assert "Invalid value for '--parser'" in result.output
+        assert db.session.query(Dataset).count() == 0
+
+    def test_ingest_stream(self, esgf_data_dir, db):
+        result = runner.invoke(
+            app,
+            [
+                "--log-level",
+                "info",
+                "datasets",
+                "ingest",
+                str(esgf_data_dir / self.data_dir),
+                "--source-type",
+                "cmip6",
+                "--stream",
+                "--batch-size",
+                "2",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert "Processed 9 files for 5 datasets" in result.output
+        assert "Added or updated 5 datasets" in result.output
+        assert db.session.query(CMIP6Dataset).count() == 5
+        assert db.session.query(CMIP6File).count() == 9
+
+    def test_ingest_follow_symlinks(self, esgf_data_dir, tmp_path, db):
+        (tmp_path / "linked").symlink_to(esgf_data_dir / self.data_dir, target_is_directory=True)
+
+        result = runner.invoke(
+            app, ["datasets", "ingest", str(tmp_path), "--source-type", "cmip6", "--follow-symlinks"]
+        )
+        assert result.exit_code == 0, result.output
+
+        assert db.session.query(CMIP6Dataset).count() == 5
+
+    def test_ingest_multiple_roots(self, esgf_data_dir, db):
+        roots = [str(esgf_data_dir / self.data_dir / "Amon"), str(esgf_data_dir / self.data_dir / "fx")]
+        result = runner.invoke(
+            app, ["datasets", "ingest", *roots, "--source-type", "cmip6", "--n-threads", "2"]
+        )
+        assert result.exit_code == 0, result.output
+        assert db.session.query(CMIP6Dataset).count() == 5
+        assert db.session.query(CMIP6File).count() == 9
+
+    def test_ingest_manifest(self, tmp_path, esgf_data_dir, db):
+        files = sorted((esgf_data_dir / self.data_dir / "Amon").rglob("*.nc"))
+        manifest = tmp_path / "manifest.txt"
+        manifest.write_text("\n".join(str(path) for path in files))
+
+        result = runner.invoke(
+            app, ["datasets", "ingest", "--manifest", str(manifest), "--source-type", "cmip6"]
+        )
+        assert result.exit_code == 0, result.output
+        assert db.session.query(CMIP6Dataset).count() == 4
+        assert db.session.query(CMIP6File).count() == 8
+
+        result = runner.invoke(
+            app,
+            ["datasets", "ingest", str(esgf_data_dir), "--manifest", str(manifest), "--source-type", "cmip6"],
+        )
+        assert result.exit_code == 1
+
+    def test_ingest_no_inputs(self, db):
+        result = runner.invoke(app, ["datasets", "ingest", "--source-type", "cmip6"])
+        assert result.exit_code == 1
+
+    def test_ingest_from_catalog(self, tmp_path, cmip6_data_catalog, db):
+        catalog = cmip6_data_catalog.drop(columns=["instance_id"])
+        # The files in the catalog are never accessed
+        catalog["path"] = catalog["path"].str.replace(str(Path(catalog["path"].iloc[0]).anchor), "/missing/")
+        catalog.to_csv(tmp_path / "catalog.csv.gz", index=False)
+
+        result = runner.invoke(
+            app,
+            [
+                "datasets",
+                "ingest",
+                "--from-catalog",
+                str(tmp_path / "catalog.csv.gz"),
+                "--source-type",
+                "cmip6",
+                "--batch-size",
+                "4",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert db.session.query(CMIP6Dataset).count() == 5
+        assert db.session.query(CMIP6File).count() == 9
+        assert db.session.query(CMIP6File).filter(CMIP6File.size.is_not(None)).count() == 0
+
+    def test_ingest_from_catalog_and_directory(self, tmp_path, esgf_data_dir, cmip6_data_catalog, db):
+        cmip6_data_catalog.to_csv(tmp_path / "catalog.csv", index=False)
+
+        result = runner.invoke(
+            app,
+            [
+                "datasets",
+                "ingest",
+                str(esgf_data_dir),
+                "--from-catalog",
+                str(tmp_path / "catalog.csv"),
+                "--source-type",
+                "cmip6",
+            ],
+        )
+        assert result.exit_code == 1
+
+    def test_ingest_incremental(self, esgf_data_dir, db):
+        args = ["datasets", "ingest", str(esgf_data_dir / self.data_dir), "--source-type", "cmip6"]
+
+        result = runner.invoke(app, [*args, "--incremental"])
+        assert result.exit_code == 0, result.output
+        assert db.session.query(CMIP6File).count() == 9
+
+        result = runner.invoke(app, ["--log-level", "info", *args, "--incremental"])
+        assert result.exit_code == 0, result.output
+        assert "Skipping 9 unchanged files" in result.output
+        assert "Found 0 files for 0 datasets" in result.output
+        assert db.session.query(CMIP6File).count() == 9
+
     def test_ingest_missing(self, esgf_data_dir, db):
         result = runner.invoke(
             app, ["datasets", "ingest", str(esgf_data_dir / "missing"), "--source-type", "cmip6"]
@@ -139,6 +295,17 @@ class TestIngest:
 
         assert f'File or directory {esgf_data_dir / "missing"} does not exist' in result.output
 
+    @pytest.mark.parametrize("options, n_cached", [([], 0), (["--cache"], 9)])
+    def test_ingest_cache(self, esgf_data_dir, config, db, options, n_cached):
+        result = runner.invoke(
+            app,
+            ["datasets", "ingest", str(esgf_data_dir / self.data_dir), "--source-type", "cmip6", *options],
+        )
+        assert result.exit_code == 0, result.output
+
+        # The metadata is only cached when requested
+        assert MetadataCache.from_config(config).summary()["files"].sum() == n_cached
+
     def test_ingest_dryrun(self, esgf_data_dir, db):
         result = runner.invoke(
             app, ["datasets", "ingest", str(esgf_data_dir), "--source-type", "cmip6", "--dry-run"]
@@ -147,3 +314,87 @@ class TestIngest:
 
         # Check that no data was loaded
         assert db.session.query(Dataset).count() == 0
+
+    @pytest.mark.parametrize("options", [[], ["--dry-run"], ["--stream", "--dry-run"]])
+    def test_ingest_without_quarantine(self, esgf_data_dir, config, db, options):
+        result = runner.invoke(
+            app,
+            ["datasets", "ingest", str(esgf_data_dir / self.data_dir), "--source-type", "cmip6", *options],
+        )
+        assert result.exit_code == 0, result.output
+
+        # The quarantine report is only written by a streamed ingestion
+        assert list((config.paths.log / "ingest").glob("*.quarantine.csv")) == []
+
+    def test_ingest_resume(self, esgf_data_dir, config, db):
+        # Simulate a previous run that was interrupted after ingesting the fx dataset
+        fx_file = next((esgf_data_dir / self.data_dir / "fx").rglob("*.nc"))
+        journal_dir = config.paths.log / "ingest"
+        journal_dir.mkdir(parents=True)
+        journal = journal_dir / "previous.jsonl"
+        journal.write_text(json.dumps({"directories": [str(fx_file.parent)], "datasets": []}) + "\n")
+
+        args = ["datasets", "ingest", str(esgf_data_dir / self.data_dir), "--source-type", "cmip6"]
+        result = runner.invoke(app, ["--log-level", "info", *args, "--stream"])
+        assert result.exit_code == 0, result.output
+        (journal_path,) = set(journal_dir.glob("*.jsonl")) - {journal}
+
+        journal_path.write_text(journal.read_text())
+        db.session.query(CMIP6File).delete()
+        db.session.query(CMIP6Dataset).delete()
+        db.session.query(Dataset).delete()
+        db.session.commit()
+
+        result = runner.invoke(app, ["--log-level", "info", *args, "--resume"])
+        assert result.exit_code == 0, result.output
+        assert "Processed 8 files for 4 datasets" in result.output
+        assert db.session.query(CMIP6Dataset).count() == 4
+        assert len(journal_path.read_text().splitlines()) > 1
+
+    def test_ingest_quarantine(self, esgf_data_dir, config, db):
+        config.paths.allow_out_of_tree_datasets = False
+        config.save()
+
+        result = runner.invoke(
+            app,
+            [
+                "--log-level",
+                "info",
+                "datasets",
+                "ingest",
+                str(esgf_data_dir / self.data_dir),
+                "--source-type",
+                "cmip6",
+                "--stream",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert "9 files were quarantined" in result.output
+        assert db.session.query(CMIP6Dataset).count() == 0
+
+        (report,) = (config.paths.log / "ingest").glob("*.quarantine.csv")
+        quarantined = pd.read_csv(report)
+        assert len(quarantined) == 9
+        assert (quarantined["stage"] == "register").all()
+
+
+class TestReconcile:
+    def test_reconcile(self, esgf_data_dir, tmp_path, db):
+        data_dir = tmp_path / "copy"
+        shutil.copytree(esgf_data_dir / TestIngest.data_dir, data_dir)
+        result = runner.invoke(app, ["datasets", "ingest", str(data_dir), "--source-type", "cmip6"])
+        assert result.exit_code == 0, result.output
+
+        fx_file = next(data_dir.rglob("areacella_*.nc"))
+        fx_file.unlink()
+
+        result = runner.invoke(app, ["--log-level", "info", "datasets", "reconcile", "--dry-run"])
+        assert result.exit_code == 0, result.output
+        assert f"Missing file: {fx_file}" in result.output
+        assert "Would retract dataset" in result.output
+
+        result = runner.invoke(app, ["--log-level", "info", "datasets", "reconcile"])
+        assert result.exit_code == 0, result.output
+        assert "Found 1 missing and 0 modified files. 0 datasets updated and 1 retracted" in result.output
+        assert "Marked 0 metric executions as dirty" in result.output
+        assert db.session.query(CMIP6File).count() == 8
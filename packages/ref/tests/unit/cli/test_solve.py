@@ -16,3 +16,7 @@ class TestSolve:
     def test_solve_without_datasets(self, esgf_data_dir, db):
         result = runner.invoke(app, ["solve"])
         assert result.exit_code == 0, result.output
+
+    def test_solve_jobs(self, esgf_data_dir, db):
+        result = runner.invoke(app, ["solve", "--jobs", "2", "--dry-run"])
+        assert result.exit_code == 0, result.output
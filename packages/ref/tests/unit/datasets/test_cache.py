@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+from ref.datasets.cache import MetadataCache
+
+
+@pytest.fixture
+def cache(config):
+    return MetadataCache.from_config(config)
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"file_{i}.nc"
+        path.write_text(f"file {i}")
+        paths.append(str(path))
+    return paths
+
+
+def test_from_config(config, cache):
+    assert cache.filename == config.paths.cache / "metadata.db"
+    assert cache.filename.exists()
+
+
+def test_round_trip(cache, files):
+    cache.set_many(
+        "parser", [{"path": path, "variable_id": "tas", "vertical_levels": np.int64(1)} for path in files]
+    )
+
+    result = cache.get_many("parser", files)
+
+    assert result == {path: {"path": path, "variable_id": "tas", "vertical_levels": 1} for path in files}
+    assert cache.get_many("other", files) == {}
+
+
+def test_stale_entries_evicted(cache, files):
+    cache.set_many("parser", [{"path": path} for path in files])
+
+    with open(files[0], "a") as fh:
+        fh.write("modified")
+    os.remove(files[1])
+
+    assert cache.get_many("parser", files) == {files[2]: {"path": files[2]}}
+    assert cache.summary()["files"].tolist() == [1]
+
+
+def test_summary(cache, files):
+    assert cache.summary().empty
+
+    cache.set_many("parser", [{"path": path} for path in files])
+    cache.set_many("other", [{"path": files[0]}])
+
+    summary = cache.summary().sort_values("parser")
+    assert summary["parser"].tolist() == ["other", "parser"]
+    assert summary["files"].tolist() == [1, 3]
+
+
+def test_prune(cache, files):
+    cache.set_many("parser", [{"path": path} for path in files])
+    os.remove(files[1])
+
+    assert cache.prune() == 1
+    assert cache.summary()["files"].tolist() == [2]
+
+    assert cache.prune(clear=True) == 2
+    assert cache.summary().empty
@@ -0,0 +1,74 @@
+import pandas as pd
+from sqlalchemy import func, update
+
+from ref.datasets.catalog import CatalogWatermark, DataCatalog
+from ref.datasets.changelog import record_changes
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.models import Dataset
+from ref.models.dataset import DatasetChangeType
+
+
+def _register(config, db, data_catalog):
+    adapter = CMIP6DatasetAdapter()
+    with db.session.begin():
+        for _, dataset in data_catalog.groupby(adapter.slug_column):
+            adapter.register_dataset(config, db, dataset)
+
+
+def _assert_catalogs_equal(result, expected):
+    result = result.astype(object).sort_values("path")
+    expected = expected.astype(object).sort_values("path")
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_watermark_empty(db):
+    with db.session.begin():
+        watermark = CatalogWatermark.from_db(db)
+
+    assert watermark == CatalogWatermark(seq=0)
+
+
+def test_refresh_added(config, db, cmip6_data_catalog):
+    adapter = CMIP6DatasetAdapter()
+    is_fx = cmip6_data_catalog["table_id"] == "fx"
+    _register(config, db, cmip6_data_catalog[~is_fx])
+    with db.session.begin():
+        catalog = DataCatalog.load(db, adapter)
+    assert catalog.data["instance_id"].nunique() == 4
+
+    _register(config, db, cmip6_data_catalog[is_fx])
+    with db.session.begin():
+        # Only the dataset that was added is loaded
+        assert catalog.refresh(db) == 1
+        expected = adapter.load_catalog(db)
+
+    _assert_catalogs_equal(catalog.data, expected)
+    assert isinstance(catalog.data["variable_id"].dtype, pd.CategoricalDtype)
+    # The categories are the same (and in the same order) as those of a fresh load
+    for column in expected.select_dtypes("category"):
+        pd.testing.assert_index_equal(catalog.data[column].cat.categories, expected[column].cat.categories)
+    assert catalog.data["table_id"].iloc[0] == "fx"
+
+    with db.session.begin():
+        assert catalog.refresh(db) == 0
+    _assert_catalogs_equal(catalog.data, expected)
+
+
+def test_refresh_retracted(db_seeded):
+    adapter = CMIP6DatasetAdapter()
+    with db_seeded.session.begin():
+        catalog = DataCatalog.load(db_seeded, adapter, columns=["variable_id"])
+        slug = catalog.data["instance_id"].iloc[0]
+        dataset_id = db_seeded.session.execute(
+            update(Dataset)
+            .where(Dataset.slug == slug)
+            .values(retracted=True, updated_at=func.now())
+            .returning(Dataset.id)
+        ).scalar_one()
+        record_changes(db_seeded, [dataset_id], DatasetChangeType.RETRACTED)
+
+        assert catalog.refresh(db_seeded) == 1
+        expected = adapter.load_catalog(db_seeded, columns=["variable_id"])
+
+    assert slug not in catalog.data["instance_id"].values
+    _assert_catalogs_equal(catalog.data, expected)
@@ -0,0 +1,79 @@
+import shutil
+
+from ref.datasets.changelog import changed_datasets, latest_change, load_facets, record_changes
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.models import Dataset
+from ref.models.dataset import CMIP6Dataset, CMIP6File, DatasetChange, DatasetChangeType
+
+
+def _changes(db, since=0):
+    query = db.session.query(Dataset.slug, DatasetChange.change).join(
+        DatasetChange, DatasetChange.dataset_id == Dataset.id
+    )
+    return set(query.filter(DatasetChange.seq > since).all())
+
+
+def test_latest_change_empty(db):
+    with db.session.begin():
+        assert latest_change(db) == 0
+        assert changed_datasets(db, since=0) == set()
+
+
+def test_record_changes(db_seeded):
+    with db_seeded.session.begin():
+        seq = latest_change(db_seeded)
+        dataset_ids = [dataset.id for dataset in db_seeded.session.query(Dataset).limit(2)]
+
+        record_changes(db_seeded, dataset_ids, DatasetChangeType.UPDATED)
+        record_changes(db_seeded, [], DatasetChangeType.UPDATED)
+
+        assert latest_change(db_seeded) == seq + 2
+        assert changed_datasets(db_seeded, since=seq) == set(dataset_ids)
+        assert changed_datasets(db_seeded, since=seq + 2) == set()
+
+
+def test_register_datasets(config, db, cmip6_data_catalog):
+    adapter = CMIP6DatasetAdapter()
+    adapter.register_datasets(config, db, cmip6_data_catalog, chunk_size=2)
+
+    with db.session.begin():
+        slugs = set(cmip6_data_catalog[adapter.slug_column].unique())
+        assert _changes(db) == {(slug, DatasetChangeType.INSERTED) for slug in slugs}
+
+        seq = latest_change(db)
+        file = db.session.query(CMIP6File).order_by(CMIP6File.path).first()
+        file.size = 0
+        slug = file.dataset.slug
+
+    adapter.register_datasets(config, db, cmip6_data_catalog)
+
+    with db.session.begin():
+        assert _changes(db, since=seq) == {(slug, DatasetChangeType.UPDATED)}
+
+
+def test_reconcile_datasets(config, db, esgf_data_dir, tmp_path):
+    data_dir = tmp_path / "copy"
+    shutil.copytree(esgf_data_dir, data_dir)
+    adapter = CMIP6DatasetAdapter()
+    adapter.register_datasets(config, db, adapter.find_local_datasets(data_dir))
+
+    with db.session.begin():
+        seq = latest_change(db)
+    fx_file = next(data_dir.rglob("areacella_*.nc"))
+    fx_file.unlink()
+
+    result = adapter.reconcile_datasets(config, db)
+
+    with db.session.begin():
+        assert _changes(db, since=seq) == {(result.retracted_datasets[0], DatasetChangeType.RETRACTED)}
+
+
+def test_load_facets(db_seeded):
+    with db_seeded.session.begin():
+        dataset = db_seeded.session.query(CMIP6Dataset).filter_by(variable_id="tas").first()
+
+        facets = load_facets(db_seeded, CMIP6Dataset, [dataset.id, -1], ["variable_id", "source_id"])
+        assert facets.to_dict(orient="records") == [{"variable_id": "tas", "source_id": dataset.source_id}]
+
+        # Facets that aren't columns of the dataset table
+        assert load_facets(db_seeded, CMIP6Dataset, [dataset.id], ["path"]) is None
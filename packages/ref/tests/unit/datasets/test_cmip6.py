@@ -1,9 +1,25 @@
 import datetime
+import errno
+import os
+import shutil
+from unittest import mock
 
+import ecgtools.parsers
 import pandas as pd
 import pytest
 
-from ref.datasets.cmip6 import CMIP6DatasetAdapter, _parse_datetime
+from ref.datasets.cache import MetadataCache
+from ref.datasets.cmip6 import CMIP6DatasetAdapter, _apply_fixes, _parse_datetime, parse_cmip6_drs
+from ref.datasets.journal import Quarantine
+from ref.datasets.reconcile import ReconcileResult
+from ref.datasets.utils import FileFingerprint
+from ref.models import Dataset, Metric, MetricExecution, MetricExecutionResult, Provider
+from ref.models.dataset import CMIP6Dataset, CMIP6File
+
+
+def _object_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    columns = df.select_dtypes(include=["category", "datetime64"]).columns
+    return df.astype({column: object for column in columns})
 
 
 @pytest.fixture
@@ -27,6 +43,83 @@ def test_parse_datetime():
     )
 
 
+def test_parse_datetime_repeated():
+    result = _parse_datetime(
+        pd.Series(["2021-01-01 00:00:00", None, "2021-01-01 00:00:00", ""], index=[3, 2, 1, 0])
+    )
+
+    assert result.index.tolist() == [3, 2, 1, 0]
+    assert result.tolist() == [datetime.datetime(2021, 1, 1), None, datetime.datetime(2021, 1, 1), None]
+
+
+def test_parse_datetime_out_of_bounds():
+    # Years outside of the range of pandas timestamps are still parsed
+    result = _parse_datetime(pd.Series(["0001-01-16 12:00:00", "2300-12-16 12:00:00.000000"]))
+
+    assert result.tolist() == [datetime.datetime(1, 1, 16, 12), datetime.datetime(2300, 12, 16, 12)]
+
+
+def test_parse_datetime_invalid():
+    with pytest.raises(ValueError, match="does not match format"):
+        _parse_datetime(pd.Series(["2021-01-01 00:00:00", "2021-01-01"]))
+
+
+def test_apply_fixes():
+    data_catalog = pd.DataFrame(
+        {
+            "instance_id": ["a", "a", "b", "b"],
+            "variant_label": ["r2i1p1f1", "r2i1p1f1", "r2i1p1f1", "r2i1p1f1"],
+            "parent_variant_label": ["r1i1p1f1", "r3i1p1f1", "r1i1p1f1", "r1i1p1f1"],
+            "branch_time_in_child": ["0D", "0D", 12.0, 12.0],
+            "branch_time_in_parent": ["365.0D", "365.0D", 21.0, 21.0],
+        }
+    )
+
+    result = _apply_fixes(data_catalog)
+
+    # Only the dataset with inconsistent parent variant labels is modified
+    assert result["parent_variant_label"].tolist() == ["r2i1p1f1", "r2i1p1f1", "r1i1p1f1", "r1i1p1f1"]
+    assert result["branch_time_in_child"].tolist() == [0.0, 0.0, 12.0, 12.0]
+    assert result["branch_time_in_parent"].tolist() == [365.0, 365.0, 21.0, 21.0]
+
+
+def test_parse_cmip6_drs():
+    path = (
+        "/data/CMIP6/DCPP/CNRM-CERFACS/CNRM-CM6-1/dcppA-hindcast/s1960-r2i1p1f2/day/pr/gr/v20190909/"
+        "pr_day_CNRM-CM6-1_dcppA-hindcast_s1960-r2i1p1f2_gr_19601101-19701231.nc"
+    )
+
+    assert parse_cmip6_drs(path) == {
+        "activity_id": "DCPP",
+        "institution_id": "CNRM-CERFACS",
+        "source_id": "CNRM-CM6-1",
+        "experiment_id": "dcppA-hindcast",
+        "member_id": "r2i1p1f2",
+        "table_id": "day",
+        "variable_id": "pr",
+        "grid_label": "gr",
+        "version": "v20190909",
+        "start_time": "1960-11-01 00:00:00",
+        "end_time": "1970-12-31 00:00:00",
+        "time_range": "1960-11-01 00:00:00-1970-12-31 00:00:00",
+        "path": path,
+    }
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "tas_Amon_ACCESS-ESM1-5_ssp126_r1i1p1f1_gn_201501-210012.nc",
+        "/CMIP6/ScenarioMIP/CSIRO/ACCESS-ESM1-5/ssp126/r1i1p1f1/Amon/tas/gn/v20210318/"
+        "rsut_Amon_ACCESS-ESM1-5_ssp126_r1i1p1f1_gn_201501-210012.nc",
+        "/CMIP6/ScenarioMIP/CSIRO/ACCESS-ESM1-5/ssp126/r1i1p1f1/Amon/tas/gn/v20210318/"
+        "tas_Amon_ACCESS-ESM1-5_ssp126_r1i1p1f1_gn_201501-21001.nc",
+    ],
+)
+def test_parse_cmip6_drs_invalid(path):
+    assert "INVALID_ASSET" in parse_cmip6_drs(path)
+
+
 class TestCMIP6Adapter:
     def test_catalog_empty(self, db):
         adapter = CMIP6DatasetAdapter()
@@ -46,6 +139,84 @@ class TestCMIP6Adapter:
         # The order of the rows may be flakey due to sqlite ordering and the created time resolution
         catalog_regression(df.sort_values(["instance_id", "start_time"]), basename="cmip6_catalog_db")
 
+    def test_load_catalog_dtypes(self, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+        df = adapter.load_catalog(db_seeded)
+
+        assert df["start_time"].dtype == "datetime64[us]"
+        assert df["end_time"].dtype == "datetime64[us]"
+        # Dates beyond the range of nanosecond precision are supported
+        assert df["end_time"].max().year == 2300
+        for column in ["activity_id", "table_id", "grid_label", "frequency", "variable_id"]:
+            assert isinstance(df[column].dtype, pd.CategoricalDtype), column
+        assert df["instance_id"].dtype == object
+        assert df["path"].dtype == object
+
+    def test_load_catalog_datasets(self, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+        files = adapter.load_catalog(db_seeded)
+        df = adapter.load_catalog(db_seeded, include_files=False)
+
+        assert list(df.columns) == list(adapter.dataset_specific_metadata)
+        assert df["instance_id"].is_unique
+        # The index is the primary key of the dataset
+        assert sorted(df.index) == sorted(files.index.unique())
+        pd.testing.assert_frame_equal(
+            df.sort_index(),
+            files.drop(columns=list(adapter.file_specific_metadata)).groupby(level=0).first().sort_index(),
+        )
+
+    def test_load_catalog_limit(self, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+
+        assert len(adapter.load_catalog(db_seeded, limit=3)) == 3
+        assert len(adapter.load_catalog(db_seeded, include_files=False, limit=2)) == 2
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 100])
+    @pytest.mark.parametrize("include_files", [True, False])
+    def test_iter_catalog(self, db_seeded, chunk_size, include_files):
+        adapter = CMIP6DatasetAdapter()
+        expected = adapter.load_catalog(db_seeded, include_files=include_files)
+
+        chunks = list(adapter.iter_catalog(db_seeded, include_files=include_files, chunk_size=chunk_size))
+
+        assert len(chunks) == -(-5 // chunk_size)
+        assert all(chunk.index.nunique() <= chunk_size for chunk in chunks)
+        # A dataset is never split across chunks
+        seen = [set(chunk.index) for chunk in chunks]
+        assert sum(len(ids) for ids in seen) == len(set().union(*seen))
+
+        # The categories of each chunk may differ
+        result = _object_dtypes(pd.concat(chunks))
+        assert result.index.is_monotonic_increasing
+        pd.testing.assert_frame_equal(
+            result.sort_values(["instance_id", "path"] if include_files else "instance_id"),
+            _object_dtypes(expected).sort_values(["instance_id", "path"] if include_files else "instance_id"),
+        )
+
+    def test_iter_catalog_order_by(self, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+
+        chunks = list(
+            adapter.iter_catalog(db_seeded, include_files=False, chunk_size=2, order_by="instance_id")
+        )
+
+        instance_ids = pd.concat(chunks)["instance_id"]
+        assert instance_ids.is_monotonic_increasing
+        assert len(instance_ids) == 5
+
+    def test_iter_catalog_unknown_column(self, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+
+        with pytest.raises(ValueError, match="unknown column 'missing'"):
+            next(adapter.iter_catalog(db_seeded, order_by="missing"))
+
+    def test_iter_catalog_nullable_column(self, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+
+        with pytest.raises(ValueError, match="nullable column 'init_year'"):
+            next(adapter.iter_catalog(db_seeded, order_by="init_year"))
+
     def test_round_trip(self, db_seeded, esgf_data_dir):
         # Indexes and ordering may be different
         adapter = CMIP6DatasetAdapter()
@@ -60,10 +231,159 @@ class TestCMIP6Adapter:
             adapter.load_catalog(db_seeded).sort_values(["instance_id", "start_time"]).reset_index(drop=True)
         )
 
-        # TODO: start_time has a different dtype from the database due to pandas dt coercion
-        db_data_catalog["start_time"] = db_data_catalog["start_time"].astype(object)
+        # The catalog loaded from the database uses compact dtypes
+        db_data_catalog = _object_dtypes(db_data_catalog)
         pd.testing.assert_frame_equal(local_data_catalog, db_data_catalog, check_like=True)
 
+    def test_find_local_datasets_drs(self, esgf_data_dir, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter(parser="drs")
+        data_catalog = adapter.find_local_datasets(esgf_data_dir).sort_values("path").reset_index(drop=True)
+        expected = cmip6_data_catalog.sort_values("path").reset_index(drop=True)
+
+        # The time range is read from the filename rather than the time coordinate
+        time_columns = ["start_time", "end_time", "time_range"]
+        pd.testing.assert_frame_equal(
+            data_catalog.drop(columns=time_columns), expected.drop(columns=time_columns), check_like=True
+        )
+        assert data_catalog["start_time"].iloc[0] == datetime.datetime(2015, 1, 1)
+        assert data_catalog["end_time"].iloc[0] == datetime.datetime(2100, 12, 1)
+
+    @pytest.mark.parametrize("parser", ["complete", "drs"])
+    def test_find_local_datasets_cached(self, config, esgf_data_dir, monkeypatch, parser):
+        adapter = CMIP6DatasetAdapter(parser=parser, cache=MetadataCache.from_config(config))
+        expected = adapter.find_local_datasets(esgf_data_dir)
+
+        def _parse_cmip6(file):
+            raise AssertionError(f"{file} should not be parsed")
+
+        monkeypatch.setattr(ecgtools.parsers, "parse_cmip6", _parse_cmip6)
+
+        pd.testing.assert_frame_equal(adapter.find_local_datasets(esgf_data_dir), expected)
+
+    def test_find_local_datasets_quarantine(self, tmp_path, esgf_data_dir):
+        source = next(esgf_data_dir.rglob("areacella_*.nc"))
+        shutil.copy(source, tmp_path / source.name)
+        (tmp_path / "corrupt.nc").write_text("not a netCDF file")
+
+        quarantine = Quarantine.open(tmp_path / "quarantine.csv")
+        adapter = CMIP6DatasetAdapter(quarantine=quarantine)
+        data_catalog = adapter.find_local_datasets(tmp_path)
+
+        assert data_catalog["path"].tolist() == [str(tmp_path / source.name)]
+        assert quarantine.n_files == 1
+        report = pd.read_csv(quarantine.filename)
+        assert report["path"].tolist() == [str(tmp_path / "corrupt.nc")]
+        assert report["stage"].tolist() == ["parse"]
+
+    def test_find_local_datasets_drs_quarantine(self, tmp_path, esgf_data_dir):
+        source = next(esgf_data_dir.rglob("tas_*.nc")).parent
+        dataset_dir = tmp_path / "data" / source.relative_to(esgf_data_dir)
+        shutil.copytree(source, dataset_dir)
+        files = sorted(dataset_dir.glob("*.nc"))
+        assert len(files) > 1
+        for file in files:
+            file.write_text("not a netCDF file")
+
+        quarantine = Quarantine.open(tmp_path / "quarantine.csv")
+        adapter = CMIP6DatasetAdapter(parser="drs", quarantine=quarantine)
+        data_catalog = adapter.find_local_datasets(tmp_path / "data")
+
+        # Only the first file is opened, but all the files in the dataset are quarantined
+        assert data_catalog.empty
+        report = pd.read_csv(quarantine.filename)
+        assert sorted(report["path"]) == [str(file) for file in files]
+        assert report["stage"].unique().tolist() == ["parse"]
+        assert report["reason"].nunique() == 1
+
+    def test_iter_local_datasets_skip_directories(self, esgf_data_dir, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter()
+        skipped = os.path.dirname(cmip6_data_catalog["path"].iloc[0])
+
+        batches = list(adapter.iter_local_datasets(esgf_data_dir, skip_directories={skipped}))
+
+        paths = pd.concat(batches)["path"]
+        assert (
+            len(paths) == len(cmip6_data_catalog) - (cmip6_data_catalog["path"].str.startswith(skipped)).sum()
+        )
+        assert not paths.str.startswith(skipped).any()
+
+    @pytest.mark.parametrize("batch_size", [1, 4, 100])
+    def test_iter_local_datasets(self, esgf_data_dir, cmip6_data_catalog, batch_size):
+        adapter = CMIP6DatasetAdapter()
+
+        batches = list(adapter.iter_local_datasets(esgf_data_dir, batch_size=batch_size))
+
+        # Each directory contains a single dataset which is never split across batches
+        n_datasets = cmip6_data_catalog[adapter.slug_column].nunique()
+        assert sum(batch[adapter.slug_column].nunique() for batch in batches) == n_datasets
+        if batch_size == 1:
+            assert len(batches) == n_datasets
+
+        pd.testing.assert_frame_equal(
+            pd.concat(batches).sort_values("path").reset_index(drop=True),
+            cmip6_data_catalog.sort_values("path").reset_index(drop=True),
+        )
+
+    def test_iter_local_datasets_known_files(self, esgf_data_dir, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter()
+        known_files = {path: FileFingerprint.from_path(path) for path in cmip6_data_catalog["path"]}
+
+        assert list(adapter.iter_local_datasets(esgf_data_dir, known_files=known_files, batch_size=1)) == []
+
+    def test_find_local_datasets_manifest(self, tmp_path, esgf_data_dir, cmip6_data_catalog):
+        manifest = tmp_path / "manifest.txt"
+        manifest.write_text("# Files to ingest\n" + "\n".join(cmip6_data_catalog["path"]) + "\n")
+
+        adapter = CMIP6DatasetAdapter()
+
+        pd.testing.assert_frame_equal(
+            adapter.find_local_datasets([], manifest=manifest).sort_values("path").reset_index(drop=True),
+            cmip6_data_catalog.sort_values("path").reset_index(drop=True),
+        )
+
+    @pytest.mark.parametrize("filename", ["catalog.csv.gz", "catalog.parquet"])
+    def test_iter_catalog_file(self, tmp_path, cmip6_data_catalog, filename):
+        adapter = CMIP6DatasetAdapter()
+
+        # Write the catalog in the format produced by ecgtools
+        catalog = cmip6_data_catalog.drop(columns=[adapter.slug_column]).sort_values("path")
+        for column in ["start_time", "end_time"]:
+            catalog[column] = catalog[column].map(lambda value: str(value) if value else None)
+        if filename.endswith(".parquet"):
+            catalog.to_parquet(tmp_path / filename)
+        else:
+            catalog.to_csv(tmp_path / filename, index=False)
+
+        batches = list(adapter.iter_catalog_file(tmp_path / filename, batch_size=3))
+
+        # Datasets are never split across batches
+        slugs = [set(batch[adapter.slug_column]) for batch in batches]
+        assert sum(len(batch_slugs) for batch_slugs in slugs) == len(set.union(*slugs))
+
+        result = pd.concat(batches).sort_values("path").reset_index(drop=True)
+        expected = cmip6_data_catalog.sort_values("path").reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_like=True, check_dtype=False)
+
+    def test_iter_catalog_file_missing_columns(self, tmp_path, cmip6_data_catalog):
+        cmip6_data_catalog.drop(columns=["variable_id"]).to_csv(tmp_path / "catalog.csv", index=False)
+
+        with pytest.raises(ValueError, match="missing required columns"):
+            list(CMIP6DatasetAdapter().iter_catalog_file(tmp_path / "catalog.csv"))
+
+    def test_iter_catalog_file_not_grouped(self, tmp_path, cmip6_data_catalog):
+        catalog = cmip6_data_catalog.sort_values("path")
+        # Move the first file of a dataset with multiple files to the end of the catalog
+        first = catalog.index[catalog["instance_id"].duplicated(keep="last")][0]
+        catalog = pd.concat([catalog.drop(index=first), catalog.loc[[first]]]).drop(columns=["instance_id"])
+        catalog.to_csv(tmp_path / "catalog.csv", index=False)
+
+        with pytest.raises(ValueError, match="non-contiguous rows"):
+            list(CMIP6DatasetAdapter().iter_catalog_file(tmp_path / "catalog.csv", batch_size=3))
+
+    def test_invalid_parser(self):
+        with pytest.raises(ValueError, match="Unknown CMIP6 parser"):
+            CMIP6DatasetAdapter(parser="unknown")
+
     def test_load_local_datasets(self, esgf_data_dir, catalog_regression):
         adapter = CMIP6DatasetAdapter()
         data_catalog = adapter.find_local_datasets(esgf_data_dir)
@@ -76,3 +396,186 @@ class TestCMIP6Adapter:
         catalog_regression(
             data_catalog.sort_values(["instance_id", "start_time"]), basename="cmip6_catalog_local"
         )
+
+    def test_find_local_datasets_known_files(self, config, db_seeded, esgf_data_dir):
+        adapter = CMIP6DatasetAdapter()
+        known_files = adapter.load_file_fingerprints(config, db_seeded)
+        assert len(known_files) == 9
+
+        data_catalog = adapter.find_local_datasets(esgf_data_dir, known_files=known_files)
+        assert data_catalog.empty
+        assert adapter.slug_column in data_catalog.columns
+
+        # Pretend that one of the files has changed since it was ingested
+        modified_path = sorted(known_files)[0]
+        known_files[modified_path] = FileFingerprint(size=0, mtime=0.0, inode=0)
+
+        data_catalog = adapter.find_local_datasets(esgf_data_dir, known_files=known_files)
+        assert data_catalog["path"].tolist() == [modified_path]
+
+    def test_register_dataset_fingerprints(self, config, db_seeded):
+        for file in db_seeded.session.query(CMIP6File).all():
+            assert file.size is not None
+            assert file.mtime is not None
+            assert file.inode is not None
+
+    def test_register_dataset_modified_file(self, config, db_seeded, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter()
+        instance_id, data_catalog_dataset = next(iter(cmip6_data_catalog.groupby(adapter.slug_column)))
+
+        with db_seeded.session.begin():
+            # Unchanged datasets are skipped
+            assert adapter.register_dataset(config, db_seeded, data_catalog_dataset) is None
+
+            path = data_catalog_dataset["path"].iloc[0]
+            file = db_seeded.session.query(CMIP6File).filter_by(path=path).one()
+            file.size = 0
+
+        with db_seeded.session.begin():
+            dataset = adapter.register_dataset(config, db_seeded, data_catalog_dataset)
+            assert dataset is not None
+            assert dataset.slug == instance_id
+
+        assert file.size == FileFingerprint.from_path(file.path).size
+
+    def test_register_dataset_retracted(self, config, db_seeded, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter()
+        instance_id, data_catalog_dataset = next(iter(cmip6_data_catalog.groupby(adapter.slug_column)))
+
+        with db_seeded.session.begin():
+            db_seeded.session.query(Dataset).filter_by(slug=instance_id).one().retracted = True
+
+        with db_seeded.session.begin():
+            dataset = adapter.register_dataset(config, db_seeded, data_catalog_dataset)
+            assert dataset is not None
+            assert not dataset.retracted
+            assert instance_id in set(adapter.load_catalog(db_seeded)["instance_id"])
+
+    def test_register_datasets(self, config, db, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter()
+
+        registered = adapter.register_datasets(config, db, cmip6_data_catalog, chunk_size=2)
+
+        assert sorted(registered) == sorted(cmip6_data_catalog[adapter.slug_column].unique())
+        assert db.session.query(CMIP6Dataset).count() == 5
+        assert db.session.query(CMIP6File).count() == 9
+
+        db_data_catalog = (
+            adapter.load_catalog(db).sort_values(["instance_id", "start_time"]).reset_index(drop=True)
+        )
+        expected = (
+            cmip6_data_catalog.drop(columns=["time_range"])
+            .sort_values(["instance_id", "start_time"])
+            .reset_index(drop=True)
+        )
+        db_data_catalog = _object_dtypes(db_data_catalog)
+        pd.testing.assert_frame_equal(expected, db_data_catalog, check_like=True)
+
+    def test_register_datasets_existing(self, config, db_seeded, cmip6_data_catalog):
+        adapter = CMIP6DatasetAdapter()
+
+        assert adapter.register_datasets(config, db_seeded, cmip6_data_catalog) == []
+
+        with db_seeded.session.begin():
+            files = db_seeded.session.query(CMIP6File).order_by(CMIP6File.path).all()
+            # One file has been modified and another is missing from the database
+            files[0].size = 0
+            db_seeded.session.delete(files[-1])
+            expected = sorted({files[0].dataset.slug, files[-1].dataset.slug})
+
+        assert sorted(adapter.register_datasets(config, db_seeded, cmip6_data_catalog)) == expected
+        assert db_seeded.session.query(CMIP6Dataset).count() == 5
+        assert db_seeded.session.query(CMIP6File).count() == 9
+
+    @pytest.fixture
+    def ingested_copy(self, config, db, esgf_data_dir, tmp_path):
+        data_dir = tmp_path / "copy"
+        shutil.copytree(esgf_data_dir, data_dir)
+
+        adapter = CMIP6DatasetAdapter()
+        adapter.register_datasets(config, db, adapter.find_local_datasets(data_dir))
+        return data_dir
+
+    def _add_execution(self, db, dataset_slug):
+        provider = Provider(slug="provider", name="Provider", version="v1")
+        metric = Metric(slug="metric", name="Metric", provider=provider)
+        execution = MetricExecution(metric=metric, key="key", dirty=False)
+        result = MetricExecutionResult(metric_execution=execution, dataset_hash="hash")
+        result.datasets.append(db.session.query(Dataset).filter_by(slug=dataset_slug).one())
+        db.session.add_all([provider, metric, execution, result])
+        return execution
+
+    def test_reconcile_datasets_unchanged(self, config, db, ingested_copy):
+        adapter = CMIP6DatasetAdapter()
+
+        result = adapter.reconcile_datasets(config, db)
+        assert result == ReconcileResult()
+
+    def test_reconcile_datasets(self, config, db, ingested_copy):
+        adapter = CMIP6DatasetAdapter()
+        with db.session.begin():
+            files = db.session.query(CMIP6File).order_by(CMIP6File.path).all()
+            slugs = {file.path: file.dataset.slug for file in files}
+            fx_file = next(file.path for file in files if "/fx/" in file.path)
+            tas_files = [file.path for file in files if "/tas/" in file.path]
+            rlut_file = next(file.path for file in files if "/rlut/" in file.path)
+            execution = self._add_execution(db, slugs[fx_file])
+
+        os.remove(fx_file)
+        os.remove(tas_files[0])
+        os.utime(rlut_file, (0, 0))
+
+        result = adapter.reconcile_datasets(config, db, n_threads=2, dry_run=True)
+        assert result.missing_files == sorted([fx_file, tas_files[0]])
+        assert result.modified_files == [rlut_file]
+        assert result.retracted_datasets == [slugs[fx_file]]
+        assert result.updated_datasets == sorted([slugs[tas_files[0]], slugs[rlut_file]])
+        with db.session.begin():
+            assert db.session.query(CMIP6File).count() == 9
+
+        result = adapter.reconcile_datasets(config, db, n_threads=2)
+        assert result.n_dirty_executions == 1
+
+        with db.session.begin():
+            db.session.refresh(execution)
+            assert execution.dirty
+            assert db.session.query(CMIP6File).count() == 7
+            assert db.session.query(CMIP6File).filter_by(path=rlut_file).one().mtime == 0
+            assert db.session.query(Dataset).filter_by(slug=slugs[fx_file]).one().retracted
+
+            data_catalog = adapter.load_catalog(db)
+            expected_slugs = sorted(set(slugs.values()) - {slugs[fx_file]})
+            assert sorted(data_catalog["instance_id"].unique()) == expected_slugs
+
+        # The datasets are consistent with the data directory
+        assert adapter.reconcile_datasets(config, db) == ReconcileResult()
+
+    def test_reconcile_inaccessible_file(self, config, db, ingested_copy):
+        adapter = CMIP6DatasetAdapter()
+        tas_file = str(sorted(ingested_copy.rglob("tas_*.nc"))[0])
+        from_path = FileFingerprint.from_path
+
+        def _from_path(path):
+            if str(path) == tas_file:
+                raise PermissionError(errno.EACCES, "Permission denied", path)
+            return from_path(path)
+
+        with mock.patch.object(FileFingerprint, "from_path", side_effect=_from_path):
+            result = adapter.reconcile_datasets(config, db, dry_run=True)
+
+        # Files that can't be accessed are treated as missing rather than aborting the reconciliation
+        assert result.missing_files == [tas_file]
+        assert len(result.updated_datasets) == 1
+
+    def test_reconcile_restore_retracted(self, config, db, ingested_copy):
+        adapter = CMIP6DatasetAdapter()
+        fx_file = next(ingested_copy.rglob("areacella_*.nc"))
+        shutil.move(fx_file, ingested_copy / fx_file.name)
+
+        assert len(adapter.reconcile_datasets(config, db).retracted_datasets) == 1
+        with db.session.begin():
+            assert adapter.load_catalog(db)["instance_id"].nunique() == 4
+
+        shutil.move(ingested_copy / fx_file.name, fx_file)
+        adapter.register_datasets(config, db, adapter.find_local_datasets(fx_file.parent))
+        assert adapter.load_catalog(db)["instance_id"].nunique() == 5
@@ -0,0 +1,95 @@
+import pytest
+
+from ref.datasets.crawler import crawl_directories, find_files, read_manifest
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for path in ["a/b/2.nc", "a/b/1.nc", "a/c/3.nc", "a/ignored.txt", "d/4.nc", "empty/ignored.txt"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+    (tmp_path / "a" / "link").symlink_to(tmp_path / "a", target_is_directory=True)
+
+    return tmp_path
+
+
+@pytest.mark.parametrize("n_threads", [1, 4])
+def test_crawl_directories(tree, n_threads):
+    result = sorted(crawl_directories([tree], pattern="*.nc", n_threads=n_threads))
+
+    assert result == [
+        [str(tree / "a" / "b" / "1.nc"), str(tree / "a" / "b" / "2.nc")],
+        [str(tree / "a" / "c" / "3.nc")],
+        [str(tree / "d" / "4.nc")],
+    ]
+
+
+def test_crawl_directories_multiple_roots(tree):
+    result = sorted(
+        crawl_directories([tree / "a" / "c", tree / "d", tree / "a" / "b" / "1.nc"], pattern="*.nc")
+    )
+
+    assert result == [
+        [str(tree / "a" / "b" / "1.nc")],
+        [str(tree / "a" / "c" / "3.nc")],
+        [str(tree / "d" / "4.nc")],
+    ]
+
+
+@pytest.mark.parametrize("follow_symlinks", [False, True])
+def test_crawl_directories_symlinks(tree, follow_symlinks):
+    (tree / "a" / "d").symlink_to(tree / "d", target_is_directory=True)
+    (tree / "a" / "c" / "parent").symlink_to(tree, target_is_directory=True)
+    (tree / "d" / "c").symlink_to(tree / "a" / "c", target_is_directory=True)
+
+    result = sorted(crawl_directories([tree / "a"], pattern="*.nc", follow_symlinks=follow_symlinks))
+
+    # Links that would find the same files again, or that form a cycle, are never followed
+    expected = [
+        [str(tree / "a" / "b" / "1.nc"), str(tree / "a" / "b" / "2.nc")],
+        [str(tree / "a" / "c" / "3.nc")],
+    ]
+    if follow_symlinks:
+        expected.append([str(tree / "a" / "d" / "4.nc")])
+    assert result == expected
+
+
+def test_crawl_directories_missing(tree):
+    assert list(crawl_directories([tree / "missing"], pattern="*.nc")) == []
+
+
+def test_read_manifest(tree):
+    manifest = tree / "manifest.txt"
+    manifest.write_text(
+        "\n".join(
+            [
+                "# Generated by lfs find",
+                str(tree / "a" / "b" / "2.nc"),
+                "d/4.nc",
+                "",
+                str(tree / "a" / "c" / "3.nc"),
+                str(tree / "a" / "ignored.txt"),
+                str(tree / "a" / "b" / "1.nc"),
+            ]
+        )
+    )
+
+    assert list(read_manifest(manifest, pattern="*.nc")) == [
+        [str(tree / "a" / "b" / "1.nc"), str(tree / "a" / "b" / "2.nc")],
+        [str(tree / "a" / "c" / "3.nc")],
+        [str(tree / "d" / "4.nc")],
+    ]
+
+
+def test_find_files(tree):
+    manifest = tree / "manifest.txt"
+    manifest.write_text(str(tree / "d" / "4.nc"))
+
+    assert list(find_files(manifest=manifest, pattern="*.nc")) == [[str(tree / "d" / "4.nc")]]
+    assert sorted(find_files([tree / "a"], pattern="*.nc")) == [
+        [str(tree / "a" / "b" / "1.nc"), str(tree / "a" / "b" / "2.nc")],
+        [str(tree / "a" / "c" / "3.nc")],
+    ]
+
+    with pytest.raises(ValueError, match="not both"):
+        list(find_files([tree], manifest=manifest))
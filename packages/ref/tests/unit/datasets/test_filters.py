@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+from ref_core.constraints import RequireFacets, SelectParentExperiment
+from ref_core.datasets import FacetFilter, SourceDatasetType
+from ref_core.metrics import DataRequirement
+
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.datasets.filters import required_columns
+
+
+def _requirement(*filters, constraints=()):
+    return DataRequirement(
+        source_type=SourceDatasetType.CMIP6, filters=filters, group_by=None, constraints=constraints
+    )
+
+
+@pytest.mark.parametrize(
+    "requirement,n_datasets",
+    [
+        (_requirement(FacetFilter({"variable_id": "tas"})), 1),
+        (_requirement(FacetFilter({"variable_id": ("tas", "rsut")})), 2),
+        (_requirement(FacetFilter({"variable_id": "tas"}, keep=False)), 4),
+        (_requirement(FacetFilter({"variable_id": "tas", "table_id": "fx"}, keep=False)), 3),
+        (
+            _requirement(FacetFilter({"table_id": "Amon"}), FacetFilter({"variable_id": "rlut"}, keep=False)),
+            3,
+        ),
+        (_requirement(FacetFilter({"variable_id": "missing"})), 0),
+        # Rows without a value for a facet aren't removed by an exclusion
+        (_requirement(FacetFilter({"init_year": "1850"}, keep=False)), 5),
+        # Filters on numeric columns aren't applied in the database
+        (_requirement(FacetFilter({"branch_time_in_child": "60265.0"}, keep=False)), 5),
+        (_requirement(FacetFilter({"vertical_levels": "1"}, keep=False)), 5),
+        (_requirement(FacetFilter({"vertical_levels": "1"})), 5),
+        (_requirement(constraints=(RequireFacets("variable_id", ["tas"]),)), 5),
+        (_requirement(), 5),
+    ],
+)
+def test_load_catalog_requirement(db_seeded, requirement, n_datasets):
+    adapter = CMIP6DatasetAdapter()
+    data_catalog = adapter.load_catalog(db_seeded)
+
+    subset = adapter.load_catalog(db_seeded, requirements=[requirement])
+
+    assert subset["instance_id"].nunique() == n_datasets
+    # Filtering the subset gives the same result as filtering the complete data catalog
+    expected = requirement.apply_filters(data_catalog)
+    result = requirement.apply_filters(subset)
+    assert result.index.tolist() == expected.index.tolist()
+    assert result["path"].tolist() == expected["path"].tolist()
+
+
+def test_load_catalog_requirements_union(db_seeded):
+    adapter = CMIP6DatasetAdapter()
+    requirements = [
+        _requirement(FacetFilter({"variable_id": "tas"})),
+        _requirement(FacetFilter({"variable_id": "rsut"})),
+    ]
+
+    subset = adapter.load_catalog(db_seeded, requirements=requirements)
+
+    assert sorted(subset["variable_id"].unique()) == ["rsut", "tas"]
+    assert adapter.load_catalog(db_seeded, requirements=[]).empty
+
+
+@pytest.mark.parametrize(
+    "requirement",
+    [
+        # A facet that isn't a dataset column
+        _requirement(FacetFilter({"path": "missing"})),
+        # Operations may need the complete data catalog
+        _requirement(FacetFilter({"variable_id": "tas"}), constraints=(SelectParentExperiment(),)),
+    ],
+)
+def test_load_catalog_requirement_fallback(db_seeded, requirement):
+    adapter = CMIP6DatasetAdapter()
+
+    subset = adapter.load_catalog(db_seeded, requirements=[requirement])
+
+    assert subset["instance_id"].nunique() == 5
+
+
+@pytest.mark.parametrize(
+    "requirements,expected",
+    [
+        ([], set()),
+        ([_requirement(FacetFilter({"variable_id": "tas"}))], None),
+        (
+            [
+                DataRequirement(
+                    source_type=SourceDatasetType.CMIP6,
+                    filters=(FacetFilter({"variable_id": "tas"}),),
+                    group_by=("source_id",),
+                    constraints=(RequireFacets("experiment_id", ["historical"]),),
+                    columns=("start_time",),
+                ),
+                DataRequirement(
+                    source_type=SourceDatasetType.CMIP6,
+                    filters=(FacetFilter({"table_id": "fx"}, keep=False),),
+                    group_by=None,
+                    join_on=("grid_label",),
+                    columns=(),
+                ),
+            ],
+            {"variable_id", "source_id", "experiment_id", "start_time", "table_id", "grid_label"},
+        ),
+        # Operations may use any column
+        (
+            [
+                DataRequirement(
+                    source_type=SourceDatasetType.CMIP6,
+                    filters=(),
+                    group_by=None,
+                    constraints=(SelectParentExperiment(),),
+                    columns=(),
+                )
+            ],
+            None,
+        ),
+    ],
+)
+def test_required_columns(requirements, expected):
+    assert required_columns(requirements) == expected
+
+
+@pytest.mark.parametrize("include_files", [True, False])
+def test_load_catalog_columns(db_seeded, include_files):
+    adapter = CMIP6DatasetAdapter()
+    data_catalog = adapter.load_catalog(db_seeded, include_files=include_files)
+
+    subset = adapter.load_catalog(
+        db_seeded, include_files=include_files, columns=["variable_id", "start_time", "unknown"]
+    )
+
+    expected_columns = ["instance_id", "variable_id"]
+    if include_files:
+        expected_columns = ["start_time", "path", *expected_columns]
+    assert sorted(subset.columns) == sorted(expected_columns)
+    pd.testing.assert_frame_equal(subset, data_catalog[subset.columns.tolist()])
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from ref.datasets.journal import IngestJournal, Quarantine
+
+
+class TestIngestJournal:
+    def test_record(self, tmp_path):
+        journal = IngestJournal.open(tmp_path / "ingest" / "journal.jsonl")
+        journal.record(["/data/a", "/data/b"], ["dataset.a", "dataset.b"])
+        journal.record(["/data/c"], ["dataset.c"])
+
+        assert journal.directories == {"/data/a", "/data/b", "/data/c"}
+        assert journal.datasets == {"dataset.a", "dataset.b", "dataset.c"}
+        assert len(journal.filename.read_text().splitlines()) == 2
+
+    def test_resume(self, tmp_path):
+        filename = tmp_path / "journal.jsonl"
+        IngestJournal.open(filename).record(["/data/a"], ["dataset.a"])
+
+        journal = IngestJournal.open(filename, resume=True)
+        assert journal.directories == {"/data/a"}
+        assert journal.datasets == {"dataset.a"}
+
+    def test_resume_corrupt(self, tmp_path):
+        filename = tmp_path / "journal.jsonl"
+        IngestJournal.open(filename).record(["/data/a"], ["dataset.a"])
+        # A partially written entry from a run that was killed
+        with open(filename, "a") as fh:
+            fh.write('{"directories": ["/data/b"')
+
+        journal = IngestJournal.open(filename, resume=True)
+        assert journal.directories == {"/data/a"}
+        assert journal.datasets == {"dataset.a"}
+
+    def test_no_resume(self, tmp_path):
+        filename = tmp_path / "journal.jsonl"
+        IngestJournal.open(filename).record(["/data/a"], ["dataset.a"])
+
+        journal = IngestJournal.open(filename)
+        assert journal.directories == set()
+        assert filename.read_text() == ""
+
+
+class TestQuarantine:
+    def test_add(self, tmp_path):
+        quarantine = Quarantine.open(tmp_path / "quarantine.csv")
+        quarantine.add("/data/a.nc", "parse", "OSError: Unknown file format")
+        quarantine.add("/data/b.nc", "register", "Dataset is not relative to /data, with a comma")
+
+        assert quarantine.n_files == 2
+        report = pd.read_csv(quarantine.filename)
+        assert report.columns.tolist() == ["path", "stage", "reason"]
+        assert report["path"].tolist() == ["/data/a.nc", "/data/b.nc"]
+        assert report["reason"].iloc[1] == "Dataset is not relative to /data, with a comma"
+
+    def test_resume(self, tmp_path):
+        filename = tmp_path / "quarantine.csv"
+        Quarantine.open(filename).add("/data/a.nc", "parse", "error")
+
+        Quarantine.open(filename, resume=True).add("/data/b.nc", "parse", "error")
+        assert pd.read_csv(filename)["path"].tolist() == ["/data/a.nc", "/data/b.nc"]
+
+        Quarantine.open(filename)
+        assert pd.read_csv(filename).empty
@@ -0,0 +1,47 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.datasets.shared import SharedCatalog, shared_directory
+
+
+@pytest.fixture
+def data_catalog(db_seeded):
+    with db_seeded.session.begin():
+        return CMIP6DatasetAdapter().load_catalog(db_seeded)
+
+
+def _take(shared: SharedCatalog, rows: list[int]) -> pd.DataFrame:
+    return shared.take(rows)
+
+
+def test_shared_directory(config):
+    directory = shared_directory(config)
+
+    assert directory.is_dir() or directory == config.paths.tmp / "shared"
+
+
+def test_publish(tmp_path, data_catalog):
+    shared = SharedCatalog.publish(data_catalog, tmp_path / "shared")
+
+    assert shared.path.parent == tmp_path / "shared"
+    pd.testing.assert_frame_equal(shared.take(range(len(data_catalog))), data_catalog)
+    pd.testing.assert_frame_equal(shared.take([3, 0, 1]), data_catalog.iloc[[3, 0, 1]])
+    assert shared.take([]).empty
+
+    shared.unlink()
+    assert not shared.path.exists()
+
+
+def test_take_in_worker(tmp_path, data_catalog):
+    shared = SharedCatalog.publish(data_catalog, tmp_path)
+    # Only the path is sent to the worker
+    assert len(pickle.dumps(shared)) < 200
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(_take, shared, [1, 2]).result()
+
+    pd.testing.assert_frame_equal(result, data_catalog.iloc[[1, 2]])
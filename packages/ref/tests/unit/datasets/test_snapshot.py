@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+from ref_core.datasets import SourceDatasetType
+
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.datasets.snapshot import CatalogSnapshots, bump_catalog_generation, get_catalog_generation
+
+
+def _generation(db, source_type=SourceDatasetType.CMIP6):
+    with db.session.begin():
+        return get_catalog_generation(db, source_type)
+
+
+def test_catalog_generation(db):
+    assert _generation(db) == 0
+
+    with db.session.begin():
+        bump_catalog_generation(db, SourceDatasetType.CMIP6)
+        bump_catalog_generation(db, SourceDatasetType.CMIP6)
+
+    assert _generation(db) == 2
+    assert _generation(db, SourceDatasetType.CMIP7) == 0
+
+
+def test_register_datasets_bumps_generation(config, db, cmip6_data_catalog):
+    adapter = CMIP6DatasetAdapter()
+
+    adapter.register_datasets(config, db, cmip6_data_catalog, chunk_size=2)
+    # One increment per transaction
+    assert _generation(db) == 3
+
+    # Nothing has changed
+    adapter.register_datasets(config, db, cmip6_data_catalog)
+    assert _generation(db) == 3
+
+
+class TestCatalogSnapshots:
+    @pytest.fixture
+    def snapshots(self, config):
+        return CatalogSnapshots.from_config(config)
+
+    def test_load_catalog(self, snapshots, db_seeded, monkeypatch):
+        adapter = CMIP6DatasetAdapter()
+        expected = adapter.load_catalog(db_seeded)
+
+        pd.testing.assert_frame_equal(snapshots.load_catalog(db_seeded, adapter), expected)
+        assert len(list(snapshots.directory.glob("*.arrow"))) == 1
+
+        def _load_catalog(*args, **kwargs):
+            raise AssertionError("The catalog should be loaded from the snapshot")
+
+        monkeypatch.setattr(adapter, "load_catalog", _load_catalog)
+        pd.testing.assert_frame_equal(snapshots.load_catalog(db_seeded, adapter), expected)
+
+    def test_load_catalog_changed(self, snapshots, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+        with db_seeded.session.begin():
+            snapshots.load_catalog(db_seeded, adapter)
+        (previous,) = snapshots.directory.glob("*.arrow")
+
+        with db_seeded.session.begin():
+            bump_catalog_generation(db_seeded, SourceDatasetType.CMIP6)
+
+        snapshots.load_catalog(db_seeded, adapter)
+        (current,) = snapshots.directory.glob("*.arrow")
+        assert current != previous
+
+    def test_load_catalog_invalid(self, snapshots, db_seeded):
+        adapter = CMIP6DatasetAdapter()
+        snapshots.load_catalog(db_seeded, adapter)
+        (filename,) = snapshots.directory.glob("*.arrow")
+        filename.write_text("not an arrow file")
+
+        pd.testing.assert_frame_equal(
+            snapshots.load_catalog(db_seeded, adapter), adapter.load_catalog(db_seeded)
+        )
@@ -1,9 +1,11 @@
+import os
 from pathlib import Path
 
+import pandas as pd
 import pytest
 from ref_core.exceptions import OutOfTreeDatasetException
 
-from ref.datasets.utils import validate_path
+from ref.datasets.utils import FileFingerprint, read_catalog_file, validate_path
 
 
 def test_validate_prefix_with_valid_relative_path(config):
@@ -34,3 +36,29 @@ def test_validate_prefix_with_invalid_relative_path(config):
     raw_path = "/other_dir/file.csv"
     with pytest.raises(OutOfTreeDatasetException):
         validate_path(config, raw_path)
+
+
+def test_file_fingerprint(tmp_path):
+    path = tmp_path / "file.nc"
+    path.write_text("content")
+
+    fingerprint = FileFingerprint.from_path(path)
+    assert fingerprint.size == len("content")
+    assert fingerprint == FileFingerprint.from_path(str(path))
+
+    os.utime(path, (0, 0))
+    assert FileFingerprint.from_path(path) != fingerprint
+
+
+@pytest.mark.parametrize("filename", ["catalog.csv", "catalog.csv.gz", "catalog.parquet"])
+def test_read_catalog_file(tmp_path, filename):
+    catalog = pd.DataFrame({"path": [f"file_{i}.nc" for i in range(5)], "value": range(5)})
+    if filename.endswith(".parquet"):
+        catalog.to_parquet(tmp_path / filename)
+    else:
+        catalog.to_csv(tmp_path / filename, index=False)
+
+    chunks = list(read_catalog_file(tmp_path / filename, batch_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), catalog)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ref_core.constraints import RequireFacets
+from ref_core.datasets import FacetIndex, SourceDatasetType
+from ref_core.metrics import DataRequirement, FacetFilter
+
+from ref.planner import RequirementPlanner, filter_fingerprint, group_datasets, partition_fingerprint
+
+EXCLUDE_EXPERIMENTS = FacetFilter(facets={"experiment_id": ("piControl",)}, keep=False)
+
+
+def _requirement(*filters, group_by=("source_id", "experiment_id"), constraints=()):
+    return DataRequirement(
+        source_type=SourceDatasetType.CMIP6, filters=filters, group_by=group_by, constraints=constraints
+    )
+
+
+@pytest.fixture
+def data_catalog():
+    return pd.DataFrame(
+        {
+            "source_id": ["A", "A", "A", "B", "B", "B"],
+            "experiment_id": ["historical", "piControl", "historical", "historical", "ssp126", "historical"],
+            "variable_id": ["tas", "tas", "pr", "tas", "tas", "pr"],
+        }
+    ).astype("category")
+
+
+def test_filter_fingerprint():
+    assert filter_fingerprint(FacetFilter(facets={"a": "x", "b": ("y", "z")})) == filter_fingerprint(
+        FacetFilter(facets={"b": ["y", "z"], "a": "x"})
+    )
+    assert filter_fingerprint(FacetFilter(facets={"a": "x"})) != filter_fingerprint(
+        FacetFilter(facets={"a": "x"}, keep=False)
+    )
+
+
+def test_partition_fingerprint():
+    tas = FacetFilter(facets={"variable_id": "tas"})
+
+    assert partition_fingerprint(_requirement(tas)) == partition_fingerprint(
+        _requirement(tas, constraints=(RequireFacets("variable_id", ["tas"]),))
+    )
+    assert partition_fingerprint(_requirement(tas)) != partition_fingerprint(_requirement(tas, group_by=None))
+
+
+def test_group_datasets(data_catalog):
+    assert group_datasets(data_catalog, None) == [data_catalog]
+
+    groups = group_datasets(data_catalog, ["source_id", "experiment_id"])
+    # Combinations of categories that aren't present are skipped
+    assert [len(group) for group in groups] == [2, 1, 2, 1]
+
+
+def test_plan(data_catalog):
+    tas = FacetFilter(facets={"variable_id": "tas"})
+    pr = FacetFilter(facets={"variable_id": "pr"})
+    requirements = [
+        _requirement(tas, EXCLUDE_EXPERIMENTS),
+        _requirement(tas, EXCLUDE_EXPERIMENTS, constraints=(RequireFacets("variable_id", ["tas"]),)),
+        _requirement(tas),
+        _requirement(pr, EXCLUDE_EXPERIMENTS),
+    ]
+
+    planner = RequirementPlanner.plan(FacetIndex(data_catalog), requirements)
+
+    tas_key, exclude_key = filter_fingerprint(tas), filter_fingerprint(EXCLUDE_EXPERIMENTS)
+    assert planner.shared_prefixes == {(tas_key,), (tas_key, exclude_key)}
+    assert planner.shared_partitions == {partition_fingerprint(requirements[0])}
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        (),
+        (FacetFilter(facets={"variable_id": "tas"}),),
+        (FacetFilter(facets={"variable_id": "tas"}), EXCLUDE_EXPERIMENTS),
+        (FacetFilter(facets={"variable_id": "tas"}), FacetFilter(facets={"source_id": "B"})),
+        (FacetFilter(facets={"variable_id": "missing"}), EXCLUDE_EXPERIMENTS),
+    ],
+)
+def test_mask(data_catalog, filters):
+    facet_index = FacetIndex(data_catalog)
+    requirements = [
+        _requirement(FacetFilter(facets={"variable_id": "tas"}), EXCLUDE_EXPERIMENTS),
+        _requirement(FacetFilter(facets={"variable_id": "tas"})),
+    ]
+    planner = RequirementPlanner.plan(facet_index, requirements)
+
+    expected = facet_index.mask(filters)
+    np.testing.assert_array_equal(planner.mask(filters), expected)
+    # Reusing a cached prefix gives the same result
+    np.testing.assert_array_equal(planner.mask(filters), expected)
+
+
+def test_mask_missing_facet(data_catalog):
+    planner = RequirementPlanner.plan(FacetIndex(data_catalog), [])
+
+    with pytest.raises(KeyError, match="Facet 'missing' not in data catalog columns"):
+        planner.mask([FacetFilter(facets={"missing": "tas"})])
+
+
+def test_groups(data_catalog):
+    tas = FacetFilter(facets={"variable_id": "tas"})
+    requirements = [
+        _requirement(tas, EXCLUDE_EXPERIMENTS),
+        _requirement(tas, EXCLUDE_EXPERIMENTS, constraints=(RequireFacets("variable_id", ["tas"]),)),
+        _requirement(tas, group_by=None),
+    ]
+    planner = RequirementPlanner.plan(FacetIndex(data_catalog), requirements)
+
+    groups = planner.groups(requirements[0])
+    expected = group_datasets(requirements[0].apply_filters(data_catalog), requirements[0].group_by)
+    assert len(groups) == len(expected) == 3
+    for group, exp in zip(groups, expected):
+        pd.testing.assert_frame_equal(group, exp)
+
+    # The groups of shared partitions are only computed once
+    assert all(a is b for a, b in zip(planner.groups(requirements[1]), groups))
+    assert planner.groups(requirements[2])[0].index.tolist() == [0, 1, 3, 4]
+
+    assert planner.groups(_requirement(FacetFilter(facets={"variable_id": "missing"}))) == []
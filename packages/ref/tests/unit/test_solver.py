@@ -1,14 +1,41 @@
+import itertools
+import os
+import shutil
 from unittest import mock
 
+import numpy as np
 import pandas as pd
 import pytest
+from attrs import evolve
 from ref_core.constraints import RequireFacets, SelectParentExperiment
-from ref_core.datasets import SourceDatasetType
+from ref_core.datasets import FacetIndex, SourceDatasetType
+from ref_core.exceptions import InvalidMetricException
 from ref_core.metrics import DataRequirement, FacetFilter
 from ref_metrics_example import provider
+from sqlalchemy import func, update
 
+from ref.datasets.changelog import latest_change, record_changes
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.datasets.shared import SharedCatalog
+from ref.models import Dataset
+from ref.models import Metric as MetricModel
+from ref.models import MetricExecution as MetricExecutionModel
+from ref.models import Provider as ProviderModel
+from ref.models.dataset import CMIP6Dataset, DatasetChangeType
+from ref.models.metric_execution import MetricExecutionResult
+from ref.planner import RequirementPlanner
 from ref.provider_registry import ProviderRegistry
-from ref.solver import MetricSolver, extract_covered_datasets, solve_metrics
+from ref.solver import (
+    ExecutionState,
+    ExecutionStates,
+    MetricSolver,
+    _can_solve_remotely,
+    _solve_requirements,
+    _take_groups,
+    extract_covered_datasets,
+    join_groups,
+    solve_metrics,
+)
 
 
 @pytest.fixture
@@ -30,150 +57,436 @@ class TestMetricSolver:
         assert isinstance(solver.data_catalog[SourceDatasetType.CMIP6], pd.DataFrame)
         assert len(solver.data_catalog[SourceDatasetType.CMIP6])
 
+    def test_solver_build_from_db_columns(self, solver):
+        # Only the columns used by the example metric are loaded
+        assert sorted(solver.data_catalog[SourceDatasetType.CMIP6].columns) == [
+            "experiment_id",
+            "instance_id",
+            "path",
+            "source_id",
+            "variable_id",
+            "variant_label",
+        ]
+
+    def test_facet_index(self, solver):
+        index = solver.facet_index(SourceDatasetType.CMIP6)
+        assert index.data_catalog is solver.data_catalog[SourceDatasetType.CMIP6]
+        assert solver.facet_index(SourceDatasetType.CMIP6) is index
+
+        # The index is rebuilt if the data catalog is replaced
+        solver.data_catalog[SourceDatasetType.CMIP6] = index.data_catalog.iloc[:2]
+        assert solver.facet_index(SourceDatasetType.CMIP6) is not index
+
+    def test_plan(self, solver):
+        planners = solver.plan()
+        assert list(planners) == [SourceDatasetType.CMIP6]
+        assert planners[SourceDatasetType.CMIP6].facet_index is solver.facet_index(SourceDatasetType.CMIP6)
+
+    def test_solve_parallel(self, solver, tmp_path):
+        expected = list(solver.solve())
+        executions = list(solver.solve(n_jobs=2, directory=tmp_path / "shared"))
+
+        assert [execution.build_metric_execution_info().key for execution in executions] == [
+            execution.build_metric_execution_info().key for execution in expected
+        ]
+        for execution, exp in zip(executions, expected):
+            pd.testing.assert_frame_equal(
+                execution.metric_dataset[SourceDatasetType.CMIP6].datasets,
+                exp.metric_dataset[SourceDatasetType.CMIP6].datasets,
+            )
+        # The shared data catalog is removed once solved
+        assert list((tmp_path / "shared").iterdir()) == []
+
+    @mock.patch("ref.solver._can_solve_remotely", return_value=False)
+    @mock.patch("ref.solver.SharedCatalog.publish")
+    def test_solve_parallel_local(self, mock_publish, mock_remote, solver, tmp_path):
+        expected = [execution.build_metric_execution_info().key for execution in solver.solve()]
+        executions = list(solver.solve(n_jobs=2, directory=tmp_path / "shared"))
+
+        # The data catalogs aren't shared if none of the metrics can be solved by the workers
+        assert [execution.build_metric_execution_info().key for execution in executions] == expected
+        mock_publish.assert_not_called()
+
+    def test_solve_requirements(self, solver, tmp_path):
+        data_catalog = solver.data_catalog[SourceDatasetType.CMIP6]
+        requirement = provider.metrics()[0].data_requirements[0]
+        rows = np.flatnonzero(solver.facet_index(SourceDatasetType.CMIP6).mask(requirement.filters))
+        shared = SharedCatalog.publish(data_catalog, tmp_path)
+
+        # Only the filtered rows are read from the shared data catalog
+        with mock.patch.object(SharedCatalog, "take", wraps=shared.take) as mock_take:
+            [(positions, offsets)] = _solve_requirements([(requirement, shared, rows)])
+        mock_take.assert_called_once()
+        np.testing.assert_array_equal(mock_take.call_args.args[0], rows)
+        shared.unlink()
+
+        groups = _take_groups(data_catalog, positions, offsets)
+        expected = extract_covered_datasets(data_catalog, requirement)
+        assert len(groups) == len(expected) == 2
+        for group, exp in zip(groups, expected):
+            pd.testing.assert_frame_equal(group, exp)
+
+    def test_solver_refresh(self, db_seeded, solver):
+        data_catalog = solver.data_catalog[SourceDatasetType.CMIP6]
+        slug = data_catalog["instance_id"].iloc[0]
+
+        with db_seeded.session.begin():
+            dataset_id = db_seeded.session.execute(
+                update(Dataset)
+                .where(Dataset.slug == slug)
+                .values(retracted=True, updated_at=func.now())
+                .returning(Dataset.id)
+            ).scalar_one()
+            record_changes(db_seeded, [dataset_id], DatasetChangeType.RETRACTED)
+            assert solver.refresh(db_seeded) == 1
+
+        refreshed = solver.data_catalog[SourceDatasetType.CMIP6]
+        assert slug not in refreshed["instance_id"].values
+        assert refreshed["instance_id"].nunique() == data_catalog["instance_id"].nunique() - 1
+
+    def test_solve_since(self, db_seeded, solver):
+        with db_seeded.session.begin():
+            seq = latest_change(db_seeded)
+            assert list(solver.solve_since(db_seeded, seq)) == []
+
+            # Changes to datasets that aren't used by the metric don't result in any executions
+            rsdt = db_seeded.session.query(CMIP6Dataset).filter_by(variable_id="rsdt").one()
+            record_changes(db_seeded, [rsdt.id], DatasetChangeType.UPDATED)
+            assert list(solver.solve_since(db_seeded, seq)) == []
+
+            tas = db_seeded.session.query(CMIP6Dataset).filter_by(variable_id="tas").one()
+            record_changes(db_seeded, [tas.id], DatasetChangeType.UPDATED)
+            executions = list(solver.solve_since(db_seeded, seq))
+
+        keys = [execution.build_metric_execution_info().key for execution in executions]
+        assert keys == [
+            execution.build_metric_execution_info().key
+            for execution in solver.solve()
+            if execution.metric_dataset[SourceDatasetType.CMIP6].instance_id.unique().tolist()
+            == [tas.instance_id]
+        ]
+        assert keys == ["ACCESS-ESM1-5_tas_ssp126_r1i1p1f1"]
+
+    def test_solve_since_ungrouped(self, db_seeded, solver):
+        requirement = DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": "tas"}),),
+            group_by=None,
+        )
+        with db_seeded.session.begin():
+            tas = db_seeded.session.query(CMIP6Dataset).filter_by(variable_id="tas").one()
+
+            # The affected groups can't be determined without a group_by
+            assert solver._changed_groups(db_seeded, requirement, [tas.id]) is None
+
+            requirement = evolve(requirement, group_by=("variable_id", "experiment_id"))
+            groups = solver._changed_groups(db_seeded, requirement, [tas.id])
+        assert len(groups) == 1
+        assert groups[0]["instance_id"].unique().tolist() == [tas.instance_id]
+
+
+def _join_requirement(join_on, source_type=SourceDatasetType.CMIP6):
+    return DataRequirement(source_type=source_type, filters=(), group_by=None, join_on=join_on)
+
+
+def _groups(**facets):
+    return [
+        pd.DataFrame({facet: [value] for facet, value in zip(facets, values)})
+        for values in zip(*facets.values())
+    ]
+
+
+class TestJoinGroups:
+    def test_product(self):
+        groups = [_groups(source_id=["A", "B"]), _groups(source_id=["A", "C"], table_id=["fx", "fx"])]
+
+        result = list(join_groups([_join_requirement(None), _join_requirement(None)], groups))
+
+        assert result == list(itertools.product(*groups))
+
+    def test_join(self):
+        models = _groups(source_id=["A", "A", "B"], experiment_id=["historical", "ssp126", "historical"])
+        cell_areas = _groups(source_id=["B", "A", "C"])
+
+        result = list(
+            join_groups(
+                [_join_requirement(("source_id",)), _join_requirement(("source_id",))], [models, cell_areas]
+            )
+        )
+
+        assert result == [(models[0], cell_areas[1]), (models[1], cell_areas[1]), (models[2], cell_areas[0])]
+
+    def test_join_partial(self):
+        # The first and last requirements share a join facet, but the second is joined with neither
+        models = _groups(source_id=["A", "B"], grid_label=["gn", "gr"])
+        observations = _groups(obs=["x", "y"])
+        cell_areas = _groups(source_id=["A", "A"], grid_label=["gr", "gn"])
+        requirements = [
+            _join_requirement(("source_id", "grid_label")),
+            _join_requirement(None, SourceDatasetType.CMIP7),
+            _join_requirement(("grid_label", "source_id")),
+        ]
+
+        result = list(join_groups(requirements, [models, observations, cell_areas]))
+
+        assert result == [
+            (models[0], observations[0], cell_areas[1]),
+            (models[0], observations[1], cell_areas[1]),
+        ]
+
+    def test_join_multiple_values(self):
+        models = [pd.DataFrame({"source_id": ["A", "B"]}), *_groups(source_id=["A"])]
+        cell_areas = _groups(source_id=["A"])
+        requirements = [_join_requirement(("source_id",)), _join_requirement(("source_id",))]
+
+        result = list(join_groups(requirements, [models, cell_areas]))
+
+        # Groups without a single value of a join facet can't be joined
+        assert result == [(models[1], cell_areas[0])]
+
+    def test_join_unshared_facet(self):
+        # The grid label is only a join facet of the first requirement, so it can have multiple values
+        models = [pd.DataFrame({"source_id": ["A", "A"], "grid_label": ["gn", "gr"]})]
+        cell_areas = _groups(source_id=["A"])
+        requirements = [_join_requirement(("source_id", "grid_label")), _join_requirement(("source_id",))]
+
+        result = list(join_groups(requirements, [models, cell_areas]))
+
+        assert result == [(models[0], cell_areas[0])]
+
+    def test_join_missing_values(self):
+        models = _groups(source_id=["A", None, float("nan")])
+        cell_areas = _groups(source_id=["A", None, float("nan")])
+        requirements = [_join_requirement(("source_id",)), _join_requirement(("source_id",))]
+
+        result = list(join_groups(requirements, [models, cell_areas]))
+
+        # Missing values never match
+        assert result == [(models[0], cell_areas[0])]
+
+    def test_join_empty(self):
+        requirements = [_join_requirement(("source_id",)), _join_requirement(("source_id",))]
+
+        assert list(join_groups(requirements, [_groups(source_id=["A"]), []])) == []
+
+
+def test_solve_metric_executions_join(cmip6_data_catalog):
+    requirements = (
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"table_id": "Amon", "variable_id": ("tas", "rsut")}),),
+            group_by=("source_id", "variable_id"),
+            join_on=("source_id", "grid_label"),
+        ),
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": "areacella"}),),
+            group_by=("source_id",),
+            join_on=("source_id", "grid_label"),
+        ),
+    )
+    metric = mock.Mock(slug="metric", data_requirements=requirements)
+    metric_provider = mock.Mock(slug="provider")
+    metric_provider.metrics.return_value = [metric]
+    solver = MetricSolver(
+        provider_registry=mock.Mock(providers=[metric_provider]),
+        data_catalog={SourceDatasetType.CMIP6: cmip6_data_catalog},
+    )
+
+    executions = list(solver.solve())
+
+    assert [execution.build_metric_execution_info().key for execution in executions] == [
+        "ACCESS-ESM1-5_rsut_ACCESS-ESM1-5",
+        "ACCESS-ESM1-5_tas_ACCESS-ESM1-5",
+    ]
+    for execution in executions:
+        # The groups of both requirements are in the collection for the source type
+        datasets = execution.metric_dataset[SourceDatasetType.CMIP6].datasets
+        assert sorted(datasets["variable_id"].unique()) == sorted(
+            [execution.dataset_groups[0]["variable_id"].iloc[0], "areacella"]
+        )
+
 
 @pytest.mark.parametrize(
-    "requirement,data_catalog,expected",
+    "source_type,constraints,expected",
     [
-        pytest.param(
-            DataRequirement(
-                source_type=SourceDatasetType.CMIP6,
-                filters=(FacetFilter(facets={"variable_id": "missing"}),),
-                group_by=("variable_id", "experiment_id"),
-            ),
+        (SourceDatasetType.CMIP6, (), True),
+        (SourceDatasetType.CMIP6, (RequireFacets(dimension="variable_id", required_facets=["tas"]),), True),
+        (SourceDatasetType.CMIP6, (SelectParentExperiment(),), False),
+        (SourceDatasetType.CMIP7, (), False),
+    ],
+)
+def test_can_solve_remotely(source_type, constraints, expected):
+    metric = mock.Mock()
+    metric.data_requirements = (
+        DataRequirement(source_type=source_type, filters=(), group_by=None, constraints=constraints),
+    )
+
+    assert _can_solve_remotely(metric, {SourceDatasetType.CMIP6: pd.DataFrame()}) == expected
+
+
+DATA_COVERAGE_CASES = [
+    pytest.param(
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": "missing"}),),
+            group_by=("variable_id", "experiment_id"),
+        ),
+        pd.DataFrame(
+            {
+                "variable_id": ["tas", "tas", "pr"],
+                "experiment_id": ["ssp119", "ssp126", "ssp119"],
+                "variant_label": ["r1i1p1f1", "r1i1p1f1", "r1i1p1f1"],
+            }
+        ),
+        [],
+        id="empty",
+    ),
+    pytest.param(
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": "tas"}),),
+            group_by=("variable_id", "experiment_id"),
+        ),
+        pd.DataFrame(
+            {
+                "variable_id": ["tas", "tas", "pr"],
+                "experiment_id": ["ssp119", "ssp126", "ssp119"],
+                "variant_label": ["r1i1p1f1", "r1i1p1f1", "r1i1p1f1"],
+            }
+        ),
+        [
             pd.DataFrame(
                 {
-                    "variable_id": ["tas", "tas", "pr"],
-                    "experiment_id": ["ssp119", "ssp126", "ssp119"],
-                    "variant_label": ["r1i1p1f1", "r1i1p1f1", "r1i1p1f1"],
-                }
-            ),
-            [],
-            id="empty",
-        ),
-        pytest.param(
-            DataRequirement(
-                source_type=SourceDatasetType.CMIP6,
-                filters=(FacetFilter(facets={"variable_id": "tas"}),),
-                group_by=("variable_id", "experiment_id"),
+                    "variable_id": ["tas"],
+                    "experiment_id": ["ssp119"],
+                    "variant_label": ["r1i1p1f1"],
+                },
+                index=[0],
             ),
             pd.DataFrame(
                 {
-                    "variable_id": ["tas", "tas", "pr"],
-                    "experiment_id": ["ssp119", "ssp126", "ssp119"],
-                    "variant_label": ["r1i1p1f1", "r1i1p1f1", "r1i1p1f1"],
-                }
+                    "variable_id": ["tas"],
+                    "experiment_id": ["ssp126"],
+                    "variant_label": ["r1i1p1f1"],
+                },
+                index=[1],
             ),
-            [
-                pd.DataFrame(
-                    {
-                        "variable_id": ["tas"],
-                        "experiment_id": ["ssp119"],
-                        "variant_label": ["r1i1p1f1"],
-                    },
-                    index=[0],
-                ),
-                pd.DataFrame(
-                    {
-                        "variable_id": ["tas"],
-                        "experiment_id": ["ssp126"],
-                        "variant_label": ["r1i1p1f1"],
-                    },
-                    index=[1],
-                ),
-            ],
-            id="simple-filter",
+        ],
+        id="simple-filter",
+    ),
+    pytest.param(
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": ("tas", "pr")}),),
+            group_by=("experiment_id",),
+        ),
+        pd.DataFrame(
+            {
+                "variable_id": ["tas", "tas", "pr"],
+                "experiment_id": ["ssp119", "ssp126", "ssp119"],
+            }
         ),
-        pytest.param(
-            DataRequirement(
-                source_type=SourceDatasetType.CMIP6,
-                filters=(FacetFilter(facets={"variable_id": ("tas", "pr")}),),
-                group_by=("experiment_id",),
+        [
+            pd.DataFrame(
+                {
+                    "variable_id": ["tas", "pr"],
+                    "experiment_id": ["ssp119", "ssp119"],
+                },
+                index=[0, 2],
             ),
             pd.DataFrame(
                 {
-                    "variable_id": ["tas", "tas", "pr"],
-                    "experiment_id": ["ssp119", "ssp126", "ssp119"],
-                }
+                    "variable_id": ["tas"],
+                    "experiment_id": ["ssp126"],
+                },
+                index=[1],
             ),
-            [
-                pd.DataFrame(
-                    {
-                        "variable_id": ["tas", "pr"],
-                        "experiment_id": ["ssp119", "ssp119"],
-                    },
-                    index=[0, 2],
-                ),
-                pd.DataFrame(
-                    {
-                        "variable_id": ["tas"],
-                        "experiment_id": ["ssp126"],
-                    },
-                    index=[1],
-                ),
-            ],
-            id="simple-or",
+        ],
+        id="simple-or",
+    ),
+    pytest.param(
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": ("tas", "pr")}),),
+            constraints=(SelectParentExperiment(),),
+            group_by=("variable_id", "experiment_id"),
         ),
-        pytest.param(
-            DataRequirement(
-                source_type=SourceDatasetType.CMIP6,
-                filters=(FacetFilter(facets={"variable_id": ("tas", "pr")}),),
-                constraints=(SelectParentExperiment(),),
-                group_by=("variable_id", "experiment_id"),
-            ),
+        pd.DataFrame(
+            {
+                "variable_id": ["tas", "tas"],
+                "experiment_id": ["ssp119", "historical"],
+                "parent_experiment_id": ["historical", "none"],
+            }
+        ),
+        [
             pd.DataFrame(
                 {
                     "variable_id": ["tas", "tas"],
-                    "experiment_id": ["ssp119", "historical"],
-                    "parent_experiment_id": ["historical", "none"],
-                }
+                    "experiment_id": ["historical", "ssp119"],
+                },
+                # The order of the rows is not guaranteed
+                index=[1, 0],
             ),
-            [
-                pd.DataFrame(
-                    {
-                        "variable_id": ["tas", "tas"],
-                        "experiment_id": ["historical", "ssp119"],
-                    },
-                    # The order of the rows is not guaranteed
-                    index=[1, 0],
-                ),
-            ],
-            marks=[pytest.mark.xfail(reason="Parent experiment not implemented")],
-            id="parent",
+        ],
+        marks=[pytest.mark.xfail(reason="Parent experiment not implemented")],
+        id="parent",
+    ),
+    pytest.param(
+        DataRequirement(
+            source_type=SourceDatasetType.CMIP6,
+            filters=(FacetFilter(facets={"variable_id": ("tas", "pr")}),),
+            constraints=(RequireFacets(dimension="variable_id", required_facets=["tas", "pr"]),),
+            group_by=("experiment_id",),
         ),
-        pytest.param(
-            DataRequirement(
-                source_type=SourceDatasetType.CMIP6,
-                filters=(FacetFilter(facets={"variable_id": ("tas", "pr")}),),
-                constraints=(RequireFacets(dimension="variable_id", required_facets=["tas", "pr"]),),
-                group_by=("experiment_id",),
-            ),
+        pd.DataFrame(
+            {
+                "variable_id": ["tas", "tas", "pr"],
+                "experiment_id": ["ssp119", "ssp126", "ssp119"],
+            }
+        ),
+        [
             pd.DataFrame(
                 {
-                    "variable_id": ["tas", "tas", "pr"],
-                    "experiment_id": ["ssp119", "ssp126", "ssp119"],
-                }
+                    "variable_id": ["tas", "pr"],
+                    "experiment_id": ["ssp119", "ssp119"],
+                },
+                index=[0, 2],
             ),
-            [
-                pd.DataFrame(
-                    {
-                        "variable_id": ["tas", "pr"],
-                        "experiment_id": ["ssp119", "ssp119"],
-                    },
-                    index=[0, 2],
-                ),
-            ],
-            id="simple-validation",
-        ),
-    ],
-)
-def test_data_coverage(requirement, data_catalog, expected):
-    result = extract_covered_datasets(data_catalog, requirement)
+        ],
+        id="simple-validation",
+    ),
+]
+
+
+def _extract_covered_datasets(data_catalog, requirement, method):
+    facet_index = FacetIndex(data_catalog) if method != "filters" else None
+    planner = RequirementPlanner.plan(facet_index, [requirement]) if method == "planner" else None
+    return extract_covered_datasets(data_catalog, requirement, facet_index, planner)
+
+
+@pytest.mark.parametrize("requirement,data_catalog,expected", DATA_COVERAGE_CASES)
+@pytest.mark.parametrize("method", ["filters", "facet_index", "planner"])
+def test_data_coverage(requirement, data_catalog, expected, method):
+    result = _extract_covered_datasets(data_catalog, requirement, method)
 
     for res, exp in zip(result, expected):
         pd.testing.assert_frame_equal(res, exp)
     assert len(result) == len(expected)
 
 
+@pytest.mark.parametrize("requirement,data_catalog,expected", DATA_COVERAGE_CASES)
+@pytest.mark.parametrize("method", ["filters", "facet_index", "planner"])
+def test_data_coverage_categorical(requirement, data_catalog, expected, method):
+    # The data catalog loaded from the database stores facets as categoricals
+    result = _extract_covered_datasets(data_catalog.astype("category"), requirement, method)
+
+    for res, exp in zip(result, expected):
+        # The groups keep the categorical dtypes of the data catalog
+        pd.testing.assert_frame_equal(res.astype(object), exp.astype(object))
+    assert len(result) == len(expected)
+
+
 @mock.patch("ref.solver.get_executor")
 def test_solve_metrics_default_solver(mock_executor, db_seeded, solver):
     with db_seeded.session.begin():
@@ -205,6 +518,98 @@ def test_solve_metrics(mock_executor, db_seeded, solver):
         assert definition.key in expected_keys
 
 
+@mock.patch("ref.solver.get_executor")
+def test_solve_metrics_rerun(mock_executor, db_seeded, solver):
+    with db_seeded.session.begin():
+        solve_metrics(db_seeded, solver=solver)
+    assert mock_executor.return_value.run_metric.call_count == 2
+
+    # Executions that have already been run with the same datasets are skipped
+    with db_seeded.session.begin():
+        solve_metrics(db_seeded, solver=solver)
+    assert mock_executor.return_value.run_metric.call_count == 2
+
+    with db_seeded.session.begin():
+        executions = db_seeded.session.query(MetricExecutionModel).all()
+        assert len(executions) == 2
+        assert not any(execution.dirty for execution in executions)
+
+
+@mock.patch("ref.solver.get_executor")
+def test_solve_metrics_reconciled(mock_executor, config, db, esgf_data_dir, tmp_path):
+    data_dir = tmp_path / "copy"
+    shutil.copytree(esgf_data_dir, data_dir)
+    adapter = CMIP6DatasetAdapter()
+    adapter.register_datasets(config, db, adapter.find_local_datasets(data_dir))
+
+    def _solve():
+        with db.session.begin():
+            metric_solver = MetricSolver.build_from_db(db)
+            metric_solver.provider_registry = ProviderRegistry(providers=[provider])
+            solve_metrics(db, solver=metric_solver)
+
+    _solve()
+    assert mock_executor.return_value.run_metric.call_count == 2
+
+    # Modifying a file in place marks the executions as dirty without changing the dataset hash
+    tas_file = next(data_dir.rglob("tas_*.nc"))
+    os.utime(tas_file, (tas_file.stat().st_atime, tas_file.stat().st_mtime + 60))
+    adapter.reconcile_datasets(config, db)
+    _solve()
+    assert mock_executor.return_value.run_metric.call_count == 3
+
+    with db.session.begin():
+        executions = db.session.query(MetricExecutionModel).all()
+        assert not any(execution.dirty for execution in executions)
+        assert [len(execution.results) for execution in executions] == [1, 1]
+        assert all(result.successful and result.datasets for result in executions[0].results)
+
+
+class TestExecutionStates:
+    def test_from_db(self, db):
+        with db.session.begin():
+            provider_model = ProviderModel(slug="provider", name="Provider", version="v1")
+            metric_model = MetricModel(slug="metric", name="Metric", provider=provider_model)
+            executions = [
+                MetricExecutionModel(metric=metric_model, key="new", dirty=True),
+                MetricExecutionModel(metric=metric_model, key="run", dirty=False),
+            ]
+            db.session.add_all([provider_model, metric_model, *executions])
+            db.session.flush()
+            for dataset_hash in ["old", "latest"]:
+                db.session.add(
+                    MetricExecutionResult(metric_execution=executions[1], dataset_hash=dataset_hash)
+                )
+                db.session.flush()
+
+            states = ExecutionStates.from_db(db)
+
+        assert states.metric_ids == {("provider", "v1", "metric"): metric_model.id}
+        assert states.executions == {
+            (metric_model.id, "new"): ExecutionState(executions[0].id, dirty=True, dataset_hash=None),
+            (metric_model.id, "run"): ExecutionState(executions[1].id, dirty=False, dataset_hash="latest"),
+        }
+
+    def test_metric_id_missing(self):
+        states = ExecutionStates(metric_ids={}, executions={})
+
+        with pytest.raises(InvalidMetricException, match="is not registered"):
+            states.metric_id(provider, provider.metrics()[0])
+
+
+@pytest.mark.parametrize(
+    "state,expected",
+    [
+        (ExecutionState(1, dirty=False, dataset_hash=None), True),
+        (ExecutionState(1, dirty=False, dataset_hash="other"), True),
+        (ExecutionState(1, dirty=True, dataset_hash="hash"), True),
+        (ExecutionState(1, dirty=False, dataset_hash="hash"), False),
+    ],
+)
+def test_execution_state_should_run(state, expected):
+    assert state.should_run("key", "hash") == expected
+
+
 @mock.patch("ref.solver.get_executor")
 def test_solve_metrics_dry_run(mock_executor, db_seeded, solver):
     solve_metrics(db_seeded, dry_run=True, solver=solver)
@@ -0,0 +1,199 @@
+"""
+Benchmark the indexes on the data catalog tables
+
+Creates a synthetic SQLite database of CMIP6 datasets
+and times loading the data catalog with and without the indexes on
+the DRS facets, `instance_id`, `updated_at` and `cmip6_dataset_file.dataset_id`.
+
+```
+uv run python scripts/benchmark_catalog_indexes.py --n-files 1000000
+```
+"""
+
+import argparse
+import datetime
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import sqlalchemy
+from ref_core.datasets import FacetFilter, SourceDatasetType
+from ref_core.metrics import DataRequirement
+from sqlalchemy import Index, select, text
+
+from ref.database import Database
+from ref.datasets.cmip6 import CMIP6DatasetAdapter
+from ref.models.dataset import CMIP6Dataset, CMIP6File, Dataset
+
+INDEXES = [
+    "ix_cmip6_dataset_facets",
+    "ix_cmip6_dataset_instance_id",
+    "ix_cmip6_dataset_file_dataset_id",
+    "ix_dataset_updated_at",
+]
+
+# Number of unique values of the facets that are commonly filtered on
+CARDINALITY = {
+    "activity_id": 20,
+    "institution_id": 50,
+    "source_id": 100,
+    "experiment_id": 200,
+    "table_id": 30,
+    "grid_label": 3,
+}
+
+_INSERT_CHUNK_SIZE = 10_000
+
+
+def _insert(db: Database, table: sqlalchemy.Table, rows: list[dict[str, Any]]) -> None:
+    with db.session.begin():
+        for start in range(0, len(rows), _INSERT_CHUNK_SIZE):
+            db.session.execute(table.insert(), rows[start : start + _INSERT_CHUNK_SIZE])
+
+
+def populate(db: Database, n_files: int, files_per_dataset: int, seed: int = 0) -> None:
+    """
+    Insert a synthetic set of datasets into the database
+
+    Each dataset has a unique variable and consists of `files_per_dataset` files.
+    """
+    rng = np.random.default_rng(seed)
+    n_datasets = max(n_files // files_per_dataset, 1)
+    dataset_table = Dataset.metadata.tables[Dataset.__tablename__]
+    cmip6_dataset_table = Dataset.metadata.tables[CMIP6Dataset.__tablename__]
+    file_table = Dataset.metadata.tables[CMIP6File.__tablename__]
+
+    facets = {name: rng.integers(0, n, n_datasets) for name, n in CARDINALITY.items()}
+    updated_at = datetime.datetime(2020, 1, 1)
+
+    datasets = []
+    cmip6_datasets = []
+    for i in range(n_datasets):
+        row: dict[str, Any] = {"id": i + 1}
+        for column in cmip6_dataset_table.columns:
+            if column.name == "id":
+                continue
+            elif column.nullable:
+                row[column.name] = None
+            elif column.name in CARDINALITY:
+                row[column.name] = f"{column.name}{facets[column.name][i]}"
+            elif isinstance(column.type, sqlalchemy.Integer | sqlalchemy.Float):
+                row[column.name] = 0
+            else:
+                row[column.name] = column.name
+        row["variable_id"] = f"var{i}"
+        row["instance_id"] = f"CMIP6.{row['source_id']}.{row['experiment_id']}.{row['variable_id']}"
+        cmip6_datasets.append(row)
+        datasets.append(
+            {
+                "id": i + 1,
+                "slug": row["instance_id"],
+                "dataset_type": SourceDatasetType.CMIP6.name,
+                "updated_at": updated_at + datetime.timedelta(seconds=int(rng.integers(0, 10_000_000))),
+                "retracted": False,
+            }
+        )
+
+    files = [
+        {
+            "dataset_id": i // files_per_dataset + 1,
+            "start_time": datetime.datetime(1850 + 10 * (i % files_per_dataset), 1, 16),
+            "end_time": datetime.datetime(1859 + 10 * (i % files_per_dataset), 12, 16),
+            "path": f"/data/file_{i}.nc",
+        }
+        for i in range(n_datasets * files_per_dataset)
+    ]
+
+    _insert(db, dataset_table, datasets)
+    _insert(db, cmip6_dataset_table, cmip6_datasets)
+    _insert(db, file_table, files)
+
+
+def _indexes() -> list[Index]:
+    return [
+        index
+        for table in Dataset.metadata.tables.values()
+        for index in table.indexes
+        if index.name in INDEXES
+    ]
+
+
+def _time(func: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_queries(db: Database, repeat: int) -> dict[str, float]:
+    """
+    Time the queries that are used to build the data catalog
+    """
+    adapter = CMIP6DatasetAdapter()
+    requirement = DataRequirement(
+        source_type=SourceDatasetType.CMIP6,
+        filters=(
+            FacetFilter({"source_id": "source_id1", "experiment_id": ("experiment_id1", "experiment_id2")}),
+        ),
+        group_by=None,
+    )
+    file_table = Dataset.metadata.tables[CMIP6File.__tablename__]
+    cmip6_dataset_table = Dataset.metadata.tables[CMIP6Dataset.__tablename__]
+
+    def _files_of_dataset() -> None:
+        # The lookup used when registering a dataset
+        db.session.execute(
+            select(file_table)
+            .join(cmip6_dataset_table, cmip6_dataset_table.c.id == file_table.c.dataset_id)
+            .where(cmip6_dataset_table.c.instance_id == "CMIP6.source_id1.experiment_id1.var1")
+        ).all()
+
+    queries = {
+        "Load the data catalog": lambda: adapter.load_catalog(db),
+        "Load the most recently updated datasets": lambda: adapter.load_catalog(db, limit=1000),
+        "Load the datasets used by a metric": lambda: adapter.load_catalog(db, requirements=[requirement]),
+        "Find the files of a dataset": _files_of_dataset,
+    }
+    with db.session.begin():
+        return {name: _time(query, repeat) for name, query in queries.items()}
+
+
+def main() -> None:  # noqa: D103
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-files", type=int, default=1_000_000)
+    parser.add_argument("--files-per-dataset", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(f"sqlite:///{Path(tmp_dir) / 'ref.db'}")
+        populate(db, args.n_files, args.files_per_dataset)
+        print(f"Synthetic database: {args.n_files} files, {args.files_per_dataset} files per dataset")
+
+        with db.session.begin():
+            connection = db.session.connection()
+            for index in _indexes():
+                index.drop(connection)
+            connection.execute(text("ANALYZE"))
+        without_indexes = run_queries(db, args.repeat)
+
+        with db.session.begin():
+            connection = db.session.connection()
+            for index in _indexes():
+                index.create(connection)
+            connection.execute(text("ANALYZE"))
+        with_indexes = run_queries(db, args.repeat)
+
+    print(f"{'Query':<45}{'Without indexes':>18}{'With indexes':>15}{'Speedup':>10}")
+    for name, before in without_indexes.items():
+        after = with_indexes[name]
+        print(f"{name:<45}{before:>17.3f}s{after:>14.3f}s{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
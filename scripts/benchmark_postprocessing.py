@@ -0,0 +1,165 @@
+"""
+Benchmark the post-processing of a CMIP6 data catalog
+
+Compares the columnar post-processing used by `CMIP6DatasetAdapter.find_local_datasets`
+against the previous row-at-a-time implementation using a synthetic data catalog.
+
+```
+uv run python scripts/benchmark_postprocessing.py --n-rows 1000000
+```
+"""
+
+import argparse
+import time
+import warnings
+from collections.abc import Callable
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ref.datasets.cmip6 import _postprocess_catalog
+
+DRS_ITEMS = [
+    "activity_id",
+    "institution_id",
+    "source_id",
+    "experiment_id",
+    "member_id",
+    "table_id",
+    "variable_id",
+    "grid_label",
+    "version",
+]
+
+
+def _legacy_parse_datetime(dt_str: pd.Series) -> pd.Series:
+    def _inner(date_string):
+        if not date_string:
+            return None
+        try:
+            return datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S.%f")
+
+    return pd.Series([_inner(dt) for dt in dt_str], index=dt_str.index, dtype="object")
+
+
+def _legacy_postprocess_catalog(datasets: pd.DataFrame) -> pd.DataFrame:
+    datasets["start_time"] = _legacy_parse_datetime(datasets["start_time"])
+    datasets["end_time"] = _legacy_parse_datetime(datasets["end_time"])
+    datasets["instance_id"] = datasets.apply(
+        lambda row: "CMIP6." + ".".join([row[item] for item in DRS_ITEMS]), axis=1
+    )
+
+    def _fix_parent_variant_label(group: pd.DataFrame) -> pd.DataFrame:
+        if group["parent_variant_label"].nunique() == 1:
+            return group
+        group["parent_variant_label"] = group["variant_label"].iloc[0]
+        return group
+
+    with warnings.catch_warnings():
+        # Silence the deprecation of operating on the grouping columns
+        warnings.simplefilter("ignore", DeprecationWarning)
+        datasets = datasets.groupby("instance_id").apply(_fix_parent_variant_label).reset_index(drop=True)
+    datasets["branch_time_in_child"] = pd.to_numeric(
+        datasets["branch_time_in_child"].astype(str).str.replace("D", "")
+    )
+    datasets["branch_time_in_parent"] = pd.to_numeric(
+        datasets["branch_time_in_parent"].astype(str).str.replace("D", "")
+    )
+    return datasets
+
+
+def make_catalog(n_rows: int, files_per_dataset: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Create a synthetic data catalog of unprocessed metadata
+
+    Each dataset consists of `files_per_dataset` files which each cover a decade.
+    The datasets start at different dates, so the catalog contains many distinct time ranges,
+    and a small fraction use model years that are outside of the range of pandas timestamps
+    as control runs often do.
+    """
+    rng = np.random.default_rng(seed)
+    n_datasets = max(n_rows // files_per_dataset, 1)
+
+    dataset_idx = np.repeat(np.arange(n_datasets), files_per_dataset)[:n_rows]
+    file_idx = np.tile(np.arange(files_per_dataset), n_datasets)[:n_rows]
+
+    def _facet(prefix: str, n_values: int) -> np.ndarray:
+        values = np.array([f"{prefix}{i}" for i in range(n_values)], dtype=object)
+        return values[rng.integers(0, n_values, n_datasets)][dataset_idx]
+
+    first_years = np.where(
+        rng.random(n_datasets) < 0.02,  # noqa: PLR2004
+        rng.integers(1, 500, n_datasets),
+        rng.integers(1850, 2015, n_datasets),
+    )
+    start_years = first_years[dataset_idx] + 10 * file_idx
+    start_months = rng.integers(1, 13, n_datasets)[dataset_idx]
+    start_days = rng.choice([1, 15, 16], n_datasets)[dataset_idx]
+    start_times = np.array(
+        [
+            f"{year:04d}-{month:02d}-{day:02d} 12:00:00"
+            for year, month, day in zip(start_years, start_months, start_days)
+        ],
+        dtype=object,
+    )
+    end_times = np.array(
+        [f"{year + 9:04d}-12-16 12:00:00.000000" for year in start_years],
+        dtype=object,
+    )
+
+    return pd.DataFrame(
+        {
+            "activity_id": _facet("activity", 20),
+            "institution_id": _facet("institution", 50),
+            "source_id": _facet("source", 100),
+            "experiment_id": _facet("experiment", 200),
+            "member_id": _facet("r1i1p1f", 10),
+            "variant_label": _facet("r1i1p1f", 10),
+            "parent_variant_label": _facet("r1i1p1f", 10),
+            "table_id": _facet("table", 30),
+            "variable_id": np.array([f"var{i}" for i in range(n_datasets)], dtype=object)[dataset_idx],
+            "grid_label": _facet("g", 3),
+            "version": _facet("v2020010", 9),
+            "branch_time_in_child": np.where(dataset_idx % 50 == 0, "0.0D", "0.0"),
+            "branch_time_in_parent": np.where(dataset_idx % 50 == 0, "365.0D", "365.0"),
+            "start_time": start_times,
+            "end_time": end_times,
+            "path": [f"/data/file_{i}.nc" for i in range(n_rows)],
+        }
+    ).iloc[np.argsort(start_years, kind="stable")]
+
+
+def _time(func: Callable[[pd.DataFrame], pd.DataFrame], catalog: pd.DataFrame) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    result = func(catalog.copy())
+    return time.perf_counter() - start, result
+
+
+def main() -> None:  # noqa: D103
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-rows", type=int, default=1_000_000)
+    parser.add_argument("--files-per-dataset", type=int, default=10)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.n_rows, args.files_per_dataset)
+    print(f"Synthetic catalog: {len(catalog)} files, {args.files_per_dataset} files per dataset")
+
+    columnar_time, columnar = _time(_postprocess_catalog, catalog)
+    print(f"Columnar post-processing: {columnar_time:.2f}s")
+
+    legacy_time, legacy = _time(_legacy_postprocess_catalog, catalog)
+    print(f"Row-wise post-processing: {legacy_time:.2f}s")
+    print(f"Speedup: {legacy_time / columnar_time:.1f}x")
+
+    pd.testing.assert_frame_equal(
+        columnar.sort_values("path").reset_index(drop=True),
+        legacy.sort_values("path").reset_index(drop=True),
+        check_like=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ import pandas as pd
 
 class Builder:
     df = pd.DataFrame()
+    assets: list[str] | None
+    entries: list[dict[str, Any]]
+    invalid_assets: pd.DataFrame
 
     def __init__(
         self,
@@ -13,4 +16,7 @@ class Builder:
         include_patterns: list[str],
         joblib_parallel_kwargs: dict[str, Any],
     ) -> None: ...
-    def build(self, *, parsing_func: Callable[[str], pd.DataFrame]) -> Builder: ...
+    def get_assets(self) -> Builder: ...
+    def parse(self, *, parsing_func: Callable[[str], dict[str, Any]]) -> Builder: ...
+    def clean_dataframe(self) -> Builder: ...
+    def build(self, *, parsing_func: Callable[[str], dict[str, Any]]) -> Builder: ...
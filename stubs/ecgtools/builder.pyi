@@ -0,0 +1,2 @@
+INVALID_ASSET: str
+TRACEBACK: str
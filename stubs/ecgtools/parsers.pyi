@@ -1,6 +1,4 @@
 import os
 from typing import Any
 
-import pandas as pd
-
-def parse_cmip6(file: str | os.PathLike[Any]) -> pd.DataFrame: ...
+def parse_cmip6(file: str | os.PathLike[Any]) -> dict[str, Any]: ...
@@ -0,0 +1,9 @@
+import numpy.typing as npt
+import pandas as pd
+
+class RecordBatch:
+    def to_pandas(self) -> pd.DataFrame: ...
+
+class Table:
+    def take(self, indices: npt.ArrayLike) -> Table: ...
+    def to_pandas(self) -> pd.DataFrame: ...
@@ -0,0 +1,8 @@
+import os
+from typing import Any
+
+import pandas as pd
+from pyarrow import Table
+
+def write_feather(df: pd.DataFrame, dest: str | os.PathLike[Any], compression: str | None = ...) -> None: ...
+def read_table(source: str | os.PathLike[Any], memory_map: bool = ...) -> Table: ...
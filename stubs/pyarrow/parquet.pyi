@@ -0,0 +1,9 @@
+import os
+from collections.abc import Iterator
+from typing import Any
+
+from pyarrow import RecordBatch
+
+class ParquetFile:
+    def __init__(self, source: str | os.PathLike[Any]) -> None: ...
+    def iter_batches(self, batch_size: int = ...) -> Iterator[RecordBatch]: ...